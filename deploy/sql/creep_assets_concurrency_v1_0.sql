@@ -0,0 +1,37 @@
+-- SHARED concurrency columns backing Loader.LOCK_ASSETS_SQL
+-- Aligns with schemas/v1.0/AssetSnapshot.json (concurrency_mode,
+-- concurrency_limit, current_concurrency).
+--
+-- current_concurrency counts the asset's ACTIVE leases. EXCLUSIVE assets go
+-- LOCKED on their single lease as before; SHARED assets stay READY and the
+-- loader hands out leases while current_concurrency < concurrency_limit.
+-- Settlement and the janitor's lease expiry give the slots back.
+--
+-- Existing rows default to EXCLUSIVE with a limit of 1, which keeps the old
+-- behaviour until an asset is explicitly marked SHARED.
+
+ALTER TABLE creep_assets
+    ADD COLUMN IF NOT EXISTS concurrency_mode VARCHAR(16) NOT NULL DEFAULT 'EXCLUSIVE',
+    ADD COLUMN IF NOT EXISTS concurrency_limit INTEGER NOT NULL DEFAULT 1,
+    ADD COLUMN IF NOT EXISTS current_concurrency INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE creep_assets DROP CONSTRAINT IF EXISTS creep_assets_concurrency_check;
+ALTER TABLE creep_assets ADD CONSTRAINT creep_assets_concurrency_check CHECK (
+    concurrency_mode IN ('EXCLUSIVE', 'SHARED')
+    AND concurrency_limit >= 1
+    AND (concurrency_mode = 'SHARED' OR concurrency_limit = 1)
+    AND current_concurrency BETWEEN 0 AND concurrency_limit
+);
+
+-- Backfill the counters from the leases that are still ACTIVE.
+UPDATE creep_assets AS a
+SET current_concurrency = LEAST(l.active, a.concurrency_limit)
+FROM (
+    SELECT asset_id, count(*) AS active FROM leases WHERE status = 'ACTIVE' GROUP BY asset_id
+) l
+WHERE a.id = l.asset_id;
+
+-- Janitor.EXPIRE_SHARED_LEASES_SQL scans ACTIVE leases by expiry.
+CREATE INDEX IF NOT EXISTS idx_leases_active_expires_at
+    ON leases (expires_at)
+    WHERE status = 'ACTIVE';
@@ -0,0 +1,98 @@
+-- Deadline notifications backing src/engine/janitor_scheduler.py
+-- Changes to an asset's status or lifecycle deadlines are published on the
+-- creep_asset_deadlines channel, so the janitor scheduler can keep its timer
+-- wheel current without rescanning creep_assets. Deadlines are sent as epoch
+-- seconds (NULL when unset).
+--
+-- Opt-in: apply this migration only where a JanitorScheduler (or, with
+-- v1_1, an InventoryIndex) listens. Without it the janitor's periodic sweep
+-- does the same work. Every commit that queues a NOTIFY takes PostgreSQL's
+-- cluster-wide notify queue lock, so the triggers keep that cost down:
+--   * they are statement-level, and each payload is a JSON array carrying
+--     the changes of many rows, split to stay below the 8000-byte NOTIFY
+--     limit; a Loader lock round or a janitor batch queues a handful of
+--     notifications instead of one per row;
+--   * an UPDATE notifies only the rows whose status or deadlines changed.
+-- A single change that would not fit on its own (an oversized sku_code)
+-- is cut down to its id, which listeners treat as "state unknown"; the
+-- scheduler drops the asset's timer, leaving it to the periodic sweep.
+--
+-- NOTIFY is delivered on commit, so listeners never see rolled-back changes.
+
+DROP TRIGGER IF EXISTS trg_creep_assets_notify_deadline ON creep_assets;
+DROP FUNCTION IF EXISTS creep_assets_notify_deadline();
+
+-- Publish change objects as JSON arrays of at most ~7900 bytes each.
+CREATE OR REPLACE FUNCTION creep_assets_notify_changes(changes text[]) RETURNS void AS $$
+DECLARE
+    change text;
+    batch text;
+BEGIN
+    FOREACH change IN ARRAY changes LOOP
+        IF octet_length(change) > 7800 THEN
+            change := json_build_object('id', change::json -> 'id')::text;
+        END IF;
+        IF batch IS NOT NULL AND octet_length(batch) + octet_length(change) + 2 > 7900 THEN
+            PERFORM pg_notify('creep_asset_deadlines', batch || ']');
+            batch := NULL;
+        END IF;
+        batch := coalesce(batch || ',', '[') || change;
+    END LOOP;
+    IF batch IS NOT NULL THEN
+        PERFORM pg_notify('creep_asset_deadlines', batch || ']');
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION creep_assets_notify_inserted() RETURNS trigger AS $$
+BEGIN
+    PERFORM creep_assets_notify_changes(ARRAY(
+        SELECT json_build_object(
+            'id', n.id,
+            'status', n.status,
+            'sku_category', n.sku_category,
+            'sku_code', n.sku_code,
+            'lock_expires_at', EXTRACT(EPOCH FROM n.lock_expires_at),
+            'cool_down_until', EXTRACT(EPOCH FROM n.cool_down_until)
+        )::text
+        FROM new_rows n
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION creep_assets_notify_updated() RETURNS trigger AS $$
+BEGIN
+    PERFORM creep_assets_notify_changes(ARRAY(
+        SELECT json_build_object(
+            'id', n.id,
+            'status', n.status,
+            'sku_category', n.sku_category,
+            'sku_code', n.sku_code,
+            'lock_expires_at', EXTRACT(EPOCH FROM n.lock_expires_at),
+            'cool_down_until', EXTRACT(EPOCH FROM n.cool_down_until)
+        )::text
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE (o.status, o.lock_expires_at, o.cool_down_until)
+            IS DISTINCT FROM (n.status, n.lock_expires_at, n.cool_down_until)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_creep_assets_notify_inserted ON creep_assets;
+DROP TRIGGER IF EXISTS trg_creep_assets_notify_updated ON creep_assets;
+
+-- Transition tables rule out an UPDATE OF column list; the function filters.
+CREATE TRIGGER trg_creep_assets_notify_inserted
+    AFTER INSERT ON creep_assets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION creep_assets_notify_inserted();
+
+CREATE TRIGGER trg_creep_assets_notify_updated
+    AFTER UPDATE ON creep_assets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION creep_assets_notify_updated();
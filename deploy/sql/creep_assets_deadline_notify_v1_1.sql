@@ -0,0 +1,47 @@
+-- Asset change notifications v1.1
+-- Extends v1.0 so the notification also feeds the Loader's in-memory
+-- inventory index (src/engine/inventory_index.py): SKU or attribute edits
+-- notify as well. The payload stays id/status/SKU/deadlines; attributes are
+-- left out because they are unbounded JSONB, so the index treats a notified
+-- asset's attributes as unknown and the Loader's locking query checks them.
+--
+-- Apply after creep_assets_deadline_notify_v1_0.sql; it replaces both
+-- trigger functions and keeps v1.0's batched statement-level triggers.
+
+CREATE OR REPLACE FUNCTION creep_assets_notify_inserted() RETURNS trigger AS $$
+BEGIN
+    PERFORM creep_assets_notify_changes(ARRAY(
+        SELECT json_build_object(
+            'id', n.id,
+            'status', n.status,
+            'sku_category', n.sku_category,
+            'sku_code', n.sku_code,
+            'lock_expires_at', EXTRACT(EPOCH FROM n.lock_expires_at),
+            'cool_down_until', EXTRACT(EPOCH FROM n.cool_down_until)
+        )::text
+        FROM new_rows n
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION creep_assets_notify_updated() RETURNS trigger AS $$
+BEGIN
+    PERFORM creep_assets_notify_changes(ARRAY(
+        SELECT json_build_object(
+            'id', n.id,
+            'status', n.status,
+            'sku_category', n.sku_category,
+            'sku_code', n.sku_code,
+            'lock_expires_at', EXTRACT(EPOCH FROM n.lock_expires_at),
+            'cool_down_until', EXTRACT(EPOCH FROM n.cool_down_until)
+        )::text
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE (o.status, o.lock_expires_at, o.cool_down_until, o.sku_category, o.sku_code, o.attributes)
+            IS DISTINCT FROM
+            (n.status, n.lock_expires_at, n.cool_down_until, n.sku_category, n.sku_code, n.attributes)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
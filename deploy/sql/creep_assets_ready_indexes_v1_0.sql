@@ -0,0 +1,19 @@
+-- READY-pool indexes backing Loader.LOCK_ASSETS_SQL
+-- The loader locks candidates with a single
+--   status='READY' AND sku_category=? AND sku_code LIKE ? AND attributes @> ?
+-- statement; both indexes are partial on the READY pool so they stay small
+-- while most of the table is LOCKED/COOLING/BANNED.
+--
+-- CONCURRENTLY cannot run inside a transaction block: apply this script with
+-- autocommit enabled (psql default).
+
+-- Category + code lookups; text_pattern_ops lets prefix globs such as
+-- 'ip.residential.%' use the index under any collation.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_creep_assets_ready_sku
+    ON creep_assets (sku_category, sku_code text_pattern_ops)
+    WHERE status = 'READY';
+
+-- JSONB containment for hint attributes (attributes @> '{"geo": "UK"}').
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_creep_assets_ready_attributes
+    ON creep_assets USING GIN (attributes jsonb_path_ops)
+    WHERE status = 'READY';
@@ -0,0 +1,25 @@
+-- Lease expiry backing Janitor.RECLAIM_EXPIRED_LEASES_SQL
+-- The janitor reclaims overdue ACTIVE leases and their assets in one
+-- statement per batch, reading leases through this partial index, so the
+-- scan never touches the RELEASED/REVOKED/EXPIRED history.
+--
+-- CONCURRENTLY cannot run inside a transaction block: apply this script with
+-- autocommit enabled (psql default).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leases_status_expires_at
+    ON leases (status, expires_at)
+    WHERE status = 'ACTIVE';
+
+-- Superseded by the index above (added by creep_assets_concurrency_v1_0.sql).
+DROP INDEX CONCURRENTLY IF EXISTS idx_leases_active_expires_at;
+
+-- The Loader now writes lock_id/lock_expires_at together with the lease.
+-- Backfill assets locked before that, so the janitor can reclaim them.
+UPDATE creep_assets AS a
+SET lock_id = l.lease_id, lock_expires_at = l.expires_at
+FROM leases AS l
+WHERE l.asset_id = a.id
+  AND l.status = 'ACTIVE'
+  AND a.status = 'LOCKED'
+  AND a.concurrency_mode <> 'SHARED'
+  AND a.lock_expires_at IS NULL;
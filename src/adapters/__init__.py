@@ -2,6 +2,7 @@
 
 from .base import (
     AdapterError,
+    AsyncBaseAdapter,
     BaseAdapter,
     CostModel,
     HealthStatus,
@@ -10,16 +11,22 @@ from .base import (
     ResourceUnavailableError,
 )
 from .factory import AdapterFactory
+from .middleware import AsyncRateLimitedAdapter, RateLimitedAdapter, TokenBucket, VendorLimiter
 from .mock_vendor import MockAdapter
 
 __all__ = [
     "AdapterError",
     "AdapterFactory",
+    "AsyncBaseAdapter",
+    "AsyncRateLimitedAdapter",
     "BaseAdapter",
     "CostModel",
     "HealthStatus",
     "MockAdapter",
     "QuotaExceededError",
+    "RateLimitedAdapter",
     "ResourcePayload",
     "ResourceUnavailableError",
+    "TokenBucket",
+    "VendorLimiter",
 ]
@@ -4,7 +4,7 @@ from __future__ import annotations
 import abc
 import asyncio
 from datetime import datetime, timezone
-from typing import Any, Mapping, MutableMapping, Optional, Protocol, TypedDict
+from typing import Any, List, Mapping, MutableMapping, Optional, Protocol, Sequence, TypedDict
 
 
 class AdapterError(Exception):
@@ -62,12 +62,103 @@ class SyncAdapter(Protocol):
         ...
 
 
-class BaseAdapter(abc.ABC):
-    """Defines the contract for all vendor adapters."""
+class AsyncBaseAdapter(abc.ABC):
+    """Defines the contract for natively asynchronous vendor adapters.
+
+    Implementations await vendor I/O directly, so an in-flight call costs a
+    coroutine rather than an executor thread.
+    """
+
+    native_async = True
 
     def __init__(self, config: Optional[Mapping[str, Any]] = None) -> None:
         self.config: Mapping[str, Any] = config or {}
 
+    @abc.abstractmethod
+    async def acquire_async(self, specs: Mapping[str, Any]) -> ResourcePayload:
+        """Provision or fetch a resource from the upstream provider."""
+
+    @abc.abstractmethod
+    async def release_async(self, asset_id: str) -> bool:
+        """Return or tear down a resource at the upstream provider."""
+
+    @abc.abstractmethod
+    async def check_health_async(self, asset_id: str) -> HealthStatus:
+        """Validate that a resource remains usable."""
+
+    @property
+    @abc.abstractmethod
+    def cost_model(self) -> CostModel:
+        """Return the billing metadata for this adapter."""
+
+    async def acquire_many_async(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        """Acquire one resource per spec, all-or-nothing.
+
+        The default fans out to :meth:`acquire_async`. If any acquisition
+        fails, the resources acquired by this call are released before the
+        first error is raised.
+        """
+
+        results = await asyncio.gather(
+            *(self.acquire_async(spec) for spec in specs), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            acquired = [
+                str(result.get("asset_id"))
+                for result in results
+                if not isinstance(result, BaseException)
+            ]
+            await self.release_many_async(acquired)
+            raise errors[0]
+        return list(results)
+
+    async def check_health_many_async(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        """Check every asset; results are aligned with ``asset_ids``."""
+
+        return list(await asyncio.gather(*(self.check_health_async(a) for a in asset_ids)))
+
+    async def release_many_async(self, asset_ids: Sequence[str]) -> List[bool]:
+        """Release every asset; per-asset :class:`AdapterError` maps to ``False``.
+
+        Batched implementations may instead raise :class:`AdapterError` when
+        the whole vendor call fails.
+        """
+
+        results = await asyncio.gather(
+            *(self.release_async(asset_id) for asset_id in asset_ids), return_exceptions=True
+        )
+        released: List[bool] = []
+        for result in results:
+            if isinstance(result, AdapterError):
+                released.append(False)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                released.append(bool(result))
+        return released
+
+    def _health_status(self, asset_id: str, status: str, detail: Optional[str] = None) -> HealthStatus:
+        """Helper to build a timestamped health status payload."""
+
+        return {
+            "asset_id": asset_id,
+            "status": status,
+            "detail": detail,
+            "checked_at": datetime.now(timezone.utc),
+        }
+
+
+class BaseAdapter(AsyncBaseAdapter):
+    """Defines the contract for all vendor adapters.
+
+    The ``*_async`` methods default to running the synchronous call in a
+    worker thread. Adapters that can talk to their vendor without blocking
+    should override them and set ``native_async = True``.
+    """
+
+    native_async = False
+
     @abc.abstractmethod
     def acquire(self, specs: Mapping[str, Any]) -> ResourcePayload:
         """Provision or fetch a resource from the upstream provider."""
@@ -85,30 +176,54 @@ class BaseAdapter(abc.ABC):
     def cost_model(self) -> CostModel:
         """Return the billing metadata for this adapter."""
 
+    def acquire_many(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        """Acquire one resource per spec, all-or-nothing.
+
+        The default calls :meth:`acquire` per spec and releases what it already
+        acquired when a later call fails. Vendors with a bulk endpoint should
+        override this to use a single round trip.
+        """
+
+        payloads: List[ResourcePayload] = []
+        try:
+            for spec in specs:
+                payloads.append(self.acquire(spec))
+        except AdapterError:
+            self.release_many([str(payload.get("asset_id")) for payload in payloads])
+            raise
+        return payloads
+
+    def check_health_many(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        """Check every asset; results are aligned with ``asset_ids``."""
+
+        return [self.check_health(asset_id) for asset_id in asset_ids]
+
+    def release_many(self, asset_ids: Sequence[str]) -> List[bool]:
+        """Release every asset; per-asset :class:`AdapterError` maps to ``False``.
+
+        Batched implementations may instead raise :class:`AdapterError` when
+        the whole vendor call fails.
+        """
+
+        released: List[bool] = []
+        for asset_id in asset_ids:
+            try:
+                released.append(bool(self.release(asset_id)))
+            except AdapterError:
+                released.append(False)
+        return released
+
     async def acquire_async(self, specs: Mapping[str, Any]) -> ResourcePayload:
-        """Asynchronous wrapper around :meth:`acquire`."""
+        """Thread-backed fallback for :meth:`acquire`."""
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.acquire, specs)
+        return await asyncio.to_thread(self.acquire, specs)
 
     async def release_async(self, asset_id: str) -> bool:
-        """Asynchronous wrapper around :meth:`release`."""
+        """Thread-backed fallback for :meth:`release`."""
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.release, asset_id)
+        return await asyncio.to_thread(self.release, asset_id)
 
     async def check_health_async(self, asset_id: str) -> HealthStatus:
-        """Asynchronous wrapper around :meth:`check_health`."""
-
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.check_health, asset_id)
-
-    def _health_status(self, asset_id: str, status: str, detail: Optional[str] = None) -> HealthStatus:
-        """Helper to build a timestamped health status payload."""
+        """Thread-backed fallback for :meth:`check_health`."""
 
-        return {
-            "asset_id": asset_id,
-            "status": status,
-            "detail": detail,
-            "checked_at": datetime.now(timezone.utc),
-        }
+        return await asyncio.to_thread(self.check_health, asset_id)
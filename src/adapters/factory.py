@@ -3,7 +3,8 @@ from __future__ import annotations
 
 from typing import Any, Mapping, MutableMapping, Type
 
-from .base import BaseAdapter
+from .base import AsyncBaseAdapter, BaseAdapter
+from .middleware import wrap_with_middleware
 from .mock_vendor import MockAdapter
 from src.config import load_prefixed_env
 
@@ -14,20 +15,46 @@ class AdapterFactory:
     _REGISTRY: MutableMapping[str, Type[BaseAdapter]] = {
         "mock": MockAdapter,
     }
+    _ASYNC_REGISTRY: MutableMapping[str, Type[AsyncBaseAdapter]] = {}
 
     @classmethod
     def register(cls, name: str, adapter_cls: Type[BaseAdapter]) -> None:
         cls._REGISTRY[name] = adapter_cls
 
     @classmethod
-    def create(cls, name: str, config: Mapping[str, Any] | None = None) -> BaseAdapter:
-        adapter_cls = cls._REGISTRY.get(name)
+    def register_async(cls, name: str, adapter_cls: Type[AsyncBaseAdapter]) -> None:
+        """Register a native async implementation for ``name``."""
+
+        cls._ASYNC_REGISTRY[name] = adapter_cls
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        config: Mapping[str, Any] | None = None,
+        prefer_async: bool = False,
+    ) -> AsyncBaseAdapter:
+        """Instantiate the adapter registered under ``name``.
+
+        With ``prefer_async`` a native :class:`AsyncBaseAdapter` registered via
+        :meth:`register_async` wins over the blocking implementation. Without
+        one, the blocking adapter is returned; its ``*_async`` methods are
+        native when the class sets ``native_async`` and thread-backed otherwise.
+
+        When the merged config sets any rate-limit, concurrency or retry
+        option (e.g. ``ADAPTER_MOCK_RATE_LIMIT_PER_SECOND``), the adapter is
+        wrapped in :class:`RateLimitedAdapter` (:class:`AsyncRateLimitedAdapter`
+        for a native-only async adapter) sharing one limiter per vendor.
+        """
+
+        adapter_cls = cls._ASYNC_REGISTRY.get(name) if prefer_async else None
+        adapter_cls = adapter_cls or cls._REGISTRY.get(name)
         if adapter_cls is None:
             raise ValueError(f"Adapter '{name}' is not registered")
 
         adapter_config = cls._load_config(name)
         merged_config = {**adapter_config, **(config or {})}
-        return adapter_cls(merged_config)
+        return wrap_with_middleware(adapter_cls(merged_config), name, merged_config)
 
     @staticmethod
     def _load_config(name: str) -> Mapping[str, Any]:
@@ -0,0 +1,378 @@
+"""Adapter middleware enforcing per-vendor rate and concurrency limits."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, MutableMapping, Optional, Sequence, TypeVar
+
+from .base import (
+    AsyncBaseAdapter,
+    BaseAdapter,
+    CostModel,
+    HealthStatus,
+    QuotaExceededError,
+    ResourcePayload,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MIDDLEWARE_CONFIG_KEYS = (
+    "rate_limit_per_second",
+    "rate_limit_burst",
+    "max_concurrency",
+    "max_retries",
+    "retry_backoff_ms",
+    "retry_backoff_max_ms",
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    :meth:`reserve` always takes a token and returns how long the caller must
+    wait before using it, so waiting callers are served in reservation order
+    and never exceed ``rate_per_second`` on average.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst if burst is not None else max(1.0, rate_per_second))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """Take one token; return the seconds to wait before it is valid."""
+
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+
+class VendorLimiter:
+    """Limits and counters shared by every adapter instance of one vendor."""
+
+    def __init__(
+        self,
+        vendor: str,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        self.vendor = vendor
+        self.bucket = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self._slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self._async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def _async_slot(self) -> Optional[asyncio.Semaphore]:
+        if not self.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_slots.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._async_slots[loop] = semaphore
+            return semaphore
+
+    def _count(self, field: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def record_retry(self) -> None:
+        self._count("retries", 1)
+
+    def run(self, func: Callable[..., T], *args: Any) -> T:
+        acquired = False
+        self._count("waiting", 1)
+        try:
+            if self._slots is not None:
+                self._slots.acquire()
+                acquired = True
+            delay = self.bucket.reserve() if self.bucket else 0.0
+            if delay:
+                self._count("throttled", 1)
+                time.sleep(delay)
+        except BaseException:
+            if acquired:
+                self._slots.release()
+            raise
+        finally:
+            self._count("waiting", -1)
+
+        self._count("in_flight", 1)
+        try:
+            self._count("calls", 1)
+            return func(*args)
+        finally:
+            self._count("in_flight", -1)
+            if self._slots is not None:
+                self._slots.release()
+
+    async def run_async(self, func: Callable[..., Awaitable[T]], *args: Any) -> T:
+        semaphore = self._async_slot()
+        acquired = False
+        self._count("waiting", 1)
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+                acquired = True
+            delay = self.bucket.reserve() if self.bucket else 0.0
+            if delay:
+                self._count("throttled", 1)
+                await asyncio.sleep(delay)
+        except BaseException:
+            if acquired:
+                semaphore.release()
+            raise
+        finally:
+            self._count("waiting", -1)
+
+        self._count("in_flight", 1)
+        try:
+            self._count("calls", 1)
+            return await func(*args)
+        finally:
+            self._count("in_flight", -1)
+            if semaphore is not None:
+                semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = {
+                "vendor": self.vendor,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "max_concurrency": self.max_concurrency,
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+            }
+        snapshot["tokens_available"] = self.bucket.available if self.bucket else None
+        return snapshot
+
+
+_LIMITERS: MutableMapping[str, VendorLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_vendor_limiter(vendor: str, config: Mapping[str, Any]) -> VendorLimiter:
+    """Return the process-wide limiter for ``vendor``, creating it on first use.
+
+    A vendor's limits are process-wide, so the first config wins; a later
+    config setting a different limit is logged and ignored.
+    """
+
+    rate = _float_or_none(config.get("rate_limit_per_second"))
+    burst = _float_or_none(config.get("rate_limit_burst"))
+    max_concurrency = _int_or_none(config.get("max_concurrency"))
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(vendor)
+        if limiter is None:
+            limiter = VendorLimiter(
+                vendor, rate_per_second=rate, burst=burst, max_concurrency=max_concurrency
+            )
+            _LIMITERS[vendor] = limiter
+            return limiter
+
+    current = {
+        "rate_limit_per_second": limiter.bucket.rate if limiter.bucket else None,
+        "rate_limit_burst": limiter.bucket.capacity if limiter.bucket else None,
+        "max_concurrency": limiter.max_concurrency,
+    }
+    requested = {
+        "rate_limit_per_second": rate,
+        "rate_limit_burst": burst,
+        "max_concurrency": max_concurrency,
+    }
+    conflicts = sorted(
+        key
+        for key, value in requested.items()
+        if value is not None and value != current[key]
+    )
+    if conflicts:
+        LOGGER.warning(
+            "Ignoring %s for vendor %s: its limiter already uses %s",
+            {key: requested[key] for key in conflicts},
+            vendor,
+            {key: current[key] for key in conflicts},
+        )
+    return limiter
+
+
+class AsyncRateLimitedAdapter(AsyncBaseAdapter):
+    """Wraps a native-only async adapter with vendor limits and retries.
+
+    Every upstream call, including each ``*_many`` bulk call, takes one slot
+    from the vendor's concurrency bound and one token from its bucket.
+    :class:`QuotaExceededError` is retried with full-jitter exponential
+    backoff, so a transient vendor rate limit does not surface as a failed
+    task. Like the adapter it wraps, it has no blocking methods; see
+    :class:`RateLimitedAdapter` for adapters that do.
+    """
+
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BACKOFF_MS = 100.0
+    DEFAULT_BACKOFF_MAX_MS = 5000.0
+
+    def __init__(
+        self,
+        inner: AsyncBaseAdapter,
+        limiter: VendorLimiter,
+        config: Optional[Mapping[str, Any]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        super().__init__(config if config is not None else inner.config)
+        self.inner = inner
+        self.limiter = limiter
+        self.native_async = inner.native_async
+        self.rng = rng or random.Random()
+        self.max_retries = int(self.config.get("max_retries", self.DEFAULT_MAX_RETRIES))
+        self.backoff_ms = float(self.config.get("retry_backoff_ms", self.DEFAULT_BACKOFF_MS))
+        self.backoff_max_ms = float(
+            self.config.get("retry_backoff_max_ms", self.DEFAULT_BACKOFF_MAX_MS)
+        )
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        ceiling = min(self.backoff_max_ms, self.backoff_ms * (2 ** attempt))
+        return self.rng.uniform(0.0, ceiling) / 1000.0
+
+    async def _call_async(self, func: Callable[..., Awaitable[T]], *args: Any) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await self.limiter.run_async(func, *args)
+            except QuotaExceededError:
+                if attempt >= self.max_retries:
+                    raise
+                self.limiter.record_retry()
+                await asyncio.sleep(self._backoff_seconds(attempt))
+                attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool and queue-depth counters for this adapter's vendor."""
+
+        return self.limiter.metrics()
+
+    @property
+    def cost_model(self) -> CostModel:
+        return self.inner.cost_model
+
+    async def acquire_async(self, specs: Mapping[str, Any]) -> ResourcePayload:
+        return await self._call_async(self.inner.acquire_async, specs)
+
+    async def release_async(self, asset_id: str) -> bool:
+        return await self._call_async(self.inner.release_async, asset_id)
+
+    async def check_health_async(self, asset_id: str) -> HealthStatus:
+        return await self._call_async(self.inner.check_health_async, asset_id)
+
+    async def acquire_many_async(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        return await self._call_async(self.inner.acquire_many_async, specs)
+
+    async def check_health_many_async(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        return await self._call_async(self.inner.check_health_many_async, asset_ids)
+
+    async def release_many_async(self, asset_ids: Sequence[str]) -> List[bool]:
+        return await self._call_async(self.inner.release_many_async, asset_ids)
+
+
+class RateLimitedAdapter(AsyncRateLimitedAdapter, BaseAdapter):
+    """Wraps a blocking adapter with vendor limits and quota-aware retries.
+
+    Adds the blocking methods to :class:`AsyncRateLimitedAdapter`. The
+    blocking and async paths share the token bucket; the concurrency bound
+    is enforced per execution path.
+    """
+
+    def _call(self, func: Callable[..., T], *args: Any) -> T:
+        attempt = 0
+        while True:
+            try:
+                return self.limiter.run(func, *args)
+            except QuotaExceededError:
+                if attempt >= self.max_retries:
+                    raise
+                self.limiter.record_retry()
+                time.sleep(self._backoff_seconds(attempt))
+                attempt += 1
+
+    def acquire(self, specs: Mapping[str, Any]) -> ResourcePayload:
+        return self._call(self.inner.acquire, specs)
+
+    def release(self, asset_id: str) -> bool:
+        return self._call(self.inner.release, asset_id)
+
+    def check_health(self, asset_id: str) -> HealthStatus:
+        return self._call(self.inner.check_health, asset_id)
+
+    def acquire_many(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        return self._call(self.inner.acquire_many, specs)
+
+    def check_health_many(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        return self._call(self.inner.check_health_many, asset_ids)
+
+    def release_many(self, asset_ids: Sequence[str]) -> List[bool]:
+        return self._call(self.inner.release_many, asset_ids)
+
+
+def wrap_with_middleware(
+    adapter: AsyncBaseAdapter, vendor: str, config: Mapping[str, Any]
+) -> AsyncBaseAdapter:
+    """Wrap ``adapter`` when ``config`` sets any middleware option.
+
+    The wrapper has blocking methods only when ``adapter`` does.
+    """
+
+    if not any(config.get(key) not in (None, "") for key in MIDDLEWARE_CONFIG_KEYS):
+        return adapter
+    wrapper = RateLimitedAdapter if isinstance(adapter, BaseAdapter) else AsyncRateLimitedAdapter
+    return wrapper(adapter, get_vendor_limiter(vendor, config), config)
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    return float(value)
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    return int(value)
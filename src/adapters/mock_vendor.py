@@ -1,9 +1,10 @@
 """Mock adapter simulating real-world provider behavior."""
 from __future__ import annotations
 
+import asyncio
 import random
 import time
-from typing import Any, Mapping, MutableMapping
+from typing import Any, List, Mapping, MutableMapping, Sequence
 
 from .base import (
     BaseAdapter,
@@ -16,7 +17,15 @@ from .base import (
 
 
 class MockAdapter(BaseAdapter):
-    """A mock adapter used for local development and CI."""
+    """A mock adapter used for local development and CI.
+
+    Implements both the blocking and the native async contract; the async
+    methods simulate latency with :func:`asyncio.sleep`. The ``*_many``
+    methods simulate a vendor bulk endpoint: one latency sample and one
+    failure roll per batch.
+    """
+
+    native_async = True
 
     DEFAULT_LATENCY_MS = 150.0
     DEFAULT_LATENCY_JITTER_MS = 100.0
@@ -49,10 +58,15 @@ class MockAdapter(BaseAdapter):
             "notes": "Mock adapter incurs no real cost.",
         }
 
-    def _simulate_latency(self) -> None:
+    def _latency_seconds(self) -> float:
         jitter = self.rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
-        total_ms = max(0.0, self.latency_ms + jitter)
-        time.sleep(total_ms / 1000.0)
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def _simulate_latency(self) -> None:
+        time.sleep(self._latency_seconds())
+
+    async def _simulate_latency_async(self) -> None:
+        await asyncio.sleep(self._latency_seconds())
 
     def _maybe_raise_failure(self) -> None:
         roll = self.rng.random()
@@ -64,12 +78,7 @@ class MockAdapter(BaseAdapter):
     def acquire(self, specs: Mapping[str, Any]) -> ResourcePayload:
         self._simulate_latency()
         self._maybe_raise_failure()
-        payload: ResourcePayload = {
-            "asset_id": str(specs.get("asset_id") or self.rng.randint(1, 1_000_000)),
-            "credentials": self._build_credentials(specs),
-            "metadata": {"specs": dict(specs)},
-        }
-        return payload
+        return self._build_payload(specs)
 
     def release(self, asset_id: str) -> bool:
         self._simulate_latency()
@@ -81,10 +90,75 @@ class MockAdapter(BaseAdapter):
         self._maybe_raise_failure()
         return self._health_status(asset_id=asset_id, status="healthy")
 
+    async def acquire_async(self, specs: Mapping[str, Any]) -> ResourcePayload:
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return self._build_payload(specs)
+
+    async def release_async(self, asset_id: str) -> bool:
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return True
+
+    async def check_health_async(self, asset_id: str) -> HealthStatus:
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return self._health_status(asset_id=asset_id, status="healthy")
+
+    def acquire_many(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        if not specs:
+            return []
+        self._simulate_latency()
+        self._maybe_raise_failure()
+        return [self._build_payload(spec) for spec in specs]
+
+    def check_health_many(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        if not asset_ids:
+            return []
+        self._simulate_latency()
+        self._maybe_raise_failure()
+        return [self._health_status(asset_id=asset_id, status="healthy") for asset_id in asset_ids]
+
+    def release_many(self, asset_ids: Sequence[str]) -> List[bool]:
+        if not asset_ids:
+            return []
+        self._simulate_latency()
+        self._maybe_raise_failure()
+        return [True] * len(asset_ids)
+
+    async def acquire_many_async(self, specs: Sequence[Mapping[str, Any]]) -> List[ResourcePayload]:
+        if not specs:
+            return []
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return [self._build_payload(spec) for spec in specs]
+
+    async def check_health_many_async(self, asset_ids: Sequence[str]) -> List[HealthStatus]:
+        if not asset_ids:
+            return []
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return [self._health_status(asset_id=asset_id, status="healthy") for asset_id in asset_ids]
+
+    async def release_many_async(self, asset_ids: Sequence[str]) -> List[bool]:
+        if not asset_ids:
+            return []
+        await self._simulate_latency_async()
+        self._maybe_raise_failure()
+        return [True] * len(asset_ids)
+
     @property
     def cost_model(self) -> CostModel:
         return self._cost_model
 
+    def _build_payload(self, specs: Mapping[str, Any]) -> ResourcePayload:
+        payload: ResourcePayload = {
+            "asset_id": str(specs.get("asset_id") or self.rng.randint(1, 1_000_000)),
+            "credentials": self._build_credentials(specs),
+            "metadata": {"specs": dict(specs)},
+        }
+        return payload
+
     def _build_credentials(self, specs: Mapping[str, Any]) -> MutableMapping[str, Any]:
         credentials: MutableMapping[str, Any] = {
             "token": specs.get("token", f"mock-token-{self.rng.randint(1000, 9999)}"),
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import os
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,10 +15,43 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379/0"
 
     loader_batch_size: int = 1
+    loader_bom_preflight: bool = False
+    loader_payload_version: int = 2
+    # "json" or "binary"; switch to binary only once every worker decodes it.
+    loader_payload_codec: str = "json"
     janitor_batch_size: int = 100
     janitor_max_process_limit: int = 1000
-    worker_poll_interval: float = 1.0
+    janitor_min_batch_size: int = 10
+    janitor_max_batch_size: int = 5000
+    janitor_target_commit_ms: float = 250.0
+    janitor_shard_count: int = 8
+    janitor_notify_channel: str = "creep_asset_deadlines"
+    janitor_tick_ms: float = 10.0
+    janitor_sweep_interval_ms: float = 60000.0
     worker_mock_success_rate: float = 0.8
+    worker_settle_batch_size: int = 1
+    worker_settle_max_delay_ms: float = 50.0
+    worker_pool_concurrency: int = 8
+    worker_prefetch_count: int = 4
+    # Threads per Worker for adapter calls bounded by a task deadline.
+    worker_adapter_call_threads: int = 4
+    lease_heartbeat_enabled: bool = False
+    lease_heartbeat_interval_ms: float = 2000.0
+    lease_heartbeat_ttl_ms: float = 10000.0
+
+    # (name, min_priority, weight) per band; empty keeps a single FIFO queue.
+    dispatch_priority_bands: List[Tuple[str, int, int]] = []
+    dispatch_tenant_fairness: bool = False
+    dispatch_tenant_refresh_ms: float = 1000.0
+
+    dispenser_heartbeat_ttl_ms: float = 5000.0
+    dispenser_reclaim_interval_ms: float = 2000.0
+    # Longest BLMOVE wait on one list when a ReliableDispenser drains bands.
+    dispenser_banded_wait_ms: float = 200.0
+
+    health_cache_max_entries: int = 10000
+    health_cache_ttl_ms: float = 2000.0
+    health_cache_ttl_by_category: Dict[str, float] = {}
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", case_sensitive=False)
 
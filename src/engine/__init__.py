@@ -1,11 +1,16 @@
 """Scheduling engine components backed by PostgreSQL and Redis."""
 
-from .dispenser import Dispenser
+from .dispenser import Dispenser, ReliableDispenser
 from .janitor import Janitor
+from .janitor_scheduler import JanitorScheduler
 from .loader import Loader
+from .sharded_janitor import ShardedJanitor
 
 __all__ = [
     "Dispenser",
     "Janitor",
+    "JanitorScheduler",
     "Loader",
+    "ReliableDispenser",
+    "ShardedJanitor",
 ]
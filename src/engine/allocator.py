@@ -0,0 +1,107 @@
+"""Whole-BOM feasibility checks and allocation across a batch of tasks."""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.engine.sku_pattern import compile_sku_pattern
+
+
+@dataclass(frozen=True)
+class HintKey:
+    """The asset pool a resource hint draws from."""
+
+    sku_category: str
+    sku_code: Optional[str] = None
+    # Canonical JSON of the required attributes, so keys hash and compare.
+    attributes: str = "{}"
+
+    @classmethod
+    def from_hint(cls, hint: Mapping) -> Optional["HintKey"]:
+        sku_category = hint.get("sku_category")
+        if not sku_category:
+            return None
+        attributes = json.dumps(hint.get("attributes") or {}, sort_keys=True)
+        return cls(sku_category, hint.get("sku_code"), attributes)
+
+
+# A task's bill of materials: how many assets it needs from each pool.
+Bom = List[Tuple[HintKey, int]]
+
+
+def parse_bom(hints: Iterable[Mapping]) -> Optional[Bom]:
+    """Aggregate a task's ``resource_hints`` per pool; ``None`` if malformed."""
+
+    demand: Dict[HintKey, int] = {}
+    for hint in hints:
+        key = HintKey.from_hint(hint)
+        if key is None:
+            return None
+        demand[key] = demand.get(key, 0) + int(hint.get("min_count", 1))
+    return list(demand.items())
+
+
+def pools_may_overlap(left: HintKey, right: HintKey) -> bool:
+    """Whether one READY asset could satisfy both hints.
+
+    Conservative: only answers ``False`` when the category or the SKU codes
+    rule a shared asset out. Attributes are never used to rule one out.
+    """
+
+    if left == right:
+        return True
+    if left.sku_category != right.sku_category:
+        return False
+    if left.sku_code is None or right.sku_code is None:
+        return True
+    left_pattern = compile_sku_pattern(left.sku_code)
+    right_pattern = compile_sku_pattern(right.sku_code)
+    if left_pattern.literal is not None:
+        return right_pattern.matches(left_pattern.literal)
+    if right_pattern.literal is not None:
+        return left_pattern.matches(right_pattern.literal)
+    left_prefix = left_pattern.literal_prefix
+    right_prefix = right_pattern.literal_prefix
+    return left_prefix.startswith(right_prefix) or right_prefix.startswith(left_prefix)
+
+
+class BomAllocator:
+    """Admits tasks whose whole BOM fits a READY-count snapshot.
+
+    ``capacity`` is the number of READY assets in each pool. Tasks are
+    considered once, in the order given (the Loader claims by priority, then
+    age), and a task is admitted only if every pool it draws from still has
+    enough stock after the tasks admitted before it. Assets drawn from one
+    pool are also deducted from every pool that may overlap it, so
+    competing hints such as ``ip.*`` and ``ip.uk`` never both count the same
+    asset. That errs towards deferring a task that might have fit; it never
+    admits one the snapshot cannot cover.
+    """
+
+    def __init__(self, capacity: Mapping[HintKey, int]) -> None:
+        self.remaining: Dict[HintKey, int] = dict(capacity)
+        self._overlaps: Dict[HintKey, List[HintKey]] = {}
+
+    def admit(self, bom: Bom) -> bool:
+        """Reserve ``bom`` against the remaining stock if all of it fits."""
+
+        trial = dict(self.remaining)
+        for key, count in bom:
+            if trial.get(key, 0) < count:
+                return False
+            for other in self._overlapping(key):
+                trial[other] = max(0, trial.get(other, 0) - count)
+        self.remaining = trial
+        return True
+
+    def allocate(self, boms: Sequence[Optional[Bom]]) -> List[bool]:
+        """Admit or reject each BOM in order; malformed BOMs are rejected."""
+
+        return [bom is not None and self.admit(bom) for bom in boms]
+
+    def _overlapping(self, key: HintKey) -> List[HintKey]:
+        overlapping = self._overlaps.get(key)
+        if overlapping is None:
+            overlapping = [other for other in self.remaining if pools_may_overlap(key, other)]
+            self._overlaps[key] = overlapping
+        return overlapping
@@ -1,28 +1,456 @@
 """Redis-backed Dispenser that hands asset IDs to workers."""
 
-from typing import Optional
+import logging
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.config import settings
+from src.engine.payload_codec import Payload
+from src.engine.priority_queues import PriorityBand, PriorityQueues
+
+
+LOGGER = logging.getLogger(__name__)
 
 
 class Dispenser:
-    """Pops queued asset IDs from Redis for workers to process."""
+    """Pops queued asset IDs from Redis for workers to process.
+
+    With a :class:`PriorityQueues` layout (taken from settings by default)
+    every pop is a multi-key ``BLPOP`` over the band and tenant lists in the
+    order the layout chooses; otherwise ``queue_name`` is a single FIFO list.
+    Tenants whose lists have drained are dropped from the layout's tenant
+    sets when the dispenser refreshes them.
+    """
+
+    TENANT_REFRESH_MS = settings.dispatch_tenant_refresh_ms
 
-    def __init__(self, redis_client, queue_name: str = "creep:assets", timeout: int = 5) -> None:
+    def __init__(
+        self,
+        redis_client,
+        queue_name: str = "creep:assets",
+        timeout: int = 5,
+        queues: Optional[PriorityQueues] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self.redis_client = redis_client
         self.queue_name = queue_name
         self.timeout = timeout
+        self.queues = queues if queues is not None else PriorityQueues.from_settings(queue_name)
+        self._clock = clock
+        self._tenants: Dict[str, List[str]] = {}
+        self._tenants_at: Optional[float] = None
 
-    def acquire(self) -> Optional[str]:
+    def acquire(self, timeout: Optional[float] = None) -> Optional[Payload]:
         """Blockingly pop an asset ID from Redis.
 
+        ``timeout`` overrides the configured blocking timeout for this call.
         Returns ``None`` on timeout.
         """
 
-        result = self.redis_client.blpop(self.queue_name, timeout=self.timeout)
+        popped = self._pop_first(timeout)
+        if popped is None:
+            return None
+        return popped[1]
+
+    def acquire_batch(self, count: int, timeout: Optional[float] = None) -> List[Payload]:
+        """Block for the first payload, then take up to ``count - 1`` more.
+
+        The extra payloads are taken without blocking, so a batch is returned
+        as soon as anything is queued. With a :class:`PriorityQueues` layout
+        they are spread over the band and tenant lists as that many single
+        pops would be. Returns an empty list on timeout.
+        """
+
+        popped = self._pop_first(timeout)
+        if popped is None:
+            return []
+        queue, first = popped
+        if count <= 1:
+            return [first]
+        return [first] + self._pop_more(self._top_up_plan(queue, count - 1))
+
+    def ack(self, payload: Payload) -> None:
+        """Confirm that ``payload`` has been settled.
+
+        Plain ``BLPOP`` delivery is at-most-once, so there is nothing to do.
+        """
+
+    def redelivered(self, payload: Payload) -> bool:
+        """Whether ``payload`` may already have been run by another consumer.
+
+        Plain ``BLPOP`` delivery never hands a payload out twice.
+        """
+
+        return False
+
+    def _pop_first(self, timeout: Optional[float]) -> Optional[Tuple[str, Payload]]:
+        wait = self.timeout if timeout is None else timeout
+        result = self.redis_client.blpop(self._drain_order(), timeout=wait)
         if result is None:
             return None
 
-        _queue, raw_value = result
+        queue, raw_value = result
+        return self._decode(queue), self._payload(raw_value)
+
+    def _pop_more(self, plan: List[Tuple[str, int]]) -> List[Payload]:
+        if len(plan) == 1:
+            queue, count = plan[0]
+            raw_values = self.redis_client.lpop(queue, count) or []
+        else:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for queue, count in plan:
+                pipeline.lpop(queue, count)
+            raw_values = [raw_value for popped in pipeline.execute() for raw_value in popped or []]
+        return [self._payload(raw_value) for raw_value in raw_values]
+
+    def _top_up_plan(self, queue: str, count: int) -> List[Tuple[str, int]]:
+        """How many extra payloads to take from which list, in pop order.
+
+        A plain queue tops up from ``queue``. A layout is asked for one drain
+        order per extra payload, as if each were popped on its own, and each
+        goes to the first list in its order still holding work, judged by one
+        ``LLEN`` round trip. Consumers racing for the same lists just leave the
+        batch short.
+        """
+
+        if self.queues is None:
+            return [(queue, count)]
+        order = self._drain_order()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key in order:
+            pipeline.llen(key)
+        queued = dict(zip(order, pipeline.execute()))
+        left = sum(queued.values())
+        plan: Dict[str, int] = {}
+        for slot in range(min(count, left)):
+            if slot:
+                order = self._drain_order()
+            for key in order:
+                if queued.get(key, 0) > plan.get(key, 0):
+                    plan[key] = plan.get(key, 0) + 1
+                    break
+        return list(plan.items())
+
+    def _drain_order(self) -> List[str]:
+        if self.queues is None:
+            return [self.queue_name]
+        if self.queues.per_tenant:
+            self._refresh_tenants()
+        return self.queues.drain_order(self._tenants)
+
+    def _refresh_tenants(self) -> None:
+        now = self._clock()
+        if self._tenants_at is not None and (now - self._tenants_at) * 1000.0 < self.TENANT_REFRESH_MS:
+            return
+        self._tenants_at = now
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for band in self.queues.bands:
+            pipeline.smembers(self.queues.tenants_key(band))
+        members = [
+            (band, self._decode(member))
+            for band, band_members in zip(self.queues.bands, pipeline.execute())
+            for member in band_members
+        ]
+        for band, tenant in members:
+            pipeline.llen(self.queues.tenant_key(band, tenant))
+        lengths = pipeline.execute()
+        drained = [member for member, length in zip(members, lengths) if not length]
+        refilled = self._prune_tenants(drained) if drained else set()
+        self._tenants = {band.name: [] for band in self.queues.bands}
+        for (band, tenant), length in zip(members, lengths):
+            if length or (band, tenant) in refilled:
+                self._tenants[band.name].append(tenant)
+
+    def _prune_tenants(
+        self, drained: List[Tuple[PriorityBand, str]]
+    ) -> Set[Tuple[PriorityBand, str]]:
+        """Drop drained tenants from their band's set; return those refilled meanwhile.
+
+        The Loader pushes a payload before registering its tenant, so checking
+        the list again after the ``SREM`` and re-adding a tenant whose list has
+        filled up leaves no window in which queued work goes unadvertised.
+        """
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for band, tenant in drained:
+            pipeline.srem(self.queues.tenants_key(band), tenant)
+            pipeline.llen(self.queues.tenant_key(band, tenant))
+        lengths = pipeline.execute()[1::2]
+        refilled = {member for member, length in zip(drained, lengths) if length}
+        if refilled:
+            for band, tenant in refilled:
+                pipeline.sadd(self.queues.tenants_key(band), tenant)
+            pipeline.execute()
+        return refilled
+
+    @staticmethod
+    def _decode(raw_value) -> str:
         if isinstance(raw_value, bytes):
             return raw_value.decode()
 
         return str(raw_value)
+
+    @classmethod
+    def _payload(cls, raw_value) -> Payload:
+        """JSON payloads as text; binary ones stay bytes so ``ack`` can match them.
+
+        Binary payloads need a client without ``decode_responses``.
+        """
+
+        try:
+            return cls._decode(raw_value)
+        except UnicodeDecodeError:
+            return raw_value
+
+
+class ReliableDispenser(Dispenser):
+    """At-least-once dispenser built on ``BLMOVE``.
+
+    Each payload is moved atomically from the shared queue into this
+    consumer's processing list and stays there until :meth:`ack` removes it,
+    which workers do only after the settlement transaction commits.
+
+    A consumer proves it is alive by refreshing a heartbeat key with a short
+    expiry, from a background thread started on the first dequeue, so a
+    consumer busy with a long task (or its prefetched payloads) stays alive
+    however rarely it dequeues. Every ``reclaim_interval_ms`` each consumer
+    looks for registered consumers whose heartbeat has lapsed and moves their
+    processing lists to a redelivery list, drained ahead of the queue, so a
+    crashed worker's payloads are redelivered within seconds instead of
+    waiting for the lease timeout. Payloads taken from that list are reported
+    by :meth:`redelivered`, since they may have run already.
+
+    ``BLMOVE`` blocks on a single list, so with a :class:`PriorityQueues`
+    layout each pop moves from the first non-empty list of the drain order
+    and only blocks, for at most ``BANDED_WAIT_MS``, on the leading list once
+    every list is empty. Redelivered payloads share one list whatever their
+    band; it is drained first either way.
+    """
+
+    HEARTBEAT_TTL_MS = settings.dispenser_heartbeat_ttl_ms
+    RECLAIM_INTERVAL_MS = settings.dispenser_reclaim_interval_ms
+    BANDED_WAIT_MS = settings.dispenser_banded_wait_ms
+
+    def __init__(
+        self,
+        redis_client,
+        queue_name: str = "creep:assets",
+        timeout: int = 5,
+        consumer_id: Optional[str] = None,
+        heartbeat_ttl_ms: Optional[float] = None,
+        reclaim_interval_ms: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        background_heartbeat: bool = True,
+        queues: Optional[PriorityQueues] = None,
+    ) -> None:
+        super().__init__(redis_client, queue_name, timeout, queues=queues, clock=clock)
+        self.consumer_id = consumer_id or f"{socket.gethostname()}:{uuid.uuid4().hex[:12]}"
+        self.heartbeat_ttl_ms = float(
+            self.HEARTBEAT_TTL_MS if heartbeat_ttl_ms is None else heartbeat_ttl_ms
+        )
+        self.reclaim_interval_s = float(
+            self.RECLAIM_INTERVAL_MS if reclaim_interval_ms is None else reclaim_interval_ms
+        ) / 1000.0
+        self.consumers_key = f"{queue_name}:consumers"
+        self.redelivered_key = f"{queue_name}:redelivered"
+        self.processing_key = self._processing_key(self.consumer_id)
+        self._heartbeat_at: Optional[float] = None
+        self._reclaimed_at: Optional[float] = None
+        self.background_heartbeat = background_heartbeat
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._redelivered: Set[Payload] = set()
+        # A pool shares one dispenser across threads: the first-dequeue setup
+        # must run once, before any slot moves a payload into processing.
+        self._setup_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def _pop_first(self, timeout: Optional[float]) -> Optional[Tuple[str, Payload]]:
+        """Move the next payload into this consumer's processing list.
+
+        The abandoned-list sweep piggybacks on this call. So does a heartbeat
+        refresh when it is due, which covers consumers without the background
+        heartbeat thread. Safe to call from several threads.
+        """
+
+        if self._heartbeat_at is None:
+            with self._setup_lock:
+                if self._heartbeat_at is None:
+                    self.heartbeat()
+                    # A restart with a stable consumer_id resumes its own unacked work.
+                    self._requeue(self.processing_key)
+                    self._start_heartbeat()
+        now = self._clock()
+        if (now - self._heartbeat_at) * 1000.0 >= self.heartbeat_ttl_ms / 3.0:
+            self.heartbeat()
+        with self._state_lock:
+            reclaim = (
+                self._reclaimed_at is None or now - self._reclaimed_at >= self.reclaim_interval_s
+            )
+            if reclaim:
+                self._reclaimed_at = now
+        if reclaim:
+            self.reclaim_abandoned()
+
+        raw_value = self.redis_client.lmove(
+            self.redelivered_key, self.processing_key, "LEFT", "RIGHT"
+        )
+        if raw_value is not None:
+            payload = self._payload(raw_value)
+            with self._state_lock:
+                self._redelivered.add(payload)
+            return self.redelivered_key, payload
+
+        # Block at most one heartbeat third so liveness never lapses while idle.
+        wait = self.timeout if timeout is None else timeout
+        wait = min(wait, self.heartbeat_ttl_ms / 3000.0)
+        if self.queues is None:
+            queue = self.queue_name
+        else:
+            order = self._drain_order()
+            popped = self._move_first(order)
+            if popped is not None:
+                return popped
+            # Anything pushed meanwhile to another list waits out this short block.
+            queue = order[0]
+            wait = min(wait, self.BANDED_WAIT_MS / 1000.0)
+        raw_value = self.redis_client.blmove(queue, self.processing_key, wait, "LEFT", "RIGHT")
+        if raw_value is None:
+            return None
+        return queue, self._payload(raw_value)
+
+    def _move_first(self, order: List[str]) -> Optional[Tuple[str, Payload]]:
+        """Move a payload from the first list of ``order`` that holds one."""
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key in order:
+            pipeline.llen(key)
+        for key, length in zip(order, pipeline.execute()):
+            if not length:
+                continue
+            # Another consumer may have emptied it since; fall through to the next.
+            raw_value = self.redis_client.lmove(key, self.processing_key, "LEFT", "RIGHT")
+            if raw_value is not None:
+                return key, self._payload(raw_value)
+        return None
+
+    def _pop_more(self, plan: List[Tuple[str, int]]) -> List[Payload]:
+        # There is no counted LMOVE; pipeline the moves into one round trip.
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for queue, count in plan:
+            for _ in range(count):
+                pipeline.lmove(queue, self.processing_key, "LEFT", "RIGHT")
+        payloads = [
+            self._payload(raw_value) for raw_value in pipeline.execute() if raw_value is not None
+        ]
+        if plan and plan[0][0] == self.redelivered_key:
+            with self._state_lock:
+                self._redelivered.update(payloads)
+        return payloads
+
+    def _top_up_plan(self, queue: str, count: int) -> List[Tuple[str, int]]:
+        # A batch started from the redelivery list stays on it, ahead of any band.
+        if queue == self.redelivered_key:
+            return [(queue, count)]
+        return super()._top_up_plan(queue, count)
+
+    def ack(self, payload: Payload) -> None:
+        with self._state_lock:
+            self._redelivered.discard(payload)
+        self.redis_client.lrem(self.processing_key, 1, payload)
+
+    def redelivered(self, payload: Payload) -> bool:
+        with self._state_lock:
+            return payload in self._redelivered
+
+    def heartbeat(self) -> None:
+        self._heartbeat_at = self._clock()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.sadd(self.consumers_key, self.consumer_id)
+        pipeline.set(self._alive_key(self.consumer_id), 1, px=int(self.heartbeat_ttl_ms))
+        pipeline.execute()
+
+    def reclaim_abandoned(self) -> int:
+        """Requeue the processing lists of consumers whose heartbeat expired."""
+
+        consumers = [
+            self._decode(consumer) for consumer in self.redis_client.smembers(self.consumers_key)
+        ]
+        others = [consumer for consumer in consumers if consumer != self.consumer_id]
+        if not others:
+            return 0
+
+        alive = self.redis_client.mget([self._alive_key(consumer) for consumer in others])
+        reclaimed = 0
+        for consumer, heartbeat in zip(others, alive):
+            if heartbeat is not None:
+                continue
+            moved = self._requeue(self._processing_key(consumer))
+            self.redis_client.srem(self.consumers_key, consumer)
+            if moved:
+                LOGGER.warning(
+                    "Redelivered %d payload(s) abandoned by consumer %s", moved, consumer
+                )
+            reclaimed += moved
+        return reclaimed
+
+    def close(self) -> None:
+        """Hand unacknowledged payloads back and deregister this consumer.
+
+        Call it once no thread dequeues or acknowledges through it any more.
+        """
+
+        with self._setup_lock:
+            self._stop_heartbeat()
+            self._requeue(self.processing_key)
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pipeline.srem(self.consumers_key, self.consumer_id)
+            pipeline.delete(self._alive_key(self.consumer_id))
+            pipeline.execute()
+            self._heartbeat_at = None
+            with self._state_lock:
+                self._redelivered.clear()
+
+    def _start_heartbeat(self) -> None:
+        # Like _stop_heartbeat, only called under _setup_lock.
+        if not self.background_heartbeat or self._heartbeat_thread is not None:
+            return
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._beat, name="creep-dispenser-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _stop_heartbeat(self) -> None:
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+    def _beat(self) -> None:
+        while not self._heartbeat_stop.wait(self.heartbeat_ttl_ms / 3000.0):
+            try:
+                self.heartbeat()
+            except Exception:
+                # Keep trying: liveness lapses only after several missed beats.
+                LOGGER.exception("Dispenser heartbeat failed")
+
+    def _requeue(self, processing_key: str) -> int:
+        # LMOVE is atomic per element; concurrent reclaimers never duplicate a
+        # payload, and the oldest work goes to the head of the redelivery list.
+        moved = 0
+        while (
+            self.redis_client.lmove(processing_key, self.redelivered_key, "RIGHT", "LEFT")
+            is not None
+        ):
+            moved += 1
+        return moved
+
+    def _processing_key(self, consumer_id: str) -> str:
+        return f"{self.queue_name}:processing:{consumer_id}"
+
+    def _alive_key(self, consumer_id: str) -> str:
+        return f"{self.queue_name}:alive:{consumer_id}"
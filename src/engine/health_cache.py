@@ -0,0 +1,174 @@
+"""Bounded TTL cache for adapter health-check results."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.adapters.base import HealthStatus
+from src.config import settings
+
+
+class HealthCache:
+    """LRU cache of :class:`HealthStatus` keyed by asset ID.
+
+    Entries expire after a freshness window chosen per ``sku_category``
+    (``ttl_by_category``), falling back to ``default_ttl_ms``; a window of 0
+    disables caching for that category. The least recently used entry is
+    evicted once ``max_entries`` is reached.
+
+    With a ``redis_client`` the cache is two-level: local misses are looked up
+    in Redis with one ``MGET`` and fresh results are written back with a
+    matching ``PX`` expiry, so workers on other hosts reuse each other's
+    checks.
+    """
+
+    MAX_ENTRIES = settings.health_cache_max_entries
+    DEFAULT_TTL_MS = settings.health_cache_ttl_ms
+    TTL_BY_CATEGORY = settings.health_cache_ttl_by_category
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        default_ttl_ms: Optional[float] = None,
+        ttl_by_category: Optional[Mapping[str, float]] = None,
+        redis_client=None,
+        key_prefix: str = "creep:health:",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries or self.MAX_ENTRIES))
+        self.default_ttl_ms = float(self.DEFAULT_TTL_MS if default_ttl_ms is None else default_ttl_ms)
+        self.ttl_by_category: Dict[str, float] = dict(
+            self.TTL_BY_CATEGORY if ttl_by_category is None else ttl_by_category
+        )
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, HealthStatus]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.remote_hits = 0
+        self.evictions = 0
+
+    def ttl_ms(self, sku_category: Optional[str] = None) -> float:
+        if sku_category is not None and sku_category in self.ttl_by_category:
+            return float(self.ttl_by_category[sku_category])
+        return self.default_ttl_ms
+
+    def get_many(
+        self, asset_ids: Sequence[str], categories: Optional[Sequence[Optional[str]]] = None
+    ) -> Dict[str, HealthStatus]:
+        """Return the fresh cached statuses among ``asset_ids``."""
+
+        categories = categories or [None] * len(asset_ids)
+        found: Dict[str, HealthStatus] = {}
+        remote: List[Tuple[str, Optional[str]]] = []
+        now = self._clock()
+        with self._lock:
+            for asset_id, category in zip(asset_ids, categories):
+                if self.ttl_ms(category) <= 0:
+                    self.misses += 1
+                    continue
+                entry = self._entries.get(asset_id)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(asset_id)
+                    found[asset_id] = entry[1]
+                    self.hits += 1
+                    continue
+                if entry is not None:
+                    del self._entries[asset_id]
+                remote.append((asset_id, category))
+
+        if remote and self.redis_client is not None:
+            for (asset_id, category), status in zip(remote, self._remote_get([a for a, _ in remote])):
+                if status is None:
+                    continue
+                found[asset_id] = status
+                self._store(asset_id, status, category)
+                with self._lock:
+                    self.remote_hits += 1
+
+        with self._lock:
+            self.misses += sum(1 for asset_id, _ in remote if asset_id not in found)
+        return found
+
+    def put_many(
+        self,
+        statuses: Iterable[Tuple[str, HealthStatus]],
+        categories: Optional[Sequence[Optional[str]]] = None,
+    ) -> None:
+        """Cache fresh results and publish them to Redis when configured."""
+
+        statuses = list(statuses)
+        categories = categories or [None] * len(statuses)
+        published: List[Tuple[str, HealthStatus, float]] = []
+        for (asset_id, status), category in zip(statuses, categories):
+            ttl_ms = self._store(asset_id, status, category)
+            if ttl_ms > 0:
+                published.append((asset_id, status, ttl_ms))
+
+        if published and self.redis_client is not None:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for asset_id, status, ttl_ms in published:
+                pipeline.set(self._key(asset_id), self._encode(status), px=int(ttl_ms))
+            pipeline.execute()
+
+    def invalidate(self, asset_ids: Iterable[str]) -> None:
+        asset_ids = list(asset_ids)
+        with self._lock:
+            for asset_id in asset_ids:
+                self._entries.pop(asset_id, None)
+        if asset_ids and self.redis_client is not None:
+            self.redis_client.delete(*(self._key(asset_id) for asset_id in asset_ids))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _store(self, asset_id: str, status: HealthStatus, category: Optional[str]) -> float:
+        ttl_ms = self.ttl_ms(category)
+        if ttl_ms <= 0:
+            return ttl_ms
+        with self._lock:
+            self._entries[asset_id] = (self._clock() + ttl_ms / 1000.0, status)
+            self._entries.move_to_end(asset_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return ttl_ms
+
+    def _remote_get(self, asset_ids: List[str]) -> List[Optional[HealthStatus]]:
+        raw_values = self.redis_client.mget([self._key(asset_id) for asset_id in asset_ids])
+        return [self._decode(raw) if raw is not None else None for raw in raw_values]
+
+    def _key(self, asset_id: str) -> str:
+        return f"{self.key_prefix}{asset_id}"
+
+    @staticmethod
+    def _encode(status: HealthStatus) -> str:
+        encoded = dict(status)
+        checked_at = encoded.get("checked_at")
+        if isinstance(checked_at, datetime):
+            encoded["checked_at"] = checked_at.isoformat()
+        return json.dumps(encoded)
+
+    @staticmethod
+    def _decode(raw) -> Optional[HealthStatus]:
+        try:
+            if isinstance(raw, bytes):
+                raw = raw.decode()
+            status = json.loads(raw)
+        except ValueError:
+            return None
+        if isinstance(status.get("checked_at"), str):
+            status["checked_at"] = datetime.fromisoformat(status["checked_at"])
+        return status
@@ -0,0 +1,222 @@
+"""In-process index of READY assets for the Loader."""
+
+import json
+import select
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from src.config import settings
+from src.engine.sku_pattern import compile_sku_pattern
+
+
+class _TrieNode:
+    __slots__ = ("children", "asset_ids")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.asset_ids: Set[str] = set()
+
+
+class InventoryIndex:
+    """READY asset IDs per ``sku_category``, in a trie over dotted sku codes.
+
+    Exact codes resolve with one walk down the trie; glob hints walk their
+    literal leading segments (``ip.residential.uk`` for
+    ``ip.residential.uk.*``) and only match the subtree below. Globs use the
+    same compiled :class:`~src.engine.sku_pattern.SkuPattern` as the Loader's
+    SQL.
+
+    The index is seeded from ``creep_assets`` and kept current from the asset
+    change notifications (the opt-in
+    ``deploy/sql/creep_assets_deadline_notify_v1_1.sql``) via :meth:`poll`. It is advisory: the Loader re-checks every candidate
+    when locking it by primary key, so a stale entry only costs a fallback
+    scan, never a wrong binding.
+    """
+
+    CHANNEL = settings.janitor_notify_channel
+
+    SEED_READY_SQL = (
+        "SELECT id, sku_category, sku_code, attributes FROM creep_assets WHERE status='READY'"
+    )
+
+    def __init__(self) -> None:
+        self._roots: Dict[str, _TrieNode] = {}
+        # asset_id -> (sku_category, sku_code, attributes or None when unknown)
+        self._assets: Dict[str, Tuple[str, str, Optional[Dict]]] = {}
+        self._lock = threading.Lock()
+        self._listen_conn = None
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._assets
+
+    def start(self, listen_conn) -> int:
+        """``LISTEN`` on a dedicated autocommit connection, then seed."""
+
+        self._listen_conn = listen_conn
+        listen_conn.autocommit = True
+        with listen_conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.CHANNEL}")
+            cursor.execute(self.SEED_READY_SQL)
+            rows = cursor.fetchall()
+        for asset_id, sku_category, sku_code, attributes in rows:
+            self.add(str(asset_id), sku_category, sku_code, attributes)
+        return len(rows)
+
+    def poll(self, timeout: float = 0.0) -> int:
+        """Apply pending change notifications; returns how many changes were applied.
+
+        A notification carries one change object or an array of them.
+        """
+
+        if self._listen_conn is None:
+            return 0
+        if timeout > 0:
+            select.select([self._listen_conn], [], [], timeout)
+        self._listen_conn.poll()
+        applied = 0
+        while self._listen_conn.notifies:
+            notification = self._listen_conn.notifies.pop(0)
+            try:
+                changes = json.loads(notification.payload)
+            except ValueError:
+                continue
+            for change in changes if isinstance(changes, list) else [changes]:
+                if isinstance(change, Mapping):
+                    self.apply_change(change)
+                    applied += 1
+        return applied
+
+    def apply_change(self, change: Mapping) -> None:
+        """Apply one asset change notification.
+
+        Notifications leave the attributes out (they are unbounded JSONB and
+        NOTIFY payloads are not), so a notified READY asset is indexed with
+        unknown attributes.
+        """
+
+        asset_id = change.get("id")
+        if asset_id is None:
+            return
+        asset_id = str(asset_id)
+        if change.get("status") == "READY" and change.get("sku_category"):
+            self.add(
+                asset_id,
+                change["sku_category"],
+                change.get("sku_code") or "",
+                change.get("attributes"),
+            )
+        else:
+            self.discard([asset_id])
+
+    def add(
+        self, asset_id: str, sku_category: str, sku_code: str, attributes: Optional[Dict] = None
+    ) -> None:
+        if isinstance(attributes, str):
+            attributes = json.loads(attributes)
+        with self._lock:
+            self._remove(asset_id)
+            node = self._roots.setdefault(sku_category, _TrieNode())
+            for segment in sku_code.split("."):
+                node = node.children.setdefault(segment, _TrieNode())
+            node.asset_ids.add(asset_id)
+            self._assets[asset_id] = (sku_category, sku_code, attributes)
+
+    def discard(self, asset_ids: Iterable[str]) -> None:
+        with self._lock:
+            for asset_id in asset_ids:
+                self._remove(str(asset_id))
+
+    def candidates(
+        self,
+        sku_category: str,
+        sku_code: Optional[str] = None,
+        attributes: Optional[Mapping] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """READY asset IDs matching a hint, at most ``limit`` of them.
+
+        Assets whose attributes are unknown are returned as candidates and
+        left for the database to filter.
+        """
+
+        with self._lock:
+            root = self._roots.get(sku_category)
+            if root is None:
+                return []
+
+            found: List[str] = []
+            for asset_id in self._matching(root, sku_code):
+                known_attributes = self._assets[asset_id][2]
+                if attributes and known_attributes is not None and not _contains(
+                    known_attributes, attributes
+                ):
+                    continue
+                found.append(asset_id)
+                if limit is not None and len(found) >= limit:
+                    break
+            return found
+
+    def _matching(self, root: _TrieNode, sku_code: Optional[str]) -> Iterator[str]:
+        if sku_code is None:
+            yield from self._walk(root)
+            return
+
+        pattern = compile_sku_pattern(sku_code)
+        segments = sku_code.split(".")
+        node = root
+        if pattern.literal is None:
+            # Walk the whole literal segments only; glob-match the subtree below.
+            segments = pattern.literal_prefix.split(".")[:-1]
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return
+        if pattern.literal is not None:
+            # Exact code: only the assets stored on this node qualify.
+            yield from node.asset_ids
+            return
+        for asset_id in self._walk(node):
+            if pattern.matches(self._assets[asset_id][1]):
+                yield asset_id
+
+    @staticmethod
+    def _walk(node: _TrieNode) -> Iterator[str]:
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield from current.asset_ids
+            stack.extend(current.children.values())
+
+    def _remove(self, asset_id: str) -> None:
+        entry = self._assets.pop(asset_id, None)
+        if entry is None:
+            return
+        sku_category, sku_code, _attributes = entry
+        root = self._roots.get(sku_category)
+        if root is None:
+            return
+        path = [root]
+        for segment in sku_code.split("."):
+            child = path[-1].children.get(segment)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].asset_ids.discard(asset_id)
+        # Prune branches left empty so churn does not grow the trie.
+        segments = sku_code.split(".")
+        for depth in range(len(segments), 0, -1):
+            current = path[depth]
+            if current.asset_ids or current.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+        if not root.children and not root.asset_ids:
+            del self._roots[sku_category]
+
+
+def _contains(attributes: Mapping, required: Mapping) -> bool:
+    """Top-level subset test mirroring ``attributes @> required`` for flat hints."""
+
+    return all(attributes.get(key) == value for key, value in required.items())
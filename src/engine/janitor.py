@@ -1,6 +1,7 @@
 """Background reconciliation loops for asset lifecycle transitions."""
 
-from typing import List, Sequence
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 from src.config import settings
 
@@ -10,97 +11,316 @@ class Janitor:
 
     BATCH_SIZE = settings.janitor_batch_size
     MAX_PROCESS_LIMIT = settings.janitor_max_process_limit
+    MIN_BATCH_SIZE = settings.janitor_min_batch_size
+    MAX_BATCH_SIZE = settings.janitor_max_batch_size
+    # Backlog counts stop here; enough to tell "a few passes" from "many".
+    BACKLOG_COUNT_LIMIT = 10000
+    TARGET_COMMIT_MS = settings.janitor_target_commit_ms
 
-    SELECT_EXPIRED_LOCKS_SQL = (
-        "SELECT id FROM creep_assets "
-        "WHERE status='LOCKED' AND lock_expires_at < CURRENT_TIMESTAMP "
+    # Each statement locks, transitions and journals one batch: the UPDATE
+    # picks its rows through a SKIP LOCKED subquery and its RETURNING rows feed
+    # the asset_events INSERT, so a batch costs one round trip however many
+    # assets it moves. Data-modifying CTEs always run to completion, even
+    # though the outer SELECT only reads the UPDATE's output.
+    _LOCK_RECOVERY_SET = (
+        "SET status='READY', lock_id=NULL, lock_expires_at=NULL, current_concurrency=0, "
+        "fail_count=COALESCE(fail_count, 0) + 1 "
+    )
+    _COOLING_END_SET = "SET status='READY', cool_down_until=NULL "
+    _RECORD_EVENTS = (
+        "events AS ("
+        "INSERT INTO asset_events (asset_id, event_type, occurred_at, recorded_at) "
+        "SELECT id, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM moved"
+        ") "
+        "SELECT id FROM moved"
+    )
+
+    _EXPIRED_LOCKS = "status='LOCKED' AND lock_expires_at < CURRENT_TIMESTAMP"
+    _EXPIRED_COOLING = "status='COOLING' AND cool_down_until < CURRENT_TIMESTAMP"
+    _EXPIRED_LEASES = "status='ACTIVE' AND expires_at < CURRENT_TIMESTAMP"
+    # Stable shard of an asset: parameters are (shard_count, shard_index).
+    _SHARD = " AND mod(hashtext(id::text) & 2147483647, %s) = %s"
+    # The same shard, applied to leases through their asset.
+    _LEASE_SHARD = " AND mod(hashtext(asset_id::text) & 2147483647, %s) = %s"
+    # Recovering an asset ends whatever leases it still has.
+    _REVOKE_LEASES = (
+        "revoked AS ("
+        "UPDATE leases SET status='EXPIRED' "
+        "WHERE asset_id IN (SELECT id FROM moved) AND status='ACTIVE'"
+        "), "
+    )
+
+    RECOVER_EXPIRED_LOCKS_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _LOCK_RECOVERY_SET +
+        "WHERE id IN ("
+        "SELECT id FROM creep_assets WHERE " + _EXPIRED_LOCKS + " "
+        "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING id"
+        "), " + _REVOKE_LEASES + _RECORD_EVENTS
+    )
+    RECOVER_EXPIRED_COOLING_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _COOLING_END_SET +
+        "WHERE id IN ("
+        "SELECT id FROM creep_assets WHERE " + _EXPIRED_COOLING + " "
+        "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING id"
+        "), " + _RECORD_EVENTS
+    )
+    RECOVER_EXPIRED_LOCKS_SHARD_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _LOCK_RECOVERY_SET +
+        "WHERE id IN ("
+        "SELECT id FROM creep_assets WHERE " + _EXPIRED_LOCKS + _SHARD + " "
         "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING id"
+        "), " + _REVOKE_LEASES + _RECORD_EVENTS
     )
-    RECOVER_LOCKS_SQL = (
-        "UPDATE creep_assets "
-        "SET status='READY', lock_id=NULL, lock_expires_at=NULL, fail_count=COALESCE(fail_count, 0) + 1 "
-        "WHERE id = ANY(%s)"
+    RECOVER_EXPIRED_COOLING_SHARD_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _COOLING_END_SET +
+        "WHERE id IN ("
+        "SELECT id FROM creep_assets WHERE " + _EXPIRED_COOLING + _SHARD + " "
+        "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING id"
+        "), " + _RECORD_EVENTS
     )
 
-    SELECT_EXPIRED_COOLING_SQL = (
-        "SELECT id FROM creep_assets "
-        "WHERE status='COOLING' AND cool_down_until < CURRENT_TIMESTAMP "
+    # Lease-driven reclamation: expires overdue ACTIVE leases (walking the
+    # partial index from deploy/sql/leases_v1_1.sql), frees one slot per lease
+    # and returns EXCLUSIVE assets to READY, all in one statement per batch.
+    # An EXCLUSIVE asset is only released while it is still LOCKED for that
+    # lease, so a lease recovered earlier through lock_expires_at cannot free
+    # the asset's next holder. ``moved`` yields one asset ID per lease.
+    _RELEASE_LEASED_ASSETS = (
+        "released AS ("
+        "UPDATE creep_assets AS a SET "
+        "status = CASE WHEN a.concurrency_mode='SHARED' THEN a.status ELSE 'READY' END, "
+        "lock_id = CASE WHEN a.concurrency_mode='SHARED' THEN a.lock_id END, "
+        "lock_expires_at = CASE WHEN a.concurrency_mode='SHARED' THEN a.lock_expires_at END, "
+        "fail_count = COALESCE(a.fail_count, 0) + "
+        "CASE WHEN a.concurrency_mode='SHARED' THEN 0 ELSE 1 END, "
+        "current_concurrency = GREATEST(a.current_concurrency - e.ended, 0) "
+        "FROM ("
+        "SELECT asset_id, count(*) AS ended, array_agg(lease_id::text) AS lease_ids "
+        "FROM expired GROUP BY asset_id"
+        ") e "
+        "WHERE a.id = e.asset_id AND ("
+        "a.concurrency_mode='SHARED' "
+        "OR (a.status='LOCKED' AND (a.lock_id IS NULL OR a.lock_id::text = ANY(e.lease_ids)))"
+        ")"
+        "), moved AS (SELECT asset_id AS id FROM expired), "
+    )
+    RECLAIM_EXPIRED_LEASES_SQL = (
+        "WITH expired AS ("
+        "UPDATE leases SET status='EXPIRED' "
+        "WHERE lease_id IN ("
+        "SELECT lease_id FROM leases WHERE " + _EXPIRED_LEASES + " "
+        "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING lease_id, asset_id"
+        "), " + _RELEASE_LEASED_ASSETS + _RECORD_EVENTS
+    )
+    RECLAIM_EXPIRED_LEASES_SHARD_SQL = (
+        "WITH expired AS ("
+        "UPDATE leases SET status='EXPIRED' "
+        "WHERE lease_id IN ("
+        "SELECT lease_id FROM leases WHERE " + _EXPIRED_LEASES + _LEASE_SHARD + " "
         "FOR UPDATE SKIP LOCKED LIMIT %s"
+        ") "
+        "RETURNING lease_id, asset_id"
+        "), " + _RELEASE_LEASED_ASSETS + _RECORD_EVENTS
     )
-    RECOVER_COOLING_SQL = "UPDATE creep_assets SET status='READY', cool_down_until=NULL WHERE id = ANY(%s)"
 
-    INSERT_EVENT_SQL = (
-        "INSERT INTO asset_events (asset_id, event_type, occurred_at, recorded_at) "
-        "VALUES (%s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+    # Overdue rows per kind, each count stopping at BACKLOG_COUNT_LIMIT so a
+    # large backlog costs a bounded index scan rather than a full count.
+    COUNT_BACKLOG_SQL = (
+        "SELECT "
+        "(SELECT count(*) FROM (SELECT 1 FROM creep_assets WHERE " + _EXPIRED_LOCKS + " "
+        "LIMIT %s) l), "
+        "(SELECT count(*) FROM (SELECT 1 FROM creep_assets WHERE " + _EXPIRED_COOLING + " "
+        "LIMIT %s) c)"
+    )
+    COUNT_BACKLOG_SHARD_SQL = (
+        "SELECT "
+        "(SELECT count(*) FROM (SELECT 1 FROM creep_assets WHERE " + _EXPIRED_LOCKS + _SHARD + " "
+        "LIMIT %s) l), "
+        "(SELECT count(*) FROM (SELECT 1 FROM creep_assets WHERE " + _EXPIRED_COOLING + _SHARD + " "
+        "LIMIT %s) c)"
     )
 
-    def __init__(self, db_conn) -> None:
+    RECOVER_LOCKS_BY_ID_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _LOCK_RECOVERY_SET +
+        "WHERE id = ANY(%s) AND status='LOCKED' AND lock_expires_at < CURRENT_TIMESTAMP "
+        "RETURNING id"
+        "), " + _REVOKE_LEASES + _RECORD_EVENTS
+    )
+    END_COOLING_BY_ID_SQL = (
+        "WITH moved AS ("
+        "UPDATE creep_assets " + _COOLING_END_SET +
+        "WHERE id = ANY(%s) AND status='COOLING' AND cool_down_until < CURRENT_TIMESTAMP "
+        "RETURNING id"
+        "), " + _RECORD_EVENTS
+    )
+
+    def __init__(
+        self,
+        db_conn,
+        shard: Optional[Tuple[int, int]] = None,
+        adaptive: bool = False,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """``shard`` is ``(index, count)``; the janitor then only touches
+        assets whose ID hashes into that shard. With ``adaptive`` the batch
+        size follows commit latency (see :meth:`_adapt_batch_size`).
+        """
+
         self.db_conn = db_conn
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError(f"invalid shard {shard!r}")
+        self.shard = shard
+        self.adaptive = adaptive
+        self.batch_size = self.BATCH_SIZE
+        self.last_commit_ms: Optional[float] = None
+        self._clock = clock
 
     def run_once(self) -> None:
         """Execute one pass of each reconciliation routine."""
 
+        self.reclaim_expired_leases()
         self.recover_timeouts()
         self.process_cooling()
 
-    def recover_timeouts(self) -> List[str]:
-        """Release assets whose locks have expired."""
+    def recover_locks(self, asset_ids: Sequence[str]) -> List[str]:
+        """Release the given assets if their locks have expired.
 
-        processed_count = 0
-        recovered_assets: List[str] = []
+        Used by :class:`src.engine.janitor_scheduler.JanitorScheduler` when a
+        tracked deadline fires; the expiry is re-checked in the statement, so
+        assets that were extended or released meanwhile are left alone.
+        """
 
-        try:
-            with self.db_conn.cursor() as cursor:
-                while processed_count < self.MAX_PROCESS_LIMIT:
-                    cursor.execute(self.SELECT_EXPIRED_LOCKS_SQL, (self.BATCH_SIZE,))
-                    rows: Sequence[Sequence[str]] = cursor.fetchall()
-                    asset_ids = [row[0] for row in rows]
+        return self._reconcile_ids(self.RECOVER_LOCKS_BY_ID_SQL, asset_ids, "LOCK_TIMEOUT_RECOVERY")
 
-                    if not asset_ids:
-                        self.db_conn.rollback()
-                        return recovered_assets
+    def end_cooling(self, asset_ids: Sequence[str]) -> List[str]:
+        """Return the given assets to READY if their cooldown has elapsed."""
 
-                    cursor.execute(self.RECOVER_LOCKS_SQL, (asset_ids,))
-                    for asset_id in asset_ids:
-                        cursor.execute(self.INSERT_EVENT_SQL, (asset_id, "LOCK_TIMEOUT_RECOVERY"))
+        return self._reconcile_ids(self.END_COOLING_BY_ID_SQL, asset_ids, "COOLING_ENDED")
 
-                    recovered_assets.extend(asset_ids)
-                    processed_count += len(asset_ids)
-                    self.db_conn.commit()
+    def _reconcile_ids(self, sql: str, asset_ids: Sequence[str], event_type: str) -> List[str]:
+        if not asset_ids:
+            return []
 
-                    if len(asset_ids) < self.BATCH_SIZE or processed_count >= self.MAX_PROCESS_LIMIT:
-                        return recovered_assets
+        try:
+            with self.db_conn.cursor() as cursor:
+                cursor.execute(sql, (list(asset_ids), event_type))
+                reconciled = [row[0] for row in cursor.fetchall()]
+            self.db_conn.commit()
         except Exception:
             self.db_conn.rollback()
             raise
+        return reconciled
+
+    def recover_timeouts(self) -> List[str]:
+        """Release assets whose locks have expired, ending their leases.
+
+        Covers LOCKED assets the lease sweep cannot attribute to a lease.
+        """
+
+        if self.shard is None:
+            return self._sweep(self.RECOVER_EXPIRED_LOCKS_SQL, "LOCK_TIMEOUT_RECOVERY")
+        return self._sweep(self.RECOVER_EXPIRED_LOCKS_SHARD_SQL, "LOCK_TIMEOUT_RECOVERY")
+
+    def reclaim_expired_leases(self) -> List[str]:
+        """Expire overdue ACTIVE leases and release their assets.
+
+        SHARED assets get a slot back per lease; EXCLUSIVE assets return to
+        READY. Returns one asset ID per expired lease.
+        """
+
+        if self.shard is None:
+            return self._sweep(self.RECLAIM_EXPIRED_LEASES_SQL, "LEASE_EXPIRED")
+        return self._sweep(self.RECLAIM_EXPIRED_LEASES_SHARD_SQL, "LEASE_EXPIRED")
 
     def process_cooling(self) -> List[str]:
         """Return cooled assets to the READY pool."""
 
-        processed_count = 0
-        cooled_assets: List[str] = []
+        if self.shard is None:
+            return self._sweep(self.RECOVER_EXPIRED_COOLING_SQL, "COOLING_ENDED")
+        return self._sweep(self.RECOVER_EXPIRED_COOLING_SHARD_SQL, "COOLING_ENDED")
+
+    def backlog(self) -> Dict[str, int]:
+        """Count assets (in this shard) that are past their deadline.
+
+        Each count is capped at ``BACKLOG_COUNT_LIMIT``; a capped value means
+        "at least that many".
+        """
+
+        limit = self.BACKLOG_COUNT_LIMIT
+        try:
+            with self.db_conn.cursor() as cursor:
+                if self.shard is None:
+                    cursor.execute(self.COUNT_BACKLOG_SQL, (limit, limit))
+                else:
+                    shard = self._shard_params()
+                    cursor.execute(self.COUNT_BACKLOG_SHARD_SQL, (*shard, limit, *shard, limit))
+                expired_locks, expired_cooling = cursor.fetchone()
+            self.db_conn.rollback()
+        except Exception:
+            self.db_conn.rollback()
+            raise
+        return {"expired_locks": int(expired_locks or 0), "expired_cooling": int(expired_cooling or 0)}
+
+    def _sweep(self, sql: str, event_type: str) -> List[str]:
+        """Run ``sql`` batch by batch, committing each, up to ``MAX_PROCESS_LIMIT``."""
+
+        processed: List[str] = []
 
         try:
             with self.db_conn.cursor() as cursor:
-                while processed_count < self.MAX_PROCESS_LIMIT:
-                    cursor.execute(self.SELECT_EXPIRED_COOLING_SQL, (self.BATCH_SIZE,))
+                while len(processed) < self.MAX_PROCESS_LIMIT:
+                    limit = min(self.batch_size, self.MAX_PROCESS_LIMIT - len(processed))
+                    started = self._clock()
+                    cursor.execute(sql, self._shard_params() + (limit, event_type))
                     rows: Sequence[Sequence[str]] = cursor.fetchall()
                     asset_ids = [row[0] for row in rows]
 
                     if not asset_ids:
                         self.db_conn.rollback()
-                        return cooled_assets
-
-                    cursor.execute(self.RECOVER_COOLING_SQL, (asset_ids,))
-                    for asset_id in asset_ids:
-                        cursor.execute(self.INSERT_EVENT_SQL, (asset_id, "COOLING_ENDED"))
+                        return processed
 
-                    cooled_assets.extend(asset_ids)
-                    processed_count += len(asset_ids)
+                    processed.extend(asset_ids)
                     self.db_conn.commit()
+                    self.last_commit_ms = (self._clock() - started) * 1000.0
+                    if self.adaptive:
+                        self._adapt_batch_size(len(asset_ids) == limit)
 
-                    if len(asset_ids) < self.BATCH_SIZE or processed_count >= self.MAX_PROCESS_LIMIT:
-                        return cooled_assets
+                    if len(asset_ids) < limit:
+                        return processed
         except Exception:
             self.db_conn.rollback()
             raise
+        return processed
+
+    def _adapt_batch_size(self, batch_was_full: bool) -> None:
+        """AIMD on commit latency: halve above target, grow while batches fill.
+
+        Large batches drain a backlog with fewer round trips, but hold row
+        locks and WAL longer; the target keeps each transaction short.
+        """
+
+        if self.last_commit_ms > self.TARGET_COMMIT_MS:
+            self.batch_size = max(self.MIN_BATCH_SIZE, self.batch_size // 2)
+        elif batch_was_full:
+            self.batch_size = min(self.MAX_BATCH_SIZE, self.batch_size + self.BATCH_SIZE)
+
+    def _shard_params(self) -> Tuple[int, ...]:
+        if self.shard is None:
+            return ()
+        index, count = self.shard
+        return (count, index)
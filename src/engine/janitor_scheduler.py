@@ -0,0 +1,206 @@
+"""Event-driven janitor that fires reconciliation at each asset's deadline."""
+
+import json
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from src.config import settings
+from src.engine.janitor import Janitor
+from src.engine.timer_wheel import TimerWheel
+
+
+LOGGER = logging.getLogger(__name__)
+
+LOCK_EXPIRY = "LOCKED"
+COOLING_EXPIRY = "COOLING"
+
+
+class JanitorScheduler:
+    """Tracks lock and cooldown deadlines in a :class:`TimerWheel`.
+
+    The wheel is seeded once from the LOCKED/COOLING rows and then kept
+    current from the ``creep_asset_deadlines`` notifications published by
+    ``deploy/sql/creep_assets_deadline_notify_v1_0.sql``, an opt-in migration
+    this scheduler requires. When deadlines come
+    due the matching assets are reconciled by ID in one statement, so cooled
+    assets return to READY within a tick of their cooldown instead of waiting
+    for the next table scan.
+
+    ``listen_conn`` must be a dedicated connection; it is switched to
+    autocommit for ``LISTEN``. A full :meth:`Janitor.run_once` sweep still runs
+    every ``sweep_interval_ms`` to cover notifications missed while
+    disconnected and clock skew between this host and the database.
+    """
+
+    CHANNEL = settings.janitor_notify_channel
+    TICK_MS = settings.janitor_tick_ms
+    SWEEP_INTERVAL_MS = settings.janitor_sweep_interval_ms
+    # Upper bound on a single wait so stop requests are noticed promptly.
+    MAX_WAIT_SECONDS = 1.0
+    # Deadlines the database did not consider due yet are retried this often.
+    RETRY_DELAY_SECONDS = 0.25
+    MAX_RETRIES = 3
+
+    SEED_DEADLINES_SQL = (
+        "SELECT id, status, EXTRACT(EPOCH FROM lock_expires_at), EXTRACT(EPOCH FROM cool_down_until) "
+        "FROM creep_assets "
+        "WHERE (status='LOCKED' AND lock_expires_at IS NOT NULL) "
+        "OR (status='COOLING' AND cool_down_until IS NOT NULL)"
+    )
+
+    def __init__(
+        self,
+        janitor: Janitor,
+        listen_conn,
+        wheel: Optional[TimerWheel] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.janitor = janitor
+        self.listen_conn = listen_conn
+        self._clock = clock
+        self.wheel = wheel or TimerWheel(clock(), tick_s=self.TICK_MS / 1000.0)
+        self._kinds: Dict[str, str] = {}
+        self._retries: Dict[str, int] = {}
+        self._swept_at: Optional[float] = None
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def start(self) -> int:
+        """Subscribe to deadline notifications, then seed the wheel.
+
+        ``LISTEN`` comes first so no change made while seeding is missed;
+        replaying a notification for a row already seeded is harmless.
+        """
+
+        self.listen_conn.autocommit = True
+        with self.listen_conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.CHANNEL}")
+            cursor.execute(self.SEED_DEADLINES_SQL)
+            rows = cursor.fetchall()
+        for asset_id, status, lock_expires_at, cool_down_until in rows:
+            self.track(str(asset_id), status, lock_expires_at, cool_down_until)
+        self._swept_at = self._clock()
+        return len(rows)
+
+    def track(
+        self,
+        asset_id: str,
+        status: Optional[str],
+        lock_expires_at: Optional[float],
+        cool_down_until: Optional[float],
+    ) -> None:
+        """Apply the latest known state of one asset to the wheel."""
+
+        self._retries.pop(asset_id, None)
+        if status == LOCK_EXPIRY and lock_expires_at is not None:
+            self._schedule(asset_id, LOCK_EXPIRY, float(lock_expires_at))
+        elif status == COOLING_EXPIRY and cool_down_until is not None:
+            self._schedule(asset_id, COOLING_EXPIRY, float(cool_down_until))
+        else:
+            self.wheel.cancel(asset_id)
+            self._kinds.pop(asset_id, None)
+
+    def handle_notification(self, payload: str) -> None:
+        """Apply one notification: a change object or an array of them."""
+
+        try:
+            changes = json.loads(payload)
+        except ValueError:
+            LOGGER.error("Ignoring malformed deadline notification: %s", payload)
+            return
+        for change in changes if isinstance(changes, list) else [changes]:
+            try:
+                asset_id = str(change["id"])
+            except (KeyError, TypeError):
+                LOGGER.error("Ignoring malformed deadline change: %s", change)
+                continue
+            self.track(
+                asset_id,
+                change.get("status"),
+                change.get("lock_expires_at"),
+                change.get("cool_down_until"),
+            )
+
+    def fire_due(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Reconcile every asset whose deadline has passed.
+
+        Returns the reconciled asset IDs per deadline kind.
+        """
+
+        now = self._clock() if now is None else now
+        due: Dict[str, List[str]] = {LOCK_EXPIRY: [], COOLING_EXPIRY: []}
+        for asset_id in self.wheel.advance(now):
+            kind = self._kinds.pop(asset_id, None)
+            if kind is not None:
+                due[kind].append(asset_id)
+
+        reconciled = {
+            LOCK_EXPIRY: self.janitor.recover_locks(due[LOCK_EXPIRY]),
+            COOLING_EXPIRY: self.janitor.end_cooling(due[COOLING_EXPIRY]),
+        }
+        for kind, asset_ids in due.items():
+            done = {str(asset_id) for asset_id in reconciled[kind]}
+            self._retry_unreconciled(kind, asset_ids, done, now)
+        return reconciled
+
+    def poll(self, timeout: float) -> int:
+        """Wait up to ``timeout`` seconds for notifications and apply them."""
+
+        if timeout > 0:
+            select.select([self.listen_conn], [], [], timeout)
+        self.listen_conn.poll()
+        handled = 0
+        while self.listen_conn.notifies:
+            notification = self.listen_conn.notifies.pop(0)
+            self.handle_notification(notification.payload)
+            handled += 1
+        return handled
+
+    def run_forever(self) -> None:
+        """Serve deadlines until :meth:`stop` is called."""
+
+        self.start()
+        while not self._stopping.is_set():
+            now = self._clock()
+            self.poll(self._wait_seconds(now))
+            self.fire_due()
+            self._sweep_if_due()
+
+    def _wait_seconds(self, now: float) -> float:
+        wait = self.wheel.seconds_until_next(now)
+        if wait is None:
+            return self.MAX_WAIT_SECONDS
+        return min(wait, self.MAX_WAIT_SECONDS)
+
+    def _sweep_if_due(self) -> None:
+        now = self._clock()
+        if self._swept_at is not None and (now - self._swept_at) * 1000.0 < self.SWEEP_INTERVAL_MS:
+            return
+        self._swept_at = now
+        self.janitor.run_once()
+
+    def _schedule(self, asset_id: str, kind: str, deadline: float) -> None:
+        self._kinds[asset_id] = kind
+        self.wheel.schedule(asset_id, deadline)
+
+    def _retry_unreconciled(
+        self, kind: str, asset_ids: List[str], reconciled: Set[str], now: float
+    ) -> None:
+        # The row may have moved on (its notification will update the wheel),
+        # or the database clock may still be short of the deadline. Retry a
+        # few times; the periodic sweep covers anything left after that.
+        for asset_id in asset_ids:
+            if asset_id in reconciled or asset_id in self._kinds:
+                self._retries.pop(asset_id, None)
+                continue
+            attempts = self._retries.get(asset_id, 0)
+            if attempts >= self.MAX_RETRIES:
+                self._retries.pop(asset_id, None)
+                continue
+            self._retries[asset_id] = attempts + 1
+            self._schedule(asset_id, kind, now + self.RETRY_DELAY_SECONDS)
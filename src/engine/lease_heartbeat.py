@@ -0,0 +1,131 @@
+"""Background renewal of the leases held by running tasks."""
+
+import logging
+import threading
+from typing import Iterable, List, Optional, Set
+
+from src.config import settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LeaseHeartbeat:
+    """Keeps the leases of in-flight tasks alive with one UPDATE per beat.
+
+    Every ``interval_ms`` all tracked leases that are still ACTIVE are pushed
+    to ``now + ttl_ms``, together with the lock deadline of their EXCLUSIVE
+    assets, in a single statement. A worker that dies stops beating, so its
+    leases lapse within ``ttl_ms`` and the janitor reclaims them
+    (:meth:`Janitor.reclaim_expired_leases`,
+    :meth:`Janitor.recover_timeouts`) instead of waiting out the task's full
+    ``timeout_ms``. The task's own deadline is unaffected: it still falls
+    ``timeout_ms`` after the claim, covering both the queue wait and the run.
+
+    Leases that are no longer ACTIVE (settled, or already reclaimed) are
+    dropped from tracking; the ones that were reclaimed while still tracked
+    are reported by :meth:`lost`. The heartbeat needs its own connection: it
+    commits from a background thread.
+    """
+
+    INTERVAL_MS = settings.lease_heartbeat_interval_ms
+    TTL_MS = settings.lease_heartbeat_ttl_ms
+
+    RENEW_LEASES_SQL = (
+        "WITH renewed AS ("
+        "UPDATE leases SET expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s) "
+        "WHERE lease_id = ANY(%s::uuid[]) AND status='ACTIVE' "
+        "RETURNING lease_id, asset_id, expires_at"
+        "), locked AS ("
+        "UPDATE creep_assets AS a SET lock_expires_at = r.expires_at "
+        "FROM renewed r "
+        "WHERE a.id = r.asset_id AND a.status='LOCKED' AND a.lock_id::text = r.lease_id::text"
+        ") "
+        "SELECT lease_id FROM renewed"
+    )
+
+    def __init__(
+        self,
+        db_conn,
+        interval_ms: Optional[float] = None,
+        ttl_ms: Optional[float] = None,
+    ) -> None:
+        self.db_conn = db_conn
+        self.interval_s = float(self.INTERVAL_MS if interval_ms is None else interval_ms) / 1000.0
+        self.ttl_s = float(self.TTL_MS if ttl_ms is None else ttl_ms) / 1000.0
+        if self.interval_s <= 0 or self.ttl_s <= self.interval_s:
+            raise ValueError("lease heartbeat TTL must exceed a positive interval")
+        self._tracked: Set[str] = set()
+        self._lost: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def track(self, lease_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._tracked.update(str(lease_id) for lease_id in lease_ids)
+
+    def untrack(self, lease_ids: Iterable[str]) -> None:
+        with self._lock:
+            for lease_id in lease_ids:
+                self._tracked.discard(str(lease_id))
+                self._lost.discard(str(lease_id))
+
+    def lost(self, lease_ids: Iterable[str]) -> List[str]:
+        """Those of ``lease_ids`` that stopped being ACTIVE while tracked."""
+
+        with self._lock:
+            return [str(lease_id) for lease_id in lease_ids if str(lease_id) in self._lost]
+
+    def beat(self) -> List[str]:
+        """Renew every tracked lease once; return the renewed lease IDs."""
+
+        with self._lock:
+            lease_ids = sorted(self._tracked)
+        if not lease_ids:
+            return []
+
+        try:
+            with self.db_conn.cursor() as cursor:
+                cursor.execute(self.RENEW_LEASES_SQL, (self.ttl_s, lease_ids))
+                renewed = [str(row[0]) for row in cursor.fetchall()]
+            self.db_conn.commit()
+        except Exception:
+            self.db_conn.rollback()
+            raise
+
+        gone = set(lease_ids) - set(renewed)
+        with self._lock:
+            # Leases untracked while the statement ran were settled, not lost.
+            gone &= self._tracked
+            self._tracked -= gone
+            self._lost |= gone
+        if gone:
+            LOGGER.warning("Lost %d lease(s) before settlement: %s", len(gone), sorted(gone))
+        return renewed
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="creep-lease-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval_s):
+            try:
+                self.beat()
+            except Exception:
+                # Keep beating: a lease lapses only after several missed beats.
+                LOGGER.exception("Lease heartbeat failed")
@@ -1,19 +1,80 @@
 """Loader that binds TaskOrders to assets and enqueues leases."""
 
 import json
+import logging
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Sequence
+from typing import Dict, List, Optional, Sequence
 
 from src.config import settings
+from src.engine.allocator import BomAllocator, HintKey, parse_bom
+from src.engine.inventory_index import InventoryIndex
+from src.engine.payload_codec import CODECS, Payload
+from src.engine.priority_queues import PriorityQueues
+from src.engine.sku_pattern import sql_pattern_params
+from src.engine.task_payload import encode_task_payload
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class LoaderBatchStats:
+    """Throughput counters for a single :meth:`Loader.sync` round."""
+
+    claimed: int = 0
+    bound: int = 0
+    deferred: int = 0
+    leases: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def tasks_per_second(self) -> float:
+        if self.elapsed_s <= 0:
+            return 0.0
+        return self.bound / self.elapsed_s
+
+
+@dataclass
+class BoundTask:
+    """A claimed task whose assets are locked within the current round."""
+
+    task_id: str
+    tenant_id: str
+    timeout_ms: int
+    assets: List[Dict]
+    lease_ids: List[str] = field(default_factory=list)
+    priority: Optional[int] = None
+    task_type: Optional[str] = None
+    # Lease dicts as the Worker uses them, embedded in version 2 payloads.
+    leases: List[Dict] = field(default_factory=list)
+    # When the leases expire as inserted, carried in payloads so the Worker's
+    # deadline counts from the claim rather than from the dequeue.
+    expires_at: Optional[datetime] = None
 
 
 class Loader:
     """Hydrates a Redis queue with task-aware lease payloads."""
 
     BATCH_SIZE = settings.loader_batch_size
+    BOM_PREFLIGHT = settings.loader_bom_preflight
+    PAYLOAD_VERSION = settings.loader_payload_version
+    PAYLOAD_CODEC = settings.loader_payload_codec
+    # Index candidates offered per wanted asset, to absorb entries that went
+    # stale or are locked by a concurrent loader.
+    INVENTORY_OVERFETCH = 4
+
+    # EXCLUSIVE assets leave the READY pool when locked; SHARED assets stay
+    # READY and hand out slots until current_concurrency reaches the limit.
+    # Either way the counter tracks the asset's ACTIVE leases.
+    _TAKE_SLOT_SET = (
+        "SET status = CASE WHEN a.concurrency_mode='SHARED' THEN a.status ELSE 'LOCKED' END, "
+        "current_concurrency = a.current_concurrency + 1 "
+    )
 
     CLAIM_PENDING_TASKS_SQL = (
-        "SELECT task_id, tenant_id, resource_hints, timeout_ms "
+        "SELECT task_id, tenant_id, resource_hints, timeout_ms, priority, task_type "
         "FROM task_orders "
         "WHERE status='PENDING' "
         "ORDER BY priority DESC, created_at ASC "
@@ -21,70 +82,290 @@ class Loader:
         "LIMIT %s"
     )
 
-    SELECT_CANDIDATE_ASSETS_SQL = (
-        "SELECT id, sku_category, sku_code, attributes "
-        "FROM creep_assets "
+    LOCK_ASSETS_SQL = (
+        "WITH candidates AS ("
+        "SELECT id FROM creep_assets "
         "WHERE status='READY' "
         "AND sku_category=%s "
-        "AND (%s IS NULL OR sku_code LIKE %s)"
+        "AND (%s::text IS NULL OR sku_code LIKE %s) "
+        "AND (%s::text IS NULL OR sku_code ~ %s) "
+        "AND attributes @> %s::jsonb "
+        "AND current_concurrency < concurrency_limit "
+        "AND NOT (id = ANY(%s::uuid[])) "
+        "LIMIT %s "
+        "FOR UPDATE SKIP LOCKED"
+        ") "
+        "UPDATE creep_assets AS a " + _TAKE_SLOT_SET +
+        "FROM candidates c WHERE a.id = c.id "
+        "RETURNING a.id, a.sku_category, a.sku_code, a.attributes, a.concurrency_mode"
     )
 
-    LOCK_ASSETS_SQL = (
-        "SELECT id, sku_category, sku_code, attributes "
-        "FROM creep_assets "
-        "WHERE status='READY' "
+    LOCK_ASSETS_BY_ID_SQL = (
+        "WITH candidates AS ("
+        "SELECT id FROM creep_assets "
+        "WHERE id = ANY(%s::uuid[]) "
+        "AND status='READY' "
         "AND sku_category=%s "
-        "AND (%s IS NULL OR sku_code LIKE %s) "
+        "AND (%s::text IS NULL OR sku_code LIKE %s) "
+        "AND (%s::text IS NULL OR sku_code ~ %s) "
+        "AND attributes @> %s::jsonb "
+        "AND current_concurrency < concurrency_limit "
+        "AND NOT (id = ANY(%s::uuid[])) "
+        "LIMIT %s "
         "FOR UPDATE SKIP LOCKED"
+        ") "
+        "UPDATE creep_assets AS a " + _TAKE_SLOT_SET +
+        "FROM candidates c WHERE a.id = c.id "
+        "RETURNING a.id, a.sku_category, a.sku_code, a.attributes, a.concurrency_mode"
     )
 
-    UPDATE_ASSET_STATUS_SQL = "UPDATE creep_assets SET status='LOCKED' WHERE id = ANY(%s)"
+    # Free READY slots per pool (one per EXCLUSIVE asset, the unused
+    # concurrency of SHARED ones), scanning at most the round's total demand
+    # in assets so large pools are not counted in full.
+    COUNT_READY_SQL = (
+        "SELECT h.ord, ("
+        "SELECT COALESCE(sum(slots), 0) FROM ("
+        "SELECT a.concurrency_limit - a.current_concurrency AS slots FROM creep_assets a "
+        "WHERE a.status='READY' "
+        "AND a.sku_category=h.sku_category "
+        "AND (h.like_pattern IS NULL OR a.sku_code LIKE h.like_pattern) "
+        "AND (h.sku_regex IS NULL OR a.sku_code ~ h.sku_regex) "
+        "AND a.attributes @> h.attributes "
+        "AND a.current_concurrency < a.concurrency_limit "
+        "LIMIT %s"
+        ") capped"
+        ") "
+        "FROM UNNEST(%s::text[], %s::text[], %s::text[], %s::jsonb[]) WITH ORDINALITY "
+        "AS h(sku_category, like_pattern, sku_regex, attributes, ord)"
+    )
 
-    INSERT_LEASE_SQL = (
+    # The lease and its EXCLUSIVE asset's lock deadline are written by one
+    # statement, so a LOCKED asset always carries the expiry the janitor and
+    # its scheduler reclaim it by. SHARED assets have no single deadline;
+    # their leases expire one by one. The asset columns the Worker needs are
+    # returned alongside each lease for embedding in the payload.
+    INSERT_LEASES_SQL = (
+        "WITH inserted AS ("
         "INSERT INTO leases (tenant_id, task_id, asset_id, expires_at, status) "
-        "VALUES (%s, %s, %s, %s, 'ACTIVE') RETURNING lease_id"
+        "SELECT t.tenant_id, t.task_id, t.asset_id, t.expires_at, 'ACTIVE' "
+        "FROM UNNEST(%s::varchar[], %s::uuid[], %s::uuid[], %s::timestamptz[]) "
+        "AS t(tenant_id, task_id, asset_id, expires_at) "
+        "RETURNING lease_id, task_id, asset_id, expires_at"
+        "), locked AS ("
+        "UPDATE creep_assets AS a SET lock_id = i.lease_id, lock_expires_at = i.expires_at "
+        "FROM inserted i WHERE a.id = i.asset_id AND a.concurrency_mode <> 'SHARED'"
+        ") "
+        "SELECT i.lease_id, i.task_id, i.asset_id, a.tenant_id, a.project_id, a.meta_spec, a.sku_category "
+        "FROM inserted i JOIN creep_assets a ON a.id = i.asset_id"
     )
 
-    UPDATE_TASK_STATUS_SQL = "UPDATE task_orders SET status='QUEUED' WHERE task_id=%s"
+    UPDATE_TASK_STATUS_SQL = "UPDATE task_orders SET status='QUEUED' WHERE task_id = ANY(%s)"
 
-    def __init__(self, db_conn, redis_client, queue_name: str = "creep:tasks") -> None:
+    SAVEPOINT_SQL = "SAVEPOINT loader_task"
+    ROLLBACK_TO_SAVEPOINT_SQL = "ROLLBACK TO SAVEPOINT loader_task"
+    RELEASE_SAVEPOINT_SQL = "RELEASE SAVEPOINT loader_task"
+
+    def __init__(
+        self,
+        db_conn,
+        redis_client,
+        queue_name: str = "creep:tasks",
+        queues: Optional[PriorityQueues] = None,
+        inventory: Optional[InventoryIndex] = None,
+        bom_preflight: Optional[bool] = None,
+        payload_version: Optional[int] = None,
+        payload_codec: Optional[str] = None,
+    ) -> None:
         self.db_conn = db_conn
         self.redis_client = redis_client
         self.queue_name = queue_name
-
-    def sync(self) -> List[str]:
-        """Lock assets for pending tasks, create leases, and enqueue payloads."""
+        self.queues = queues if queues is not None else PriorityQueues.from_settings(queue_name)
+        self.inventory = inventory
+        self.bom_preflight = self.BOM_PREFLIGHT if bom_preflight is None else bom_preflight
+        self.payload_version = self.PAYLOAD_VERSION if payload_version is None else payload_version
+        self.payload_codec = self.PAYLOAD_CODEC if payload_codec is None else payload_codec
+        if self.payload_codec not in CODECS:
+            raise ValueError(f"unknown payload codec: {self.payload_codec!r}")
+        self.last_stats: Optional[LoaderBatchStats] = None
+
+    def sync(self) -> List[Payload]:
+        """Lock assets for pending tasks, create leases, and enqueue payloads.
+
+        Every task claimed in the round is bound inside one transaction. Each
+        task runs under a savepoint so a task whose hints cannot be satisfied
+        only rolls back its own asset locks; it is deferred and stays PENDING
+        for a later round. Leases and task status updates for all bound tasks
+        are then written set-based, and their payloads are pushed to Redis in
+        a single pipeline after the commit.
+
+        With BOM preflight enabled, the READY stock of every pool the round
+        needs is counted in one statement first and tasks are admitted in
+        claim order only while their whole BOM still fits (see
+        :class:`~src.engine.allocator.BomAllocator`); the rest are deferred
+        before any of their rows is locked.
+
+        Payloads are versioned (:mod:`src.engine.task_payload`): version 2
+        embeds the task type, timeout and the leased assets' data so the
+        Worker can skip hydrating them; version 1 only carries the IDs. Both
+        carry the leases' expiry, which bounds the Worker's deadline.
+        Either is serialized with the configured codec
+        (:mod:`src.engine.payload_codec`).
+        """
+
+        started = time.perf_counter()
+        stats = LoaderBatchStats()
+        self.last_stats = stats
+        if self.inventory is not None:
+            self.inventory.poll()
 
         try:
             with self.db_conn.cursor() as cursor:
                 tasks = self._claim_tasks(cursor)
+                stats.claimed = len(tasks)
                 if not tasks:
                     self.db_conn.rollback()
                     return []
 
-                task_id, tenant_id, resource_hints, timeout_ms = tasks[0]
-                parsed_hints = self._parse_hints(resource_hints)
-
-                matching_assets = self._lock_assets_for_hints(
-                    cursor, tenant_id, parsed_hints
-                )
-                if not matching_assets:
+                hints = [self._parse_hints(task[2]) for task in tasks]
+                admitted = self._preflight(cursor, hints)
+
+                bound: List[BoundTask] = []
+                for task, task_hints, fits in zip(tasks, hints, admitted):
+                    task_id, tenant_id, _resource_hints, timeout_ms, priority, task_type = task
+                    assets = self._bind_task(cursor, tenant_id, task_hints) if fits else None
+                    if assets is None:
+                        stats.deferred += 1
+                        continue
+                    bound.append(
+                        BoundTask(
+                            task_id,
+                            tenant_id,
+                            timeout_ms,
+                            assets,
+                            priority=priority,
+                            task_type=task_type,
+                        )
+                    )
+
+                if not bound:
                     self.db_conn.rollback()
                     return []
 
-                lease_ids = self._insert_leases(cursor, tenant_id, task_id, timeout_ms, matching_assets)
-                cursor.execute(self.UPDATE_TASK_STATUS_SQL, (task_id,))
+                self._insert_leases(cursor, bound)
+                cursor.execute(self.UPDATE_TASK_STATUS_SQL, ([task.task_id for task in bound],))
 
             self.db_conn.commit()
-
-            payload = json.dumps({"task_id": task_id, "lease_ids": lease_ids})
-            self.redis_client.rpush(self.queue_name, payload)
-
-            return [payload]
         except Exception:
             self.db_conn.rollback()
             raise
 
+        if self.inventory is not None:
+            # Only committed locks leave the index; rolled-back ones stay READY,
+            # and so do SHARED assets (the by-ID lock rechecks their slots).
+            self.inventory.discard(
+                asset["asset_id"]
+                for task in bound
+                for asset in task.assets
+                if asset["concurrency_mode"] != "SHARED"
+            )
+
+        payloads = [
+            encode_task_payload(
+                task.task_id,
+                task.lease_ids,
+                task.task_type,
+                task.timeout_ms,
+                task.leases,
+                version=self.payload_version,
+                codec=self.payload_codec,
+                expires_at=int(task.expires_at.timestamp() * 1000) if task.timeout_ms else None,
+            )
+            for task in bound
+        ]
+        self._enqueue(bound, payloads)
+
+        stats.bound = len(bound)
+        stats.leases = sum(len(task.lease_ids) for task in bound)
+        stats.elapsed_s = time.perf_counter() - started
+        LOGGER.info(
+            "Loader batch: claimed=%d bound=%d deferred=%d leases=%d elapsed=%.3fs (%.1f tasks/s)",
+            stats.claimed,
+            stats.bound,
+            stats.deferred,
+            stats.leases,
+            stats.elapsed_s,
+            stats.tasks_per_second,
+        )
+        return payloads
+
+    def _preflight(self, cursor, hints: List[List[Dict]]) -> List[bool]:
+        """Which claimed tasks to try binding; all of them unless preflight is on."""
+
+        if not self.bom_preflight:
+            return [True] * len(hints)
+
+        boms = [parse_bom(task_hints) for task_hints in hints]
+        keys: List[HintKey] = list(
+            dict.fromkeys(key for bom in boms for key, _count in bom or ())
+        )
+        if not keys:
+            return [bom is not None for bom in boms]
+
+        demand = sum(count for bom in boms for _key, count in bom or ())
+        patterns = [sql_pattern_params(key.sku_code) for key in keys]
+        cursor.execute(
+            self.COUNT_READY_SQL,
+            (
+                demand,
+                [key.sku_category for key in keys],
+                [params[0] for params in patterns],
+                [params[2] for params in patterns],
+                [key.attributes for key in keys],
+            ),
+        )
+        capacity = {keys[int(ordinal) - 1]: int(count) for ordinal, count in cursor.fetchall()}
+        return BomAllocator(capacity).allocate(boms)
+
+    def _bind_task(self, cursor, tenant_id: str, hints: List[Dict]) -> Optional[List[Dict]]:
+        """Lock assets for one claimed task; return them or ``None`` when deferred."""
+
+        cursor.execute(self.SAVEPOINT_SQL)
+        matching_assets = self._lock_assets_for_hints(cursor, tenant_id, hints)
+        if not matching_assets:
+            cursor.execute(self.ROLLBACK_TO_SAVEPOINT_SQL)
+            return None
+
+        cursor.execute(self.RELEASE_SAVEPOINT_SQL)
+        return matching_assets
+
+    def _enqueue(self, bound: List[BoundTask], payloads: List[Payload]) -> None:
+        """Push payloads in one pipeline, routed by priority band when configured.
+
+        Claim order (priority, then age) is preserved within each queue.
+        """
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        if self.queues is None:
+            pipeline.rpush(self.queue_name, *payloads)
+            pipeline.execute()
+            return
+
+        routed: Dict[str, List[Payload]] = {}
+        tenants: Dict[str, set] = {}
+        for task, payload in zip(bound, payloads):
+            queue = self.queues.queue_for(task.priority, task.tenant_id)
+            routed.setdefault(queue, []).append(payload)
+            if self.queues.per_tenant:
+                band = self.queues.band_for(task.priority)
+                tenants.setdefault(self.queues.tenants_key(band), set()).add(task.tenant_id)
+        for queue, queued in routed.items():
+            pipeline.rpush(queue, *queued)
+        # Register tenants after their payloads so a dispenser never sees an
+        # advertised tenant list that is still empty.
+        for key, members in tenants.items():
+            pipeline.sadd(key, *sorted(members))
+        pipeline.execute()
+
     def _claim_tasks(self, cursor) -> Sequence[Sequence]:
         cursor.execute(self.CLAIM_PENDING_TASKS_SQL, (self.BATCH_SIZE,))
         return cursor.fetchall()
@@ -105,76 +386,118 @@ class Loader:
             if not sku_category:
                 return []
 
-            candidates = self._find_candidates(cursor, sku_category, sku_code, attributes)
-            if len(candidates) < min_count:
-                return []
-
-            locked = self._lock_candidates(cursor, sku_category, sku_code, attributes, min_count)
+            # A SHARED asset stays lockable, but one task holds it at most once.
+            taken = [asset["asset_id"] for asset in selected_assets]
+            locked = self._lock_assets(
+                cursor, sku_category, sku_code, attributes, min_count, exclude=taken
+            )
             if len(locked) < min_count:
                 return []
 
-            asset_ids = [asset[0] for asset in locked]
-            cursor.execute(self.UPDATE_ASSET_STATUS_SQL, (asset_ids,))
-
-            for asset_id, locked_category, locked_code, locked_attrs in locked:
+            for asset_id, locked_category, locked_code, locked_attrs, mode in locked:
                 selected_assets.append(
                     {
                         "asset_id": asset_id,
                         "sku_category": locked_category,
                         "sku_code": locked_code,
                         "attributes": locked_attrs,
+                        "concurrency_mode": mode,
                     }
                 )
 
         return selected_assets
 
-    def _find_candidates(
-        self, cursor, sku_category: str, sku_code: str, attributes: Dict[str, str]
+    def _lock_assets(
+        self,
+        cursor,
+        sku_category: str,
+        sku_code: str,
+        attributes: Dict[str, str],
+        limit: int,
+        exclude: Sequence[str] = (),
     ) -> List[Sequence]:
-        like_pattern = self._to_like_pattern(sku_code)
-        cursor.execute(
-            self.SELECT_CANDIDATE_ASSETS_SQL,
-            (sku_category, sku_code, like_pattern),
-        )
-        rows = cursor.fetchall()
-        return [row for row in rows if self._attributes_match(attributes, row[3])]
+        """Lock up to ``limit`` READY assets in one statement.
+
+        Category, code pattern and attribute containment are all evaluated by
+        PostgreSQL, so every row the statement locks is usable and rows held
+        by concurrent loaders are skipped rather than waited on. SHARED assets
+        with a free slot qualify too; assets in ``exclude`` never do.
+
+        With an :class:`InventoryIndex`, candidates come from the index and are
+        locked by primary key; the READY-pool scan only runs for whatever the
+        index could not supply.
+        """
+
+        pattern_params = sql_pattern_params(sku_code)
+        attributes_json = json.dumps(attributes or {})
+        locked: List[Sequence] = []
+        if self.inventory is not None:
+            candidates = self.inventory.candidates(
+                sku_category, sku_code, attributes, limit * self.INVENTORY_OVERFETCH
+            )
+            if candidates:
+                cursor.execute(
+                    self.LOCK_ASSETS_BY_ID_SQL,
+                    (
+                        candidates,
+                        sku_category,
+                        *pattern_params,
+                        attributes_json,
+                        list(exclude),
+                        limit,
+                    ),
+                )
+                locked = list(cursor.fetchall())
+            if len(locked) >= limit:
+                return locked
+            # Stale or incomplete index: scan for the remainder, excluding the
+            # rows just locked (SHARED ones are still READY).
+            limit -= len(locked)
+            exclude = list(exclude) + [row[0] for row in locked]
 
-    def _lock_candidates(
-        self, cursor, sku_category: str, sku_code: str, attributes: Dict[str, str], limit: int
-    ) -> List[Sequence]:
-        like_pattern = self._to_like_pattern(sku_code)
         cursor.execute(
-            f"{self.LOCK_ASSETS_SQL} LIMIT %s",
-            (sku_category, sku_code, like_pattern, limit),
+            self.LOCK_ASSETS_SQL,
+            (sku_category, *pattern_params, attributes_json, list(exclude), limit),
         )
+        return locked + list(cursor.fetchall())
+
+    def _insert_leases(self, cursor, bound: List[BoundTask]) -> None:
+        """Insert the leases of every bound task with one multi-row statement.
+
+        The statement echoes ``task_id`` and ``asset_id`` so lease rows are
+        mapped back by key instead of relying on row order.
+        """
+
+        tenant_ids: List[str] = []
+        task_ids: List[str] = []
+        asset_ids: List[str] = []
+        expirations: List[datetime] = []
+        now = datetime.now(timezone.utc)
+        for task in bound:
+            expires_at = now + timedelta(milliseconds=int(task.timeout_ms or 0))
+            task.expires_at = expires_at
+            for asset in task.assets:
+                tenant_ids.append(task.tenant_id)
+                task_ids.append(task.task_id)
+                asset_ids.append(asset["asset_id"])
+                expirations.append(expires_at)
+
+        cursor.execute(self.INSERT_LEASES_SQL, (tenant_ids, task_ids, asset_ids, expirations))
+        lease_by_key = {}
         rows = cursor.fetchall()
-        return [row for row in rows if self._attributes_match(attributes, row[3])][:limit]
-
-    def _attributes_match(self, expected: Dict[str, str], actual: Dict[str, str]) -> bool:
-        actual = actual or {}
-        return all(actual.get(key) == value for key, value in expected.items())
-
-    def _insert_leases(
-        self,
-        cursor,
-        tenant_id: str,
-        task_id: str,
-        timeout_ms: int,
-        assets: List[Dict],
-    ) -> List[str]:
-        lease_ids: List[str] = []
-        expires_at = datetime.now(timezone.utc) + timedelta(milliseconds=int(timeout_ms or 0))
-        for asset in assets:
-            cursor.execute(
-                self.INSERT_LEASE_SQL,
-                (tenant_id, task_id, asset["asset_id"], expires_at),
-            )
-            lease_row = cursor.fetchone()
-            lease_ids.append(lease_row[0])
-
-        return lease_ids
-
-    def _to_like_pattern(self, sku_code: str) -> str:
-        if sku_code is None:
-            return sku_code
-        return sku_code.replace("*", "%")
+        for lease_id, task_id, asset_id, tenant_id, project_id, meta_spec, category in rows:
+            lease_by_key[(str(task_id), str(asset_id))] = {
+                "lease_id": lease_id,
+                "task_id": task_id,
+                "asset_id": asset_id,
+                "tenant_id": tenant_id,
+                "project_id": project_id,
+                "meta_spec": meta_spec,
+                "sku_category": category,
+            }
+
+        for task in bound:
+            task.leases = [
+                lease_by_key[(str(task.task_id), str(asset["asset_id"]))] for asset in task.assets
+            ]
+            task.lease_ids = [lease["lease_id"] for lease in task.leases]
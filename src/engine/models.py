@@ -1,8 +1,10 @@
 """Lightweight data classes shared by Loader and Dispenser."""
 
+import sys
 from dataclasses import dataclass, field
-from fnmatch import fnmatch
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.engine.sku_pattern import compile_sku_pattern, match_many
 
 
 @dataclass
@@ -21,6 +23,32 @@ class AssetSnapshot:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass(frozen=True)
+class CompactAssetSnapshot:
+    """Immutable, slotted :class:`AssetSnapshot` without ``metadata``.
+
+    For views holding many assets at once; the strings are interned by
+    :meth:`from_snapshot`, so repeated categories and codes are stored once.
+    For very large sets prefer :class:`~src.engine.snapshot_batch.AssetSnapshotBatch`.
+    """
+
+    __slots__ = ("asset_id", "sku_category", "sku_code", "status")
+
+    asset_id: str
+    sku_category: str
+    sku_code: str
+    status: str
+
+    @classmethod
+    def from_snapshot(cls, snapshot: AssetSnapshot) -> "CompactAssetSnapshot":
+        return cls(
+            snapshot.asset_id,
+            sys.intern(snapshot.sku_category),
+            sys.intern(snapshot.sku_code),
+            sys.intern(snapshot.status),
+        )
+
+
 @dataclass
 class ResourceHint:
     """Hint from a TaskOrder describing the desired asset."""
@@ -33,8 +61,9 @@ class ResourceHint:
         """Return True when the asset satisfies this hint.
 
         * Categories must match exactly.
-        * ``sku_code`` supports simple glob matching ("ip.*"), mirroring how
-          BOM hints are often specified in the docs.
+        * ``sku_code`` supports ``fnmatchcase`` globs ("ip.*"), mirroring how
+          BOM hints are often specified in the docs. The Loader's SQL applies
+          the same compiled pattern (see :mod:`src.engine.sku_pattern`).
         """
 
         if asset.sku_category != self.sku_category:
@@ -43,4 +72,12 @@ class ResourceHint:
         if self.sku_code is None:
             return True
 
-        return fnmatch(asset.sku_code, self.sku_code)
+        return compile_sku_pattern(self.sku_code).matches(asset.sku_code)
+
+
+def match_hints(
+    hints: Sequence[ResourceHint], assets: Sequence[AssetSnapshot]
+) -> List[List[AssetSnapshot]]:
+    """Matching assets for each hint, in one pass over ``assets``."""
+
+    return match_many(hints, assets)
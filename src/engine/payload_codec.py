@@ -0,0 +1,177 @@
+"""Wire codecs for task queue payloads."""
+
+import json
+import re
+import uuid
+from typing import Dict, List, Mapping, Tuple, Union
+
+Payload = Union[str, bytes]
+
+JSON_CODEC = "json"
+BINARY_CODEC = "binary"
+CODECS = (JSON_CODEC, BINARY_CODEC)
+
+# First byte of every binary payload, followed by the format version. 0xC1
+# never occurs in UTF-8 text, so binary payloads cannot be mistaken for JSON
+# and the Dispenser hands them over as bytes.
+BINARY_MAGIC = 0xC1
+BINARY_VERSION = 1
+
+# Field tags of binary payloads, locked in deploy/api/task_payload.tags.json.
+# Like protobuf tags they are never reused: a retired field keeps its entry.
+FIELD_TAGS: Dict[str, int] = {
+    "crc": 7,
+    "expires_at": 8,
+    "lease_ids": 2,
+    "leases": 6,
+    "task_id": 1,
+    "task_type": 4,
+    "timeout_ms": 5,
+    "v": 3,
+}
+_FIELD_NAMES = {tag: name for name, tag in FIELD_TAGS.items()}
+
+# Wire types, stored in the low three bits of a field key.
+_INT = 0  # zigzag varint
+_STR = 1  # length-prefixed UTF-8
+_UUID = 2  # 16 raw bytes of a canonical UUID string
+_JSON = 3  # length-prefixed compact JSON, for everything else
+_LIST = 4  # varint count, then one wire type byte and value per item
+
+# Only canonical lowercase UUIDs are packed, so decoding gives back the text.
+_UUID_TEXT = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z")
+
+
+def encode_payload(payload: Mapping, codec: str = JSON_CODEC) -> Payload:
+    """Serialize a payload mapping with ``codec``.
+
+    JSON payloads are ``str``; binary payloads are ``bytes`` holding one
+    tagged field per key, with UUID strings packed into 16 bytes.
+    """
+
+    if codec == JSON_CODEC:
+        return json.dumps(payload, default=str)
+    if codec != BINARY_CODEC:
+        raise ValueError(f"unknown payload codec: {codec!r}")
+
+    out = bytearray((BINARY_MAGIC, BINARY_VERSION))
+    for name, value in payload.items():
+        tag = FIELD_TAGS.get(name)
+        if tag is None:
+            raise ValueError(f"payload field {name!r} has no binary tag")
+        wire_type = _wire_type(value)
+        _write_varint(out, tag << 3 | wire_type)
+        _write_value(out, value, wire_type)
+    return bytes(out)
+
+
+def decode_payload(raw: Payload) -> Dict:
+    """Parse a payload written by either codec; raises ``ValueError`` if malformed.
+
+    The codec is detected from the first byte, so producers can switch codecs
+    while consumers drain a queue holding both. Unknown binary fields are
+    skipped, which lets newer producers add fields ahead of older consumers.
+    """
+
+    if not is_binary(raw):
+        return json.loads(raw)
+    if len(raw) < 2 or raw[1] != BINARY_VERSION:
+        raise ValueError("unsupported binary payload version")
+
+    payload: Dict = {}
+    view = memoryview(raw)
+    offset = 2
+    while offset < len(raw):
+        key, offset = _read_varint(view, offset)
+        value, offset = _decode_value(view, offset, key & 0x7)
+        name = _FIELD_NAMES.get(key >> 3)
+        if name is not None:
+            payload[name] = value
+    return payload
+
+
+def is_binary(raw: Payload) -> bool:
+    return isinstance(raw, (bytes, bytearray)) and raw[:1] == bytes((BINARY_MAGIC,))
+
+
+def _wire_type(value) -> int:
+    if isinstance(value, str):
+        return _UUID if _UUID_TEXT.match(value) else _STR
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _INT
+    if isinstance(value, (list, tuple)):
+        return _LIST
+    if isinstance(value, uuid.UUID):
+        return _UUID
+    return _JSON
+
+
+def _write_value(out: bytearray, value, wire_type: int) -> None:
+    if wire_type == _STR:
+        text = value.encode()
+        _write_varint(out, len(text))
+        out += text
+    elif wire_type == _UUID:
+        out += value.bytes if isinstance(value, uuid.UUID) else bytes.fromhex(value.replace("-", ""))
+    elif wire_type == _INT:
+        _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif wire_type == _LIST:
+        _write_varint(out, len(value))
+        for item in value:
+            item_type = _wire_type(item)
+            out.append(item_type)
+            _write_value(out, item, item_type)
+    else:
+        text = json.dumps(value, separators=(",", ":"), default=str).encode()
+        _write_varint(out, len(text))
+        out += text
+
+
+def _decode_value(view: memoryview, offset: int, wire_type: int):
+    if wire_type == _INT:
+        zigzag, offset = _read_varint(view, offset)
+        return (zigzag >> 1) ^ -(zigzag & 1), offset
+    if wire_type == _UUID:
+        end = offset + 16
+        if end > len(view):
+            raise ValueError("truncated binary payload")
+        digits = view[offset:end].hex()
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}", end
+    if wire_type == _LIST:
+        count, offset = _read_varint(view, offset)
+        items: List = []
+        for _ in range(count):
+            if offset >= len(view):
+                raise ValueError("truncated binary payload")
+            item, offset = _decode_value(view, offset + 1, view[offset])
+            items.append(item)
+        return items, offset
+    if wire_type in (_STR, _JSON):
+        length, offset = _read_varint(view, offset)
+        end = offset + length
+        if end > len(view):
+            raise ValueError("truncated binary payload")
+        text = bytes(view[offset:end]).decode()
+        return (text if wire_type == _STR else json.loads(text)), end
+    raise ValueError(f"unknown wire type {wire_type}")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(view: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(view):
+            raise ValueError("truncated binary payload")
+        byte = view[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
@@ -0,0 +1,122 @@
+"""Priority-band (and optionally per-tenant) Redis queue layout."""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from src.config import settings
+
+
+MIN_PRIORITY = -(2 ** 31)
+
+
+@dataclass(frozen=True)
+class PriorityBand:
+    """Tasks with ``priority >= min_priority`` land in this band."""
+
+    name: str
+    min_priority: int
+    weight: int = 1
+
+
+class PriorityQueues:
+    """Maps tasks onto Redis lists and orders those lists for draining.
+
+    The Loader pushes each payload to the list of its priority band (and, with
+    ``per_tenant``, to a per-tenant list inside the band). The Dispenser asks
+    :meth:`drain_order` for the key list to hand to ``BLPOP``, which pops from
+    the first non-empty key.
+
+    The leading band is picked by smooth weighted round-robin, so when every
+    band is backlogged each one leads a share of pops proportional to its
+    weight and low bands are never starved; the remaining bands follow in
+    priority order so an idle high band never blocks the others. Within a
+    band, tenant lists are rotated so one tenant's backlog cannot sit in front
+    of everybody else's work.
+    """
+
+    BANDS = settings.dispatch_priority_bands
+    PER_TENANT = settings.dispatch_tenant_fairness
+
+    def __init__(
+        self,
+        base_name: str,
+        bands: Optional[Iterable[PriorityBand]] = None,
+        per_tenant: bool = False,
+    ) -> None:
+        self.base_name = base_name
+        self.bands: List[PriorityBand] = sorted(
+            bands or [PriorityBand("default", MIN_PRIORITY)],
+            key=lambda band: band.min_priority,
+            reverse=True,
+        )
+        if any(band.weight <= 0 for band in self.bands):
+            raise ValueError("priority band weights must be positive")
+        self.per_tenant = per_tenant
+        self._current: Dict[str, int] = {band.name: 0 for band in self.bands}
+        self._tenant_turn: Dict[str, int] = {band.name: 0 for band in self.bands}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, base_name: str) -> Optional["PriorityQueues"]:
+        """Build the configured layout, ``None`` for a single plain queue."""
+
+        if not cls.BANDS and not cls.PER_TENANT:
+            return None
+        bands = [
+            PriorityBand(name, int(min_priority), int(weight))
+            for name, min_priority, weight in cls.BANDS
+        ]
+        return cls(base_name, bands or None, per_tenant=cls.PER_TENANT)
+
+    def band_for(self, priority: Optional[int]) -> PriorityBand:
+        value = MIN_PRIORITY if priority is None else priority
+        for band in self.bands:
+            if value >= band.min_priority:
+                return band
+        return self.bands[-1]
+
+    def queue_for(self, priority: Optional[int], tenant_id: Optional[str] = None) -> str:
+        band = self.band_for(priority)
+        if self.per_tenant and tenant_id is not None:
+            return self.tenant_key(band, tenant_id)
+        return self.band_key(band)
+
+    def band_key(self, band: PriorityBand) -> str:
+        return f"{self.base_name}:{band.name}"
+
+    def tenant_key(self, band: PriorityBand, tenant_id: str) -> str:
+        return f"{self.band_key(band)}:tenant:{tenant_id}"
+
+    def tenants_key(self, band: PriorityBand) -> str:
+        return f"{self.band_key(band)}:tenants"
+
+    def drain_order(self, tenants: Optional[Dict[str, Sequence[str]]] = None) -> List[str]:
+        """Keys to pass to ``BLPOP`` for the next pop, in preference order.
+
+        ``tenants`` maps band names to the tenants known to have lists in
+        that band; it is only consulted with ``per_tenant``.
+        """
+
+        with self._lock:
+            total = sum(band.weight for band in self.bands)
+            for band in self.bands:
+                self._current[band.name] += band.weight
+            leader = max(self.bands, key=lambda band: self._current[band.name])
+            self._current[leader.name] -= total
+            ordered = [leader] + [band for band in self.bands if band is not leader]
+
+            keys: List[str] = []
+            for band in ordered:
+                band_key = self.band_key(band)
+                if self.per_tenant:
+                    members = sorted((tenants or {}).get(band.name, ()))
+                    if members:
+                        turn = self._tenant_turn[band.name] % len(members)
+                        self._tenant_turn[band.name] += 1
+                        rotated = members[turn:] + members[:turn]
+                        keys.extend(self.tenant_key(band, tenant) for tenant in rotated)
+                # Payloads without a tenant (and pre-fairness pushes) share the band list.
+                keys.append(band_key)
+            return keys
+
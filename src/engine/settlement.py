@@ -0,0 +1,270 @@
+"""Set-based settlement of finished tasks, with optional group commit."""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.config import settings
+from src.engine.payload_codec import Payload
+
+
+LOGGER = logging.getLogger(__name__)
+
+TASK_BURN_AMOUNT = 0.01
+
+
+@dataclass
+class TaskOutcome:
+    """Final state of one executed task, waiting to be written."""
+
+    task_id: str
+    status: str  # "SUCCESS", "FAILED" or "TIMEOUT"
+    leases: List[Dict]
+    lease_ids: List[str] = field(default_factory=list)
+    result_code: Optional[str] = None
+    # Failed tasks normally ban their assets; when False they go COOLING.
+    ban_assets: bool = True
+    # Queue payload to acknowledge once this outcome is committed.
+    payload: Optional[Payload] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "SUCCESS"
+
+    @property
+    def timed_out(self) -> bool:
+        return self.status == "TIMEOUT"
+
+
+class SettlementWriter:
+    """Writes task, lease, asset, event and ledger rows for finished tasks.
+
+    Every statement covers all buffered outcomes at once: events and ledger
+    rows are inserted from ``UNNEST`` arrays, so a flush costs a fixed number
+    of statements regardless of how many tasks or leases it settles.
+
+    With ``max_batch_size`` above one, outcomes are buffered and committed
+    together once the batch is full or the oldest outcome has waited
+    ``max_delay_ms``. Callers are expected to poll :meth:`flush_if_due` (or
+    :meth:`seconds_until_due`) so the delay bound holds while the queue is
+    idle.
+
+    Only live work is settled: tasks that are still QUEUED, and assets,
+    events and ledger rows of leases that are still ACTIVE. The lease
+    statuses are written last so every earlier statement can test them. A
+    payload redelivered after its settlement committed, or a task whose
+    leases the janitor already reclaimed, therefore leaves the assets alone.
+    """
+
+    MAX_BATCH_SIZE = settings.worker_settle_batch_size
+    MAX_DELAY_MS = settings.worker_settle_max_delay_ms
+
+    _ACTIVE_LEASE_ASSETS = (
+        "SELECT asset_id FROM leases WHERE lease_id = ANY(%s) AND status='ACTIVE'"
+    )
+
+    UPDATE_TASK_SUCCESS_SQL = (
+        "UPDATE task_orders SET status='SUCCESS', finished_at=CURRENT_TIMESTAMP, result_code=NULL "
+        "WHERE task_id = ANY(%s) AND status='QUEUED'"
+    )
+    UPDATE_TASK_FAILURE_SQL = (
+        "UPDATE task_orders AS t "
+        "SET status=v.status, finished_at=CURRENT_TIMESTAMP, result_code=v.result_code "
+        "FROM UNNEST(%s::uuid[], %s::text[], %s::text[]) AS v(task_id, status, result_code) "
+        "WHERE t.task_id = v.task_id AND t.status='QUEUED'"
+    )
+    UPDATE_LEASE_SUCCESS_SQL = (
+        "UPDATE leases SET status='RELEASED' WHERE lease_id = ANY(%s) AND status='ACTIVE'"
+    )
+    UPDATE_LEASE_FAILURE_SQL = (
+        "UPDATE leases SET status='REVOKED' WHERE lease_id = ANY(%s) AND status='ACTIVE'"
+    )
+    # Frees one slot on a SHARED asset per lease that is still ACTIVE, so a
+    # lease the janitor already expired is not counted twice; the lease rows
+    # stay locked until commit, which makes the janitor skip them. EXCLUSIVE
+    # assets are reset by the statements below.
+    RELEASE_SHARED_SLOTS_SQL = (
+        "UPDATE creep_assets AS a "
+        "SET current_concurrency = GREATEST(a.current_concurrency - e.ended, 0) "
+        "FROM ("
+        "SELECT asset_id, count(*) AS ended FROM ("
+        "SELECT asset_id FROM leases "
+        "WHERE lease_id = ANY(%s) AND status='ACTIVE' "
+        "FOR UPDATE"
+        ") active "
+        "GROUP BY asset_id"
+        ") e "
+        "WHERE a.id = e.asset_id AND a.concurrency_mode='SHARED'"
+    )
+    # SHARED assets keep serving their other leases instead of cooling down.
+    # Both take lease IDs and only touch the assets of leases still ACTIVE.
+    UPDATE_ASSET_COOLING_SQL = (
+        "UPDATE creep_assets SET status='COOLING', current_concurrency=0, "
+        "cool_down_until = CURRENT_TIMESTAMP + INTERVAL '10 seconds' "
+        "WHERE id IN (" + _ACTIVE_LEASE_ASSETS + ") AND concurrency_mode <> 'SHARED'"
+    )
+    UPDATE_ASSET_FAILURE_SQL = (
+        "UPDATE creep_assets SET status='BANNED', "
+        "current_concurrency = CASE WHEN concurrency_mode='SHARED' THEN current_concurrency ELSE 0 END "
+        "WHERE id IN (" + _ACTIVE_LEASE_ASSETS + ")"
+    )
+    INSERT_EVENTS_SQL = (
+        "INSERT INTO asset_events (asset_id, event_type, severity, error_code, occurred_at, recorded_at) "
+        "SELECT e.asset_id, e.event_type, e.severity, e.error_code, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM UNNEST(%s::uuid[], %s::uuid[], %s::text[], %s::text[], %s::text[]) "
+        "AS e(lease_id, asset_id, event_type, severity, error_code) "
+        "JOIN leases ls ON ls.lease_id = e.lease_id AND ls.status='ACTIVE'"
+    )
+    INSERT_LEDGER_SQL = (
+        "INSERT INTO asset_ledger (asset_id, tenant_id, project_id, direction, reason, amount, created_at) "
+        "SELECT l.asset_id, l.tenant_id, l.project_id, l.direction, l.reason, l.amount, CURRENT_TIMESTAMP "
+        "FROM UNNEST(%s::uuid[], %s::uuid[], %s::text[], %s::text[], %s::text[], %s::text[], %s::numeric[]) "
+        "AS l(lease_id, asset_id, tenant_id, project_id, direction, reason, amount) "
+        "JOIN leases ls ON ls.lease_id = l.lease_id AND ls.status='ACTIVE'"
+    )
+
+    def __init__(
+        self,
+        db_conn,
+        max_batch_size: Optional[int] = None,
+        max_delay_ms: Optional[float] = None,
+    ) -> None:
+        self.db_conn = db_conn
+        self.max_batch_size = max(1, int(max_batch_size or self.MAX_BATCH_SIZE))
+        self.max_delay_s = float(self.MAX_DELAY_MS if max_delay_ms is None else max_delay_ms) / 1000.0
+        self._pending: List[TaskOutcome] = []
+        self._oldest_at: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, outcome: TaskOutcome) -> List[TaskOutcome]:
+        """Buffer an outcome; return the outcomes committed as a result."""
+
+        if not self._pending:
+            self._oldest_at = time.monotonic()
+        self._pending.append(outcome)
+        return self.flush_if_due()
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Seconds until the buffered batch must be flushed, ``None`` if empty."""
+
+        if self._oldest_at is None:
+            return None
+        return max(0.0, self._oldest_at + self.max_delay_s - time.monotonic())
+
+    def flush_if_due(self) -> List[TaskOutcome]:
+        if not self._pending:
+            return []
+        if len(self._pending) >= self.max_batch_size or self.seconds_until_due() == 0.0:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[TaskOutcome]:
+        """Write every buffered outcome in one transaction and commit.
+
+        On failure the batch stays buffered, with its original age, and the
+        error is re-raised; the next flush retries it. Retrying is safe
+        because settlement only applies to tasks and leases that are still
+        live.
+        """
+
+        if not self._pending:
+            return []
+
+        batch, oldest_at = self._pending, self._oldest_at
+        self._pending, self._oldest_at = [], None
+        try:
+            with self.db_conn.cursor() as cursor:
+                self._write(cursor, batch)
+            self.db_conn.commit()
+        except Exception:
+            self.db_conn.rollback()
+            self._pending, self._oldest_at = batch + self._pending, oldest_at
+            LOGGER.error(
+                "Settlement of %d task(s) failed; will retry: %s",
+                len(batch),
+                [o.task_id for o in batch],
+            )
+            raise
+
+        return batch
+
+    def _write(self, cursor, batch: List[TaskOutcome]) -> None:
+        succeeded = [outcome for outcome in batch if outcome.succeeded]
+        failed = [outcome for outcome in batch if not outcome.succeeded]
+
+        if succeeded:
+            cursor.execute(self.UPDATE_TASK_SUCCESS_SQL, ([o.task_id for o in succeeded],))
+        if failed:
+            cursor.execute(
+                self.UPDATE_TASK_FAILURE_SQL,
+                (
+                    [o.task_id for o in failed],
+                    [o.status for o in failed],
+                    [o.result_code for o in failed],
+                ),
+            )
+
+        released = [lease_id for o in succeeded for lease_id in o.lease_ids]
+        revoked = [lease_id for o in failed for lease_id in o.lease_ids]
+        if released or revoked:
+            cursor.execute(self.RELEASE_SHARED_SLOTS_SQL, (released + revoked,))
+
+        cooling = [
+            lease["lease_id"] for o in batch if o.succeeded or not o.ban_assets for lease in o.leases
+        ]
+        banned = [lease["lease_id"] for o in failed if o.ban_assets for lease in o.leases]
+        if cooling:
+            cursor.execute(self.UPDATE_ASSET_COOLING_SQL, (cooling,))
+        if banned:
+            cursor.execute(self.UPDATE_ASSET_FAILURE_SQL, (banned,))
+
+        if cooling or banned:
+            self._insert_events(cursor, batch)
+            self._insert_ledger(cursor, batch)
+
+        if released:
+            cursor.execute(self.UPDATE_LEASE_SUCCESS_SQL, (released,))
+        if revoked:
+            cursor.execute(self.UPDATE_LEASE_FAILURE_SQL, (revoked,))
+
+    def _insert_events(self, cursor, batch: List[TaskOutcome]) -> None:
+        lease_ids: List[str] = []
+        asset_ids: List[str] = []
+        event_types: List[str] = []
+        severities: List[str] = []
+        error_codes: List[Optional[str]] = []
+        for outcome in batch:
+            for lease in outcome.leases:
+                lease_ids.append(lease["lease_id"])
+                asset_ids.append(lease["asset_id"])
+                if outcome.succeeded:
+                    event_types.append("TASK_SUCCESS")
+                    severities.append("INFO")
+                    error_codes.append(None)
+                else:
+                    event_types.append("TASK_TIMEOUT" if outcome.timed_out else "TASK_FAIL")
+                    severities.append("WARN" if outcome.timed_out else "ERROR")
+                    error_codes.append(outcome.result_code)
+
+        cursor.execute(
+            self.INSERT_EVENTS_SQL, (lease_ids, asset_ids, event_types, severities, error_codes)
+        )
+
+    def _insert_ledger(self, cursor, batch: List[TaskOutcome]) -> None:
+        leases = [lease for outcome in batch for lease in outcome.leases]
+        cursor.execute(
+            self.INSERT_LEDGER_SQL,
+            (
+                [lease["lease_id"] for lease in leases],
+                [lease["asset_id"] for lease in leases],
+                [lease.get("tenant_id") for lease in leases],
+                [lease.get("project_id") for lease in leases],
+                ["OUT"] * len(leases),
+                ["TASK_BURN"] * len(leases),
+                [TASK_BURN_AMOUNT] * len(leases),
+            ),
+        )
@@ -0,0 +1,153 @@
+"""Parallel janitor that splits creep_assets into hash shards."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.config import settings
+from src.engine.janitor import Janitor
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ShardReport:
+    """Outcome of one shard's pass."""
+
+    shard: int
+    owned: bool
+    recovered: int = 0
+    expired_leases: int = 0
+    cooled: int = 0
+    batch_size: int = 0
+    backlog: Dict[str, int] = field(default_factory=dict)
+
+
+class ShardedJanitor:
+    """Runs one adaptive :class:`Janitor` per hash shard, in parallel.
+
+    Each shard has its own connection and thread. Before sweeping, a shard
+    takes a session-level advisory lock keyed by its index, so any number of
+    processes can run a ``ShardedJanitor`` with the same ``shard_count``: the
+    shards spread across them, no shard is swept twice at once, and a crashed
+    process's shards are picked up on the next pass once its session ends.
+    """
+
+    SHARD_COUNT = settings.janitor_shard_count
+    # The backlog is re-counted every this many passes; reports in between
+    # repeat the last count.
+    BACKLOG_SAMPLE_PASSES = 10
+    # First key of the two-key advisory lock ("CREP"); the second is the shard.
+    ADVISORY_LOCK_CLASS = 0x43524550
+
+    TRY_LOCK_SQL = "SELECT pg_try_advisory_lock(%s, %s)"
+    UNLOCK_SQL = "SELECT pg_advisory_unlock(%s, %s)"
+
+    def __init__(
+        self, connection_factory: Callable[[], object], shard_count: Optional[int] = None
+    ) -> None:
+        self.connection_factory = connection_factory
+        self.shard_count = max(1, int(shard_count or self.SHARD_COUNT))
+        self._janitors: Dict[int, Janitor] = {}
+        self._backlogs: Dict[int, Dict[str, int]] = {}
+        self._passes = 0
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def run_once(self) -> List[ShardReport]:
+        """Sweep every shard this process can own, in parallel."""
+
+        with ThreadPoolExecutor(
+            max_workers=self.shard_count, thread_name_prefix="creep-janitor"
+        ) as executor:
+            reports = list(executor.map(self._run_shard, range(self.shard_count)))
+        self._passes += 1
+
+        owned = [report for report in reports if report.owned]
+        LOGGER.info(
+            "Janitor pass: shards=%d/%d recovered=%d expired_leases=%d cooled=%d "
+            "backlog_locks=%d backlog_cooling=%d",
+            len(owned),
+            self.shard_count,
+            sum(report.recovered for report in owned),
+            sum(report.expired_leases for report in owned),
+            sum(report.cooled for report in owned),
+            sum(report.backlog.get("expired_locks", 0) for report in owned),
+            sum(report.backlog.get("expired_cooling", 0) for report in owned),
+        )
+        return reports
+
+    def run_forever(self, idle_seconds: float = 1.0) -> None:
+        """Repeat passes until :meth:`stop`; back off only when nothing moved."""
+
+        try:
+            while not self._stopping.is_set():
+                reports = self.run_once()
+                if not any(
+                    report.recovered or report.expired_leases or report.cooled for report in reports
+                ):
+                    self._stopping.wait(idle_seconds)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for janitor in self._janitors.values():
+            try:
+                janitor.db_conn.close()
+            except Exception:
+                LOGGER.exception("Failed to close janitor connection")
+        self._janitors.clear()
+
+    def _run_shard(self, shard: int) -> ShardReport:
+        janitor = self._janitor(shard)
+        if not self._try_lock(janitor.db_conn, shard):
+            return ShardReport(shard, owned=False)
+
+        try:
+            expired_leases = janitor.reclaim_expired_leases()
+            recovered = janitor.recover_timeouts()
+            cooled = janitor.process_cooling()
+            if shard not in self._backlogs or self._passes % self.BACKLOG_SAMPLE_PASSES == 0:
+                self._backlogs[shard] = janitor.backlog()
+            return ShardReport(
+                shard,
+                owned=True,
+                recovered=len(recovered),
+                expired_leases=len(expired_leases),
+                cooled=len(cooled),
+                batch_size=janitor.batch_size,
+                backlog=self._backlogs[shard],
+            )
+        finally:
+            self._unlock(janitor.db_conn, shard)
+
+    def _janitor(self, shard: int) -> Janitor:
+        # Janitors persist across passes so their adapted batch size carries over.
+        janitor = self._janitors.get(shard)
+        if janitor is None:
+            janitor = Janitor(
+                self.connection_factory(), shard=(shard, self.shard_count), adaptive=True
+            )
+            self._janitors[shard] = janitor
+        return janitor
+
+    def _try_lock(self, conn, shard: int) -> bool:
+        with conn.cursor() as cursor:
+            cursor.execute(self.TRY_LOCK_SQL, (self.ADVISORY_LOCK_CLASS, shard))
+            locked = bool(cursor.fetchone()[0])
+        # Session-level lock: it survives the janitor's commits and rollbacks.
+        conn.commit()
+        return locked
+
+    def _unlock(self, conn, shard: int) -> None:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(self.UNLOCK_SQL, (self.ADVISORY_LOCK_CLASS, shard))
+            conn.commit()
+        except Exception:
+            LOGGER.exception("Failed to release janitor shard %d", shard)
@@ -0,0 +1,208 @@
+"""Compiled SKU code patterns shared by in-memory and SQL matching."""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+# Compiled patterns are cached by their source text; hints repeat heavily.
+PATTERN_CACHE_SIZE = 4096
+
+# Matches nothing, in both Python ``re`` and PostgreSQL AREs: ``^`` is an
+# anchor wherever it appears, and no position after a character is the start.
+_NEVER = "(?:.^)"
+
+
+@dataclass(frozen=True)
+class SkuPattern:
+    """One ``fnmatchcase``-style SKU code pattern, compiled once.
+
+    ``*`` matches any run of characters (dots included), ``?`` one character
+    and ``[seq]``/``[!seq]`` one character in or out of a set, exactly as
+    :func:`fnmatch.fnmatchcase` does. Matching is case-sensitive.
+
+    The same pattern is exposed for PostgreSQL: ``like`` is an escaped
+    ``LIKE`` pattern that is exact unless the pattern has a character class,
+    in which case it over-approximates the class as ``_`` and ``sql_regex``
+    (for ``~``) carries the exact test. Keeping the ``LIKE`` lets the planner
+    use a prefix index either way.
+    """
+
+    source: str
+    regex: "re.Pattern[str]"
+    like: str
+    sql_regex: Optional[str]
+    # The pattern text itself when it has no wildcards, else None.
+    literal: Optional[str]
+
+    def matches(self, sku_code: Optional[str]) -> bool:
+        if sku_code is None:
+            return False
+        if self.literal is not None:
+            return sku_code == self.literal
+        return self.regex.match(sku_code) is not None
+
+    @property
+    def literal_prefix(self) -> str:
+        """Leading text every match starts with."""
+
+        if self.literal is not None:
+            return self.literal
+        return _literal_prefix(self.source)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_sku_pattern(pattern: str) -> SkuPattern:
+    body, like, has_class, has_wildcard = _translate(pattern)
+    anchored = f"^(?:{body})$"
+    return SkuPattern(
+        source=pattern,
+        # ``\Z`` rather than ``$``, which would also accept a trailing newline.
+        regex=re.compile(f"(?:{body})\\Z", re.DOTALL),
+        like=like,
+        sql_regex=anchored if has_class else None,
+        literal=None if has_wildcard else pattern,
+    )
+
+
+def sql_pattern_params(sku_code: Optional[str]) -> tuple:
+    """Parameters for ``(%s IS NULL OR sku_code LIKE %s) AND (%s IS NULL OR sku_code ~ %s)``."""
+
+    if sku_code is None:
+        return (None, None, None, None)
+    pattern = compile_sku_pattern(sku_code)
+    return (pattern.like, pattern.like, pattern.sql_regex, pattern.sql_regex)
+
+
+def match_many(hints: Sequence, assets: Sequence) -> List[List]:
+    """Match every hint against every asset in one pass over the assets.
+
+    ``hints`` need ``sku_category`` and ``sku_code``; ``assets`` need
+    ``sku_category`` and ``sku_code`` too. Returns, per hint and in hint
+    order, the matching assets in asset order. Assets are bucketed by
+    category and literal hints resolve through a code lookup, so each glob
+    only runs against its own category.
+    """
+
+    by_category: Dict[str, List] = defaultdict(list)
+    by_code: Dict[tuple, List] = defaultdict(list)
+    for asset in assets:
+        by_category[asset.sku_category].append(asset)
+        by_code[(asset.sku_category, asset.sku_code)].append(asset)
+
+    results: List[List] = []
+    for hint in hints:
+        if hint.sku_code is None:
+            results.append(list(by_category.get(hint.sku_category, ())))
+            continue
+        pattern = compile_sku_pattern(hint.sku_code)
+        if pattern.literal is not None:
+            results.append(list(by_code.get((hint.sku_category, pattern.literal), ())))
+            continue
+        match = pattern.regex.match
+        results.append(
+            [
+                asset
+                for asset in by_category.get(hint.sku_category, ())
+                if asset.sku_code is not None and match(asset.sku_code)
+            ]
+        )
+    return results
+
+
+def _literal_prefix(pattern: str) -> str:
+    for index, char in enumerate(pattern):
+        if char in "*?[":
+            return pattern[:index]
+    return pattern
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _translate(pattern: str):
+    """Return ``(regex_body, like, has_class, has_wildcard)`` for ``pattern``.
+
+    Mirrors :func:`fnmatch.translate`, including its handling of unclosed
+    ``[`` (a literal), reversed ranges (dropped) and empty sets. The regex
+    body only uses syntax that Python and PostgreSQL AREs read the same way.
+    """
+
+    regex: List[str] = []
+    like: List[str] = []
+    has_class = False
+    has_wildcard = False
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            has_wildcard = True
+            # Collapse runs of ``*``; they match the same strings.
+            if not regex or regex[-1] != ".*":
+                regex.append(".*")
+                like.append("%")
+        elif char == "?":
+            has_wildcard = True
+            regex.append(".")
+            like.append("_")
+        elif char == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                regex.append("\\[")
+                like.append("[")
+                continue
+            has_wildcard = True
+            has_class = True
+            regex.append(_translate_class(pattern[i:j]))
+            like.append("_")
+            i = j + 1
+        else:
+            regex.append(re.escape(char))
+            like.append(_escape_like(char))
+    return "".join(regex), "".join(like), has_class, has_wildcard
+
+
+def _translate_class(stuff: str) -> str:
+    if "-" not in stuff:
+        stuff = stuff.replace("\\", "\\\\")
+    else:
+        chunks = []
+        k = 2 if stuff[0] == "!" else 1
+        start = 0
+        while True:
+            k = stuff.find("-", k, len(stuff))
+            if k < 0:
+                break
+            chunks.append(stuff[start:k])
+            start = k + 1
+            k = k + 3
+        chunk = stuff[start:]
+        if chunk:
+            chunks.append(chunk)
+        else:
+            chunks[-1] += "-"
+        # Drop empty ranges such as ``z-a``.
+        for k in range(len(chunks) - 1, 0, -1):
+            if chunks[k - 1][-1] > chunks[k][0]:
+                chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+                del chunks[k]
+        stuff = "-".join(s.replace("\\", "\\\\").replace("-", "\\-") for s in chunks)
+    stuff = re.sub(r"([&~|])", r"\\\1", stuff)
+    if not stuff:
+        return _NEVER
+    if stuff == "!":
+        return "."
+    if stuff[0] == "!":
+        stuff = "^" + stuff[1:]
+    elif stuff[0] in ("^", "["):
+        stuff = "\\" + stuff
+    return f"[{stuff}]"
@@ -0,0 +1,94 @@
+"""Versioned task payloads passed from the Loader to the Worker."""
+
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from src.engine.payload_codec import JSON_CODEC, Payload, encode_payload
+
+# Version 1 payloads only reference the task and its leases; the Worker
+# hydrates them from the database. Version 2 payloads also embed everything
+# the Worker needs to run the task. Both carry ``task_id`` and ``lease_ids``,
+# so a version 1 Worker still accepts version 2 payloads. Either version may
+# carry ``expires_at``, when the task's leases expire as set at claim time, in
+# epoch milliseconds.
+REFERENCE_VERSION = 1
+EMBEDDED_VERSION = 2
+
+# Lease fields embedded in version 2 payloads, as the Worker's lease dicts
+# name them; ``task_id`` is implied by the payload.
+LEASE_FIELDS = ("lease_id", "asset_id", "tenant_id", "project_id", "meta_spec", "sku_category")
+
+
+@dataclass
+class EmbeddedTask:
+    """The task data carried by a version 2 payload."""
+
+    task_type: str
+    timeout_ms: int
+    leases: List[Dict]
+    expires_at: Optional[int] = None
+
+
+def encode_task_payload(
+    task_id: str,
+    lease_ids: Sequence[str],
+    task_type: Optional[str] = None,
+    timeout_ms: Optional[int] = None,
+    leases: Optional[Sequence[Mapping]] = None,
+    version: int = EMBEDDED_VERSION,
+    codec: str = JSON_CODEC,
+    expires_at: Optional[int] = None,
+) -> Payload:
+    """Serialize one task's payload; ``leases`` is only used by version 2.
+
+    See :mod:`src.engine.payload_codec` for the ``codec`` choices.
+    """
+
+    payload: Dict = {"task_id": task_id, "lease_ids": list(lease_ids)}
+    if expires_at is not None:
+        payload["expires_at"] = int(expires_at)
+    if version >= EMBEDDED_VERSION:
+        embedded = [[lease.get(name) for name in LEASE_FIELDS] for lease in leases or ()]
+        payload.update(v=version, task_type=task_type, timeout_ms=timeout_ms, leases=embedded)
+        payload["crc"] = _checksum(payload)
+    return encode_payload(payload, codec)
+
+
+def decode_embedded_task(payload: Mapping) -> Optional[EmbeddedTask]:
+    """The embedded task of a parsed payload, if it has an intact one.
+
+    Returns ``None`` for version 1 payloads and for version 2 payloads whose
+    checksum or lease list does not add up; the caller then hydrates the task
+    from the database instead.
+    """
+
+    if not isinstance(payload.get("v"), int) or payload["v"] < EMBEDDED_VERSION:
+        return None
+    rows = payload.get("leases")
+    if not isinstance(rows, list) or payload.get("crc") != _checksum(payload):
+        return None
+    if any(not isinstance(row, list) or len(row) != len(LEASE_FIELDS) for row in rows):
+        return None
+
+    task_id = payload.get("task_id")
+    leases = [dict(zip(LEASE_FIELDS, row), task_id=task_id) for row in rows]
+    if [lease["lease_id"] for lease in leases] != payload.get("lease_ids"):
+        return None
+    if any(lease["asset_id"] is None for lease in leases):
+        return None
+    return EmbeddedTask(
+        payload.get("task_type"), payload.get("timeout_ms"), leases, payload.get("expires_at")
+    )
+
+
+def _checksum(payload: Mapping) -> int:
+    """CRC-32 over the canonical JSON of every field but ``crc`` itself.
+
+    It catches truncated, corrupted or hand-edited payloads, not forgeries.
+    """
+
+    body = {key: value for key, value in payload.items() if key != "crc"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return zlib.crc32(canonical.encode())
@@ -0,0 +1,130 @@
+"""Hierarchical timer wheel keyed by an arbitrary hashable ID."""
+
+import math
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+class TimerWheel:
+    """Schedules one deadline per key with O(1) insert and cancel.
+
+    Time is quantised into ``tick_s`` ticks. Level 0 has one slot per tick;
+    each higher level covers ``slots`` times the span of the level below and
+    is cascaded into it when the lower level wraps. Deadlines beyond the top
+    level wait in an overflow bucket that is re-placed on every top-level
+    cascade.
+
+    Rescheduling or cancelling a key never touches the slots: entries carry
+    the tick they were placed for and stale ones are dropped lazily.
+    Deadlines are absolute times in the same unit as the ``now`` values
+    passed to :meth:`advance` (seconds since the epoch for the janitor).
+    """
+
+    def __init__(self, now: float, tick_s: float = 0.01, slots: int = 256, levels: int = 4) -> None:
+        if tick_s <= 0 or slots < 2 or levels < 1:
+            raise ValueError("invalid timer wheel geometry")
+        self.tick_s = tick_s
+        self.slots = slots
+        self.levels = levels
+        self._current = self._tick(now)
+        self._wheels: List[List[Set[Tuple[Hashable, int]]]] = [
+            [set() for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: Set[Tuple[Hashable, int]] = set()
+        self._ticks: Dict[Hashable, int] = {}
+        self._deadlines: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ticks
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Fire ``key`` at ``deadline``, replacing any earlier schedule."""
+
+        tick = max(int(math.ceil(deadline / self.tick_s)), self._current + 1)
+        self._ticks[key] = tick
+        self._deadlines[key] = deadline
+        self._place(key, tick)
+
+    def cancel(self, key: Hashable) -> bool:
+        self._deadlines.pop(key, None)
+        return self._ticks.pop(key, None) is not None
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys that came due."""
+
+        target = self._tick(now)
+        fired: List[Hashable] = []
+        while self._current < target:
+            if not self._ticks:
+                # Nothing scheduled: jump instead of walking empty ticks.
+                self._current = target
+                break
+            self._current += 1
+            self._cascade()
+            bucket = self._wheels[0][self._current % self.slots]
+            entries = list(bucket)
+            bucket.clear()
+            for key, tick in entries:
+                if self._ticks.get(key) == tick:
+                    del self._ticks[key]
+                    del self._deadlines[key]
+                    fired.append(key)
+        return fired
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        """Lower bound on the time until :meth:`advance` can fire something.
+
+        ``None`` when nothing is scheduled. Past level 0 this returns the time
+        until the next cascade, so callers may wake early but never late.
+        """
+
+        if not self._ticks:
+            return None
+        for offset in range(1, self.slots + 1):
+            tick = self._current + offset
+            if offset < self.slots and self._wheels[0][tick % self.slots]:
+                return max(0.0, tick * self.tick_s - now)
+            if tick % self.slots == 0:
+                return max(0.0, tick * self.tick_s - now)
+        return 0.0
+
+    def _tick(self, when: float) -> int:
+        return int(math.floor(when / self.tick_s))
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        delta = max(0, tick - self._current)
+        span = self.slots
+        for level in range(self.levels):
+            if delta < span:
+                slot = (tick // (span // self.slots)) % self.slots
+                self._wheels[level][slot].add((key, tick))
+                return
+            span *= self.slots
+        self._overflow.add((key, tick))
+
+    def _cascade(self) -> None:
+        # Find every level that wraps on this tick, then cascade from the top
+        # down so entries moved into a lower level are cascaded again.
+        wrapped = 0
+        span = self.slots
+        while wrapped < self.levels and self._current % span == 0:
+            wrapped += 1
+            span *= self.slots
+
+        for level in range(wrapped, 0, -1):
+            if level == self.levels:
+                entries = list(self._overflow)
+                self._overflow.clear()
+            else:
+                span = self.slots ** level
+                bucket = self._wheels[level][(self._current // span) % self.slots]
+                entries = list(bucket)
+                bucket.clear()
+            for key, tick in entries:
+                if self._ticks.get(key) == tick:
+                    self._place(key, tick)
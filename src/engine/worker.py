@@ -1,88 +1,270 @@
 """Worker service that consumes task payloads from Redis and finalizes execution."""
 
-import json
+import asyncio
 import logging
 import time
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Union
 
-from src.adapters.base import AdapterError, BaseAdapter
+from src.adapters.base import AdapterError, AsyncBaseAdapter, BaseAdapter, QuotaExceededError
 from src.adapters.factory import AdapterFactory
 from src.config import settings
+from src.engine.health_cache import HealthCache
+from src.engine.lease_heartbeat import LeaseHeartbeat
+from src.engine.payload_codec import Payload, decode_payload
+from src.engine.settlement import SettlementWriter, TaskOutcome
+from src.engine.task_payload import EMBEDDED_VERSION, decode_embedded_task
 
 
 LOGGER = logging.getLogger(__name__)
 
+RESULT_EXECUTION_FAILED = "EXECUTION_FAILED"
+RESULT_RATE_LIMITED = "RATE_LIMITED"
+RESULT_TIMEOUT = "TIMEOUT"
+RESULT_LEASE_LOST = "LEASE_LOST"
+
+
+class _DeadlineExceeded(Exception):
+    """An adapter call did not finish before the task's deadline."""
+
+
+class _LeaseLost(Exception):
+    """The janitor reclaimed a lease of the running task."""
+
+
+@dataclass
+class PreparedTask:
+    """A hydrated task whose leases passed the consistency checks."""
+
+    task_id: str
+    task_type: str
+    timeout_ms: int
+    leases: List[Dict]
+    lease_ids: List[str]
+    payload: Optional[Payload] = None
+    # ``time.monotonic()`` value by which the task must finish; None if unbounded.
+    deadline: Optional[float] = None
+
 
 class Worker:
-    """Single-threaded worker that executes queued tasks."""
+    """Single-threaded worker that executes queued tasks.
 
-    POLL_INTERVAL = settings.worker_poll_interval
+    :class:`src.engine.worker_pool.WorkerPool` drives several workers, one per
+    database connection, to run tasks concurrently.
+    """
+
+    PREFETCH_COUNT = settings.worker_prefetch_count
+    ADAPTER_CALL_THREADS = settings.worker_adapter_call_threads
     MOCK_SUCCESS_RATE = settings.worker_mock_success_rate
+    # BLPOP treats a zero timeout as "block forever"; never pass less than this.
+    MIN_BLOCK_SECONDS = 0.01
+    # Status the Loader gives a task when it enqueues its payload.
+    DISPATCHED_STATUS = "QUEUED"
+    # Time granted to release assets after a task ran out of time.
+    RELEASE_GRACE_SECONDS = 5.0
 
-    SELECT_TASK_SQL = "SELECT task_type, timeout_ms FROM task_orders WHERE task_id=%s"
+    SELECT_TASK_SQL = "SELECT task_type, timeout_ms, status FROM task_orders WHERE task_id=%s"
     SELECT_LEASES_SQL = (
-        "SELECT l.lease_id, l.task_id, l.asset_id, a.tenant_id, a.project_id, a.meta_spec "
+        "SELECT l.lease_id, l.task_id, l.asset_id, a.tenant_id, a.project_id, a.meta_spec, a.sku_category "
         "FROM leases l "
         "JOIN creep_assets a ON l.asset_id = a.id "
         "WHERE l.lease_id = ANY(%s)"
     )
-    UPDATE_TASK_SUCCESS_SQL = (
-        "UPDATE task_orders SET status='SUCCESS', finished_at=CURRENT_TIMESTAMP, result_code=NULL WHERE task_id=%s"
-    )
-    UPDATE_TASK_FAILURE_SQL = (
-        "UPDATE task_orders SET status='FAILED', finished_at=CURRENT_TIMESTAMP, result_code=%s WHERE task_id=%s"
-    )
-    UPDATE_LEASE_SUCCESS_SQL = "UPDATE leases SET status='RELEASED' WHERE lease_id = ANY(%s)"
-    UPDATE_LEASE_FAILURE_SQL = "UPDATE leases SET status='REVOKED' WHERE lease_id = ANY(%s)"
-    UPDATE_ASSET_COOLING_SQL = (
-        "UPDATE creep_assets SET status='COOLING', cool_down_until = CURRENT_TIMESTAMP + INTERVAL '10 seconds' "
-        "WHERE id = ANY(%s)"
-    )
-    UPDATE_ASSET_FAILURE_SQL = "UPDATE creep_assets SET status='BANNED' WHERE id = ANY(%s)"
-    INSERT_EVENT_SQL = (
-        "INSERT INTO asset_events (asset_id, event_type, severity, error_code, occurred_at, recorded_at) "
-        "VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
-    )
-    INSERT_LEDGER_SQL = (
-        "INSERT INTO asset_ledger (asset_id, tenant_id, project_id, direction, reason, amount, created_at) "
-        "VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)"
-    )
 
     def __init__(
         self,
         dispenser,
         db_conn,
-        adapter: Optional[BaseAdapter] = None,
+        adapter: Optional[Union[BaseAdapter, AsyncBaseAdapter]] = None,
         adapter_name: str = "mock",
         adapter_config: Optional[Dict] = None,
+        settlement: Optional[SettlementWriter] = None,
+        health_cache: Optional[HealthCache] = None,
+        prefetch_count: Optional[int] = None,
+        heartbeat: Optional[LeaseHeartbeat] = None,
     ) -> None:
         self.dispenser = dispenser
         self.db_conn = db_conn
         self.adapter = adapter or AdapterFactory.create(adapter_name, adapter_config)
+        self.settlement = settlement or SettlementWriter(db_conn)
+        self.health_cache = health_cache or HealthCache()
+        self.prefetch_count = max(1, int(prefetch_count or self.PREFETCH_COUNT))
+        # Optional, shared by every worker of a pool or run by a standalone
+        # worker's run_forever (on its own connection); it renews the leases
+        # of running tasks until their settlement commits.
+        self.heartbeat = heartbeat
+        self._prefetched: Deque[Payload] = deque()
+        self._adapter_calls: Optional[ThreadPoolExecutor] = None
 
     def run_forever(self) -> None:
-        """Continuously process task payloads from the queue."""
+        """Continuously process task payloads from the queue.
 
-        while True:
-            payload = self.dispenser.acquire()
-            if payload is None:
-                time.sleep(self.POLL_INTERVAL)
-                continue
+        A ``heartbeat`` passed to a standalone worker is started here and
+        stopped when the loop exits.
+        """
 
-            self._process_one(payload)
+        if self.heartbeat is not None:
+            self.heartbeat.start()
+        try:
+            while True:
+                self._flush_settlements(force=False)
+                payload = self._next_payload()
+                if payload is None:
+                    self._flush_settlements()
+                    continue
 
-    def _process_one(self, payload: str) -> None:
+                self._process_one(payload)
+        finally:
+            if self.heartbeat is not None:
+                self.heartbeat.stop()
+
+    @property
+    def prefetched(self) -> int:
+        return len(self._prefetched)
+
+    def _next_payload(self) -> Optional[Payload]:
+        """Return the next payload, refilling the prefetch buffer when empty.
+
+        The refill blocks in Redis, which doubles as the idle wait.
+        """
+
+        if not self._prefetched:
+            batch = self.dispenser.acquire_batch(
+                self.prefetch_count, timeout=self._acquire_timeout()
+            )
+            self._prefetched.extend(batch)
+        if not self._prefetched:
+            return None
+        return self._prefetched.popleft()
+
+    def _acquire_timeout(self) -> Optional[float]:
+        """Blocking timeout for the next dequeue, ``None`` for the default.
+
+        While settlements are buffered, never block past their deadline.
+        """
+
+        wait = self.settlement.seconds_until_due()
+        if wait is None:
+            return None
+        return max(wait, self.MIN_BLOCK_SECONDS)
+
+    def _process_one(self, payload: Payload) -> None:
         """Process a single task order and settle the related leases."""
 
+        task = self._prepare(payload)
+        if task is None:
+            return
+
+        try:
+            result_code = self._execute_task(task.task_type, task.leases, task.deadline)
+        except BaseException:
+            # No outcome will settle these leases; let them lapse to the janitor.
+            self._untrack(task.lease_ids)
+            raise
+        self._settle(self._outcome(task, result_code))
+
+    async def _process_one_async(self, payload: Payload, executor=None) -> None:
+        """Async variant of :meth:`_process_one`.
+
+        Database work runs on ``executor`` because the DB-API connection is
+        blocking; adapter calls are awaited directly and fanned out per lease.
+        """
+
+        loop = asyncio.get_running_loop()
+        task = await loop.run_in_executor(executor, self._prepare, payload)
+        if task is None:
+            return
+
+        try:
+            result_code = await self._execute_task_async(
+                task.task_type, task.leases, task.deadline, executor
+            )
+        except BaseException:
+            self._untrack(task.lease_ids)
+            raise
+        await loop.run_in_executor(executor, self._settle, self._outcome(task, result_code))
+
+    def _settle(self, outcome: TaskOutcome) -> None:
+        self._ack(self.settlement.submit(outcome))
+
+    def _flush_settlements(self, force: bool = True) -> None:
+        """Flush buffered settlements (only when due unless ``force``)."""
+
+        flushed = self.settlement.flush() if force else self.settlement.flush_if_due()
+        self._ack(flushed)
+
+    def _ack(self, outcomes: List[TaskOutcome]) -> None:
+        # Acknowledge only after the commit so a crash in between redelivers.
+        for outcome in outcomes:
+            self._untrack(outcome.lease_ids)
+            if outcome.payload is not None:
+                self.dispenser.ack(outcome.payload)
+
+    def _untrack(self, lease_ids: List[str]) -> None:
+        if self.heartbeat is not None:
+            self.heartbeat.untrack(lease_ids)
+
+    def _outcome(self, task: PreparedTask, result_code: Optional[str]) -> TaskOutcome:
+        if result_code is None:
+            return TaskOutcome(
+                task.task_id, "SUCCESS", task.leases, task.lease_ids, payload=task.payload
+            )
+        # Neither a vendor quota, a slow vendor nor a reclaimed lease says
+        # anything about the assets themselves; keep them.
+        ban_assets = result_code not in (RESULT_RATE_LIMITED, RESULT_TIMEOUT, RESULT_LEASE_LOST)
+        return TaskOutcome(
+            task.task_id,
+            "TIMEOUT" if result_code == RESULT_TIMEOUT else "FAILED",
+            task.leases,
+            task.lease_ids,
+            result_code,
+            ban_assets=ban_assets,
+            payload=task.payload,
+        )
+
+    def _prepare(self, payload: Payload) -> Optional[PreparedTask]:
+        """Hydrate a payload into a runnable task.
+
+        Payloads that embed their task (version 2) run without touching the
+        database. Other payloads, embedded ones that fail their integrity
+        check and ones the dispenser redelivered are hydrated from the
+        database, whose status check drops tasks that were already settled
+        before their vendor calls run again.
+
+        Payloads that cannot be run are handled here: unparsable, unknown or
+        already settled tasks are dropped (and acknowledged) and inconsistent
+        leases are settled as failures.
+        """
+
         parsed = self._parse_payload(payload)
         if parsed is None:
-            return
+            self.dispenser.ack(payload)
+            return None
 
         task_id = parsed.get("task_id")
         lease_ids = parsed.get("lease_ids") or []
         if not task_id:
             LOGGER.error("Received payload without task_id: %s", payload)
-            return
+            self.dispenser.ack(payload)
+            return None
+
+        embedded = decode_embedded_task(parsed)
+        if embedded is not None:
+            # A redelivered payload may have run already; hydrating checks that.
+            if not self.dispenser.redelivered(payload):
+                return self._prepared(
+                    task_id,
+                    embedded.task_type,
+                    embedded.timeout_ms,
+                    embedded.leases,
+                    lease_ids,
+                    payload,
+                    embedded.expires_at,
+                )
+        elif isinstance(parsed.get("v"), int) and parsed["v"] >= EMBEDDED_VERSION:
+            LOGGER.warning("Payload for task %s failed its integrity check; hydrating", task_id)
 
         try:
             with self.db_conn.cursor() as cursor:
@@ -92,7 +274,21 @@ class Worker:
                         "Task %s not found during hydration. Dropping payload.", task_id
                     )
                     self.db_conn.rollback()
-                    return
+                    self.dispenser.ack(payload)
+                    return None
+
+                task_type, timeout_ms, status = task_row
+                if status != self.DISPATCHED_STATUS:
+                    # Redelivered after its settlement committed but before the ack.
+                    LOGGER.warning(
+                        "Task %s is %s, not %s. Dropping redelivered payload.",
+                        task_id,
+                        status,
+                        self.DISPATCHED_STATUS,
+                    )
+                    self.db_conn.rollback()
+                    self.dispenser.ack(payload)
+                    return None
 
                 leases = self._fetch_leases(cursor, lease_ids)
 
@@ -102,40 +298,68 @@ class Worker:
 
             if missing_assets or invalid_task_link or missing_leases:
                 result_code = "DATA_INCONSISTENCY" if leases else "RESOURCE_ERROR"
-                with self.db_conn.cursor() as cursor:
-                    if missing_leases:
-                        LOGGER.critical(
-                            "Missing leases for task %s: %s", task_id, sorted(missing_leases)
-                        )
-                    if missing_assets:
-                        LOGGER.critical("Missing assets for task %s", task_id)
-                    if invalid_task_link:
-                        LOGGER.critical("Lease/task mismatch detected for task %s", task_id)
-                    self._settle_failure(
-                        cursor, task_id, leases, result_code, lease_ids
+                if missing_leases:
+                    LOGGER.critical(
+                        "Missing leases for task %s: %s", task_id, sorted(missing_leases)
                     )
-                self.db_conn.commit()
-                return
-
-            task_type, _timeout_ms = task_row
-            success = self._execute_task(task_type, leases)
-
-            with self.db_conn.cursor() as cursor:
-                if success:
-                    self._settle_success(cursor, task_id, leases)
-                else:
-                    self._settle_failure(cursor, task_id, leases, "EXECUTION_FAILED", lease_ids)
-
-            self.db_conn.commit()
+                if missing_assets:
+                    LOGGER.critical("Missing assets for task %s", task_id)
+                if invalid_task_link:
+                    LOGGER.critical("Lease/task mismatch detected for task %s", task_id)
+                self._settle(
+                    TaskOutcome(task_id, "FAILED", leases, lease_ids, result_code, payload=payload)
+                )
+                return None
         except Exception:
             self.db_conn.rollback()
             raise
 
-    def _parse_payload(self, payload: str) -> Optional[Dict]:
+        return self._prepared(
+            task_id, task_type, timeout_ms, leases, lease_ids, payload, parsed.get("expires_at")
+        )
+
+    def _prepared(
+        self,
+        task_id: str,
+        task_type: str,
+        timeout_ms: int,
+        leases: List[Dict],
+        lease_ids: List[str],
+        payload: Payload,
+        expires_at: Optional[int] = None,
+    ) -> PreparedTask:
+        if self.heartbeat is not None:
+            self.heartbeat.track(lease_ids)
+        return PreparedTask(
+            task_id,
+            task_type,
+            timeout_ms,
+            leases,
+            lease_ids,
+            payload,
+            self._deadline(timeout_ms, expires_at),
+        )
+
+    @staticmethod
+    def _deadline(timeout_ms: Optional[int], expires_at: Optional[int]) -> Optional[float]:
+        """Monotonic deadline of a task, ``None`` when it has no timeout.
+
+        ``timeout_ms`` counts from the claim, when the Loader set the leases to
+        expire at ``expires_at`` (epoch milliseconds), so the time the payload
+        spent queued is taken off. Without an expiry it counts from now.
+        """
+
+        if not timeout_ms or timeout_ms <= 0:
+            return None
+        now = time.monotonic()
+        deadline = now + timeout_ms / 1000.0
+        if isinstance(expires_at, int) and not isinstance(expires_at, bool):
+            deadline = min(deadline, now + expires_at / 1000.0 - time.time())
+        return deadline
+
+    def _parse_payload(self, payload: Payload) -> Optional[Dict]:
         try:
-            if isinstance(payload, bytes):
-                payload = payload.decode()
-            return json.loads(payload)
+            return decode_payload(payload)
         except Exception:
             LOGGER.error("Unable to parse payload: %s", payload)
             return None
@@ -151,7 +375,7 @@ class Worker:
         cursor.execute(self.SELECT_LEASES_SQL, (lease_ids,))
         rows = cursor.fetchall() or []
         leases: List[Dict] = []
-        for lease_id, task_id, asset_id, tenant_id, project_id, meta_spec in rows:
+        for lease_id, task_id, asset_id, tenant_id, project_id, meta_spec, sku_category in rows:
             leases.append(
                 {
                     "lease_id": lease_id,
@@ -160,87 +384,235 @@ class Worker:
                     "tenant_id": tenant_id,
                     "project_id": project_id,
                     "meta_spec": meta_spec,
+                    "sku_category": sku_category,
                 }
             )
         return leases
 
-    def _execute_task(self, task_type: str, leases: List[Dict]) -> bool:
+    def _execute_task(
+        self, task_type: str, leases: List[Dict], deadline: Optional[float] = None
+    ) -> Optional[str]:
+        """Run the adapter calls for ``leases`` as three batched round trips.
+
+        Returns ``None`` on success, otherwise the failure result code. With
+        a ``deadline`` the acquire and health calls run on the adapter-call
+        executor and the worker stops waiting for them once the deadline
+        passes; the task then fails with ``TIMEOUT`` and its assets are
+        released straight away. A task whose leases the heartbeat reports
+        lost stops before its next adapter call with ``LEASE_LOST``.
+        """
+
         del task_type
         acquired_assets: List[str] = []
         try:
-            for lease in leases:
-                specs = lease.get("meta_spec") or {}
-                payload = self.adapter.acquire(specs)
-                acquired_assets.append(payload.get("asset_id", lease.get("asset_id")))
-
-            for asset_id in acquired_assets:
-                health = self.adapter.check_health(asset_id)
-                if health.get("status") == "unhealthy":
-                    return False
-
-            return True
+            specs = [lease.get("meta_spec") or {} for lease in leases]
+            self._check_leases(leases)
+            try:
+                payloads = self._call_by(deadline, self.adapter.acquire_many, specs)
+            except _DeadlineExceeded:
+                # What the adapter managed to acquire is unknown; release it all.
+                acquired_assets = [lease.get("asset_id") for lease in leases]
+                raise
+            acquired_assets = self._acquired_asset_ids(leases, payloads)
+            self._check_leases(leases)
+            categories = [lease.get("sku_category") for lease in leases]
+            cached = self.health_cache.get_many(acquired_assets, categories)
+            stale = [i for i, asset_id in enumerate(acquired_assets) if asset_id not in cached]
+            if stale:
+                fresh = self._call_by(
+                    deadline, self.adapter.check_health_many, [acquired_assets[i] for i in stale]
+                )
+                self._remember_health(cached, acquired_assets, categories, stale, fresh)
+            return self._health_result([cached[asset_id] for asset_id in acquired_assets])
+        except _DeadlineExceeded:
+            LOGGER.warning("Task ran past its deadline; cancelling it")
+            return RESULT_TIMEOUT
+        except _LeaseLost:
+            return RESULT_LEASE_LOST
+        except QuotaExceededError:
+            LOGGER.warning("Vendor quota exhausted while executing task")
+            return RESULT_RATE_LIMITED
         except AdapterError:
             LOGGER.exception("Adapter failure while executing task")
-            return False
+            return RESULT_EXECUTION_FAILED
         finally:
-            for asset_id in acquired_assets:
+            if acquired_assets:
                 try:
-                    self.adapter.release(asset_id)
+                    released = self._call_by(
+                        self._release_deadline(deadline), self.adapter.release_many, acquired_assets
+                    )
                 except AdapterError:
-                    LOGGER.exception("Adapter failed to release asset %s", asset_id)
-
-    def _settle_success(self, cursor, task_id: str, leases: List[Dict]) -> None:
-        asset_ids = [lease["asset_id"] for lease in leases]
-        lease_ids = [lease["lease_id"] for lease in leases]
-        cursor.execute(self.UPDATE_TASK_SUCCESS_SQL, (task_id,))
-        if lease_ids:
-            cursor.execute(self.UPDATE_LEASE_SUCCESS_SQL, (lease_ids,))
-        if asset_ids:
-            cursor.execute(self.UPDATE_ASSET_COOLING_SQL, (asset_ids,))
-            for lease in leases:
-                cursor.execute(
-                    self.INSERT_EVENT_SQL,
-                    (lease["asset_id"], "TASK_SUCCESS", "INFO", None),
-                )
-                cursor.execute(
-                    self.INSERT_LEDGER_SQL,
-                    (
-                        lease["asset_id"],
-                        lease.get("tenant_id"),
-                        lease.get("project_id"),
-                        "OUT",
-                        "TASK_BURN",
-                        0.01,
-                    ),
-                )
+                    LOGGER.exception("Adapter failed to release assets %s", acquired_assets)
+                except _DeadlineExceeded:
+                    LOGGER.error("Adapter did not release assets %s in time", acquired_assets)
+                else:
+                    self._log_release_failures(acquired_assets, released)
 
-    def _settle_failure(
+    async def _execute_task_async(
         self,
-        cursor,
-        task_id: str,
+        task_type: str,
         leases: List[Dict],
-        result_code: str,
-        lease_ids: List[str],
-    ) -> None:
-        asset_ids = [lease["asset_id"] for lease in leases]
-        cursor.execute(self.UPDATE_TASK_FAILURE_SQL, (result_code, task_id))
-        if lease_ids:
-            cursor.execute(self.UPDATE_LEASE_FAILURE_SQL, (lease_ids,))
-        if asset_ids:
-            cursor.execute(self.UPDATE_ASSET_FAILURE_SQL, (asset_ids,))
-            for lease in leases:
-                cursor.execute(
-                    self.INSERT_EVENT_SQL,
-                    (lease["asset_id"], "TASK_FAIL", "ERROR", result_code),
+        deadline: Optional[float] = None,
+        executor=None,
+    ) -> Optional[str]:
+        """Async variant of :meth:`_execute_task`.
+
+        Only the ``*_async`` adapter methods are used, so ``self.adapter`` may
+        be any :class:`AsyncBaseAdapter`. Calls still pending at the deadline
+        are cancelled. A Redis-backed health cache is read and written on
+        ``executor``, since its client blocks.
+        """
+
+        del task_type
+        acquired_assets: List[str] = []
+        try:
+            specs = [lease.get("meta_spec") or {} for lease in leases]
+            self._check_leases(leases)
+            try:
+                payloads = await self._await_by(deadline, self.adapter.acquire_many_async(specs))
+            except _DeadlineExceeded:
+                acquired_assets = [lease.get("asset_id") for lease in leases]
+                raise
+            acquired_assets = self._acquired_asset_ids(leases, payloads)
+            self._check_leases(leases)
+            categories = [lease.get("sku_category") for lease in leases]
+            cached = await self._health_cache_call(
+                executor, self.health_cache.get_many, acquired_assets, categories
+            )
+            stale = [i for i, asset_id in enumerate(acquired_assets) if asset_id not in cached]
+            if stale:
+                fresh = await self._await_by(
+                    deadline,
+                    self.adapter.check_health_many_async([acquired_assets[i] for i in stale]),
                 )
-                cursor.execute(
-                    self.INSERT_LEDGER_SQL,
-                    (
-                        lease["asset_id"],
-                        lease.get("tenant_id"),
-                        lease.get("project_id"),
-                        "OUT",
-                        "TASK_BURN",
-                        0.01,
-                    ),
+                await self._health_cache_call(
+                    executor,
+                    self._remember_health,
+                    cached,
+                    acquired_assets,
+                    categories,
+                    stale,
+                    fresh,
                 )
+            return self._health_result([cached[asset_id] for asset_id in acquired_assets])
+        except _DeadlineExceeded:
+            LOGGER.warning("Task ran past its deadline; cancelling it")
+            return RESULT_TIMEOUT
+        except _LeaseLost:
+            return RESULT_LEASE_LOST
+        except QuotaExceededError:
+            LOGGER.warning("Vendor quota exhausted while executing task")
+            return RESULT_RATE_LIMITED
+        except AdapterError:
+            LOGGER.exception("Adapter failure while executing task")
+            return RESULT_EXECUTION_FAILED
+        finally:
+            if acquired_assets:
+                try:
+                    released = await self._await_by(
+                        self._release_deadline(deadline),
+                        self.adapter.release_many_async(acquired_assets),
+                    )
+                except AdapterError:
+                    LOGGER.exception("Adapter failed to release assets %s", acquired_assets)
+                except _DeadlineExceeded:
+                    LOGGER.error("Adapter did not release assets %s in time", acquired_assets)
+                else:
+                    self._log_release_failures(acquired_assets, released)
+
+    async def _health_cache_call(self, executor, func, *args):
+        if self.health_cache.redis_client is None:
+            # In-process only: cheaper than a hop to the executor.
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    def _check_leases(self, leases: List[Dict]) -> None:
+        """Raise :class:`_LeaseLost` if the janitor reclaimed any of ``leases``.
+
+        Their assets may already be bound to another task, so the vendor
+        calls must stop.
+        """
+
+        if self.heartbeat is None:
+            return
+        lost = self.heartbeat.lost(lease["lease_id"] for lease in leases)
+        if lost:
+            LOGGER.warning("Leases %s were reclaimed mid-task; abandoning it", lost)
+            raise _LeaseLost()
+
+    def _release_deadline(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        return max(deadline, time.monotonic()) + self.RELEASE_GRACE_SECONDS
+
+    def _call_by(self, deadline: Optional[float], func, *args):
+        """Call ``func`` and wait for it until ``deadline`` at most.
+
+        A blocking call cannot be interrupted, so it runs on the worker's
+        adapter-call executor and is abandoned on timeout; the worker moves on
+        either way. The executor's ``ADAPTER_CALL_THREADS`` cap how many
+        abandoned calls can pile up: once a hung vendor holds every thread,
+        further calls queue, time out and are cancelled before they start.
+        """
+
+        if deadline is None:
+            return func(*args)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise _DeadlineExceeded()
+
+        if self._adapter_calls is None:
+            self._adapter_calls = ThreadPoolExecutor(
+                max_workers=max(1, int(self.ADAPTER_CALL_THREADS)),
+                thread_name_prefix="creep-adapter-call",
+            )
+        future = self._adapter_calls.submit(func, *args)
+        done, _ = wait([future], timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            future.cancel()
+            raise _DeadlineExceeded()
+        return future.result()
+
+    @staticmethod
+    async def _await_by(deadline: Optional[float], awaitable):
+        """Await ``awaitable``, cancelling it if ``deadline`` passes first."""
+
+        if deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if time.monotonic() < deadline:
+                raise  # raised by the adapter itself
+            raise _DeadlineExceeded() from None
+
+    def _remember_health(
+        self,
+        cached: Dict[str, Dict],
+        asset_ids: List[str],
+        categories: List[Optional[str]],
+        stale: List[int],
+        fresh: List[Dict],
+    ) -> None:
+        checked = [asset_ids[i] for i in stale]
+        self.health_cache.put_many(zip(checked, fresh), [categories[i] for i in stale])
+        cached.update(zip(checked, fresh))
+
+    @staticmethod
+    def _health_result(healths: List[Dict]) -> Optional[str]:
+        if any(health.get("status") == "unhealthy" for health in healths):
+            return RESULT_EXECUTION_FAILED
+        return None
+
+    @staticmethod
+    def _acquired_asset_ids(leases: List[Dict], payloads: List[Dict]) -> List[str]:
+        return [
+            payload.get("asset_id", lease.get("asset_id"))
+            for lease, payload in zip(leases, payloads)
+        ]
+
+    @staticmethod
+    def _log_release_failures(asset_ids: List[str], released: List[bool]) -> None:
+        for asset_id, ok in zip(asset_ids, released):
+            if not ok:
+                LOGGER.error("Adapter failed to release asset %s", asset_id)
@@ -0,0 +1,178 @@
+"""Concurrent worker pool that runs many tasks on one event loop."""
+
+import asyncio
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.adapters.base import AsyncBaseAdapter
+from src.adapters.factory import AdapterFactory
+from src.config import settings
+from src.engine.health_cache import HealthCache
+from src.engine.lease_heartbeat import LeaseHeartbeat
+from src.engine.worker import Worker
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Runs up to ``concurrency`` tasks at once.
+
+    Each slot owns a :class:`Worker` bound to its own database connection, so
+    hydration and settlement never share a transaction between tasks. Adapter
+    calls go through the ``*_async`` adapter API and are fanned out per lease,
+    while blocking database and Redis calls run on a dedicated thread pool
+    sized to the slot count. All slots share one :class:`HealthCache` and,
+    when ``heartbeat`` is enabled, one :class:`LeaseHeartbeat` on a connection
+    of its own.
+
+    :meth:`stop` requests a graceful drain: slots finish the task they are
+    running and any payloads they prefetched, flush buffered settlements and
+    close their connections. A dispenser with a ``close`` method (such as
+    :class:`ReliableDispenser`) is closed too, so its consumer deregisters.
+    """
+
+    CONCURRENCY = settings.worker_pool_concurrency
+    HEARTBEAT_ENABLED = settings.lease_heartbeat_enabled
+    # Pause after a slot's Redis or database call fails, before it retries.
+    ERROR_BACKOFF_SECONDS = 1.0
+
+    def __init__(
+        self,
+        dispenser,
+        connection_factory: Callable[[], object],
+        adapter: Optional[AsyncBaseAdapter] = None,
+        adapter_name: str = "mock",
+        adapter_config: Optional[Dict] = None,
+        concurrency: Optional[int] = None,
+        health_cache: Optional[HealthCache] = None,
+        heartbeat: Optional[bool] = None,
+    ) -> None:
+        self.dispenser = dispenser
+        self.connection_factory = connection_factory
+        self.adapter = adapter or AdapterFactory.create(
+            adapter_name, adapter_config, prefer_async=True
+        )
+        if not self.adapter.native_async:
+            LOGGER.warning(
+                "Adapter %s has no native async implementation; vendor calls will use threads",
+                type(self.adapter).__name__,
+            )
+        self.concurrency = max(1, int(concurrency or self.CONCURRENCY))
+        self.health_cache = health_cache or HealthCache()
+        self.heartbeat_enabled = self.HEARTBEAT_ENABLED if heartbeat is None else heartbeat
+        self.heartbeat: Optional[LeaseHeartbeat] = None
+        self._stopping = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.processed = 0
+
+    def stop(self) -> None:
+        """Stop taking new payloads and let in-flight tasks drain."""
+
+        self._stopping.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def run_forever(self) -> None:
+        """Run the pool until SIGINT/SIGTERM, then drain."""
+
+        asyncio.run(self._run_with_signals())
+
+    async def _run_with_signals(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await self.run()
+
+    async def run(self) -> None:
+        """Run all slots until :meth:`stop` is called and every slot drained."""
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="creep-worker"
+        )
+        workers: List[Worker] = []
+        try:
+            if self.heartbeat_enabled:
+                self.heartbeat = LeaseHeartbeat(self.connection_factory())
+                self.heartbeat.start()
+            for _ in range(self.concurrency):
+                workers.append(
+                    Worker(
+                        self.dispenser,
+                        self.connection_factory(),
+                        adapter=self.adapter,
+                        health_cache=self.health_cache,
+                        heartbeat=self.heartbeat,
+                    )
+                )
+            # Slots handle their own errors; never close connections while
+            # another slot may still be using them.
+            results = await asyncio.gather(
+                *(self._run_slot(worker) for worker in workers), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    LOGGER.error("Worker slot exited with an error", exc_info=result)
+        finally:
+            close_dispenser = getattr(self.dispenser, "close", None)
+            if close_dispenser is not None:
+                # Deregisters a reliable consumer and hands back unacked work.
+                try:
+                    close_dispenser()
+                except Exception:
+                    LOGGER.exception("Failed to close the dispenser")
+            for worker in workers:
+                try:
+                    worker.db_conn.close()
+                except Exception:
+                    LOGGER.exception("Failed to close worker connection")
+            if self.heartbeat is not None:
+                # Workers have flushed their settlements; nothing is left to renew.
+                self.heartbeat.stop()
+                self.heartbeat.db_conn.close()
+                self.heartbeat = None
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run_slot(self, worker: Worker) -> None:
+        try:
+            while not self.stopping or worker.prefetched:
+                try:
+                    await self._call(worker._flush_settlements, False)
+                    payload = await self._call(worker._next_payload)
+                    if payload is None:
+                        await self._call(worker._flush_settlements)
+                        continue
+                except Exception:
+                    # Redis or the database is unavailable; the slot stays up
+                    # and retries, and unflushed settlements stay buffered.
+                    LOGGER.exception("Worker slot failed to fetch or settle; backing off")
+                    await asyncio.sleep(self.ERROR_BACKOFF_SECONDS)
+                    continue
+
+                try:
+                    await worker._process_one_async(payload, self._executor)
+                except Exception:
+                    LOGGER.exception("Worker slot failed to process payload")
+                    continue
+                self.processed += 1
+        finally:
+            try:
+                await self._call(worker._flush_settlements)
+            except Exception:
+                LOGGER.exception(
+                    "Worker slot could not flush %d settlement(s) before exiting",
+                    worker.settlement.pending,
+                )
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
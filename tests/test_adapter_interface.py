@@ -1,9 +1,60 @@
+import asyncio
+import threading
 import unittest
 
-from src.adapters.base import BaseAdapter, QuotaExceededError, ResourceUnavailableError
+from src.adapters.base import (
+    AsyncBaseAdapter,
+    BaseAdapter,
+    QuotaExceededError,
+    ResourceUnavailableError,
+)
+from src.adapters.factory import AdapterFactory
 from src.adapters.mock_vendor import MockAdapter
 
 
+QUIET_MOCK_CONFIG = {
+    "latency_ms": 0,
+    "latency_jitter_ms": 0,
+    "rate_limit_probability": 0,
+    "provider_error_probability": 0,
+}
+
+
+class _ThreadRecordingAdapter(BaseAdapter):
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.threads = []
+
+    def acquire(self, specs):
+        self.threads.append(threading.get_ident())
+        return {"asset_id": specs["asset_id"]}
+
+    def release(self, asset_id):
+        return True
+
+    def check_health(self, asset_id):
+        return self._health_status(asset_id, "healthy")
+
+    @property
+    def cost_model(self):
+        return {"model": "flat"}
+
+
+class _NativeAsyncAdapter(AsyncBaseAdapter):
+    async def acquire_async(self, specs):
+        return {"asset_id": specs["asset_id"]}
+
+    async def release_async(self, asset_id):
+        return True
+
+    async def check_health_async(self, asset_id):
+        return self._health_status(asset_id, "healthy")
+
+    @property
+    def cost_model(self):
+        return {"model": "flat"}
+
+
 class AdapterInterfaceTests(unittest.TestCase):
     def test_mock_adapter_complies_with_base(self):
         adapter: BaseAdapter = MockAdapter({
@@ -46,5 +97,79 @@ class AdapterInterfaceTests(unittest.TestCase):
             adapter.check_health("asset-1")
 
 
+    def test_mock_adapter_async_is_native(self):
+        adapter = MockAdapter(QUIET_MOCK_CONFIG)
+        self.assertTrue(adapter.native_async)
+
+        async def scenario():
+            main_thread = threading.get_ident()
+            payload = await adapter.acquire_async({"asset_id": "asset-9"})
+            health = await adapter.check_health_async(payload["asset_id"])
+            released = await adapter.release_async(payload["asset_id"])
+            return main_thread, payload, health, released
+
+        main_thread, payload, health, released = asyncio.run(scenario())
+        self.assertEqual(threading.get_ident(), main_thread)
+        self.assertEqual("asset-9", payload["asset_id"])
+        self.assertEqual("healthy", health["status"])
+        self.assertTrue(released)
+
+    def test_sync_adapter_async_falls_back_to_thread(self):
+        adapter = _ThreadRecordingAdapter()
+        self.assertFalse(adapter.native_async)
+
+        payload = asyncio.run(adapter.acquire_async({"asset_id": "asset-1"}))
+
+        self.assertEqual("asset-1", payload["asset_id"])
+        self.assertNotEqual(threading.get_ident(), adapter.threads[0])
+
+    def test_mock_batch_calls_are_single_round_trips(self):
+        adapter = MockAdapter(QUIET_MOCK_CONFIG)
+        calls = []
+        adapter._simulate_latency = lambda: calls.append("latency")
+
+        payloads = adapter.acquire_many([{"asset_id": "a"}, {"asset_id": "b"}, {"asset_id": "c"}])
+        healths = adapter.check_health_many([p["asset_id"] for p in payloads])
+        released = adapter.release_many([p["asset_id"] for p in payloads])
+
+        self.assertEqual(["a", "b", "c"], [p["asset_id"] for p in payloads])
+        self.assertEqual(["healthy"] * 3, [h["status"] for h in healths])
+        self.assertEqual([True] * 3, released)
+        self.assertEqual(3, len(calls))
+        self.assertEqual([], adapter.acquire_many([]))
+
+    def test_default_acquire_many_releases_partial_batch_on_failure(self):
+        adapter = _ThreadRecordingAdapter()
+        released = []
+        adapter.release = lambda asset_id: released.append(asset_id) or True
+
+        def acquire(specs):
+            if specs["asset_id"] == "bad":
+                raise ResourceUnavailableError("gone")
+            return {"asset_id": specs["asset_id"]}
+
+        adapter.acquire = acquire
+
+        with self.assertRaises(ResourceUnavailableError):
+            adapter.acquire_many([{"asset_id": "a"}, {"asset_id": "b"}, {"asset_id": "bad"}])
+        self.assertEqual(["a", "b"], released)
+
+        async def failing_release(asset_id):
+            raise QuotaExceededError("slow down")
+
+        adapter.release_async = failing_release
+        self.assertEqual([False, False], asyncio.run(adapter.release_many_async(["a", "b"])))
+
+    def test_factory_prefers_registered_async_implementation(self):
+        AdapterFactory.register("dual", _ThreadRecordingAdapter)
+        AdapterFactory.register_async("dual", _NativeAsyncAdapter)
+        self.addCleanup(AdapterFactory._REGISTRY.pop, "dual", None)
+        self.addCleanup(AdapterFactory._ASYNC_REGISTRY.pop, "dual", None)
+
+        self.assertIsInstance(AdapterFactory.create("dual"), _ThreadRecordingAdapter)
+        self.assertIsInstance(AdapterFactory.create("dual", prefer_async=True), _NativeAsyncAdapter)
+        self.assertIsInstance(AdapterFactory.create("mock", prefer_async=True), MockAdapter)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.adapters import middleware
+from src.adapters.base import AsyncBaseAdapter, QuotaExceededError
+from src.adapters.factory import AdapterFactory
+from src.adapters.middleware import (
+    AsyncRateLimitedAdapter,
+    RateLimitedAdapter,
+    TokenBucket,
+    VendorLimiter,
+)
+from src.adapters.mock_vendor import MockAdapter
+from src.engine.settlement import SettlementWriter
+from src.engine.worker import Worker
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_reserve_returns_wait_once_burst_is_spent(self):
+        clock = _FakeClock()
+        bucket = TokenBucket(rate_per_second=10, burst=2, clock=clock)
+
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve())
+        self.assertAlmostEqual(0.2, bucket.reserve())
+
+        clock.now = 1.0
+        self.assertAlmostEqual(2.0, bucket.available)
+
+
+class RateLimitedAdapterTests(unittest.TestCase):
+    def _flaky_inner(self, failures):
+        inner = MockAdapter({
+            "latency_ms": 0,
+            "latency_jitter_ms": 0,
+            "rate_limit_probability": 0,
+            "provider_error_probability": 0,
+        })
+        remaining = [failures]
+
+        def acquire_many(specs):
+            if remaining[0]:
+                remaining[0] -= 1
+                raise QuotaExceededError("slow down")
+            return [{"asset_id": spec["asset_id"]} for spec in specs]
+
+        inner.acquire_many = acquire_many
+        return inner
+
+    def test_retries_quota_errors_with_backoff(self):
+        adapter = RateLimitedAdapter(
+            self._flaky_inner(2), VendorLimiter("flaky"), {"max_retries": 3, "retry_backoff_ms": 10}
+        )
+
+        with patch("src.adapters.middleware.time.sleep") as sleep_mock:
+            payloads = adapter.acquire_many([{"asset_id": "asset-1"}])
+
+        self.assertEqual("asset-1", payloads[0]["asset_id"])
+        self.assertEqual(2, sleep_mock.call_count)
+        for call in sleep_mock.call_args_list:
+            self.assertLessEqual(call[0][0], 0.04)
+        self.assertEqual(2, adapter.metrics()["retries"])
+        self.assertEqual(3, adapter.metrics()["calls"])
+
+    def test_gives_up_after_max_retries(self):
+        adapter = RateLimitedAdapter(
+            self._flaky_inner(5), VendorLimiter("flaky"), {"max_retries": 1, "retry_backoff_ms": 0}
+        )
+
+        with self.assertRaises(QuotaExceededError):
+            adapter.acquire_many([{"asset_id": "asset-1"}])
+
+    def test_bounds_concurrent_calls_per_vendor(self):
+        limiter = VendorLimiter("slow", max_concurrency=2)
+        inner = MagicMock()
+        inner.native_async = False
+        inner.config = {}
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def check_health(asset_id):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return {"asset_id": asset_id, "status": "healthy"}
+
+        inner.check_health.side_effect = check_health
+        adapter = RateLimitedAdapter(inner, limiter, {})
+
+        threads = [threading.Thread(target=adapter.check_health, args=(f"a{i}",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(2, state["peak"])
+        metrics = adapter.metrics()
+        self.assertEqual(6, metrics["calls"])
+        self.assertEqual(0, metrics["in_flight"])
+        self.assertEqual(0, metrics["queue_depth"])
+
+    def test_async_path_shares_limits(self):
+        limiter = VendorLimiter("async-vendor", max_concurrency=1)
+        adapter = RateLimitedAdapter(
+            MockAdapter({"latency_ms": 10, "latency_jitter_ms": 0,
+                         "rate_limit_probability": 0, "provider_error_probability": 0}),
+            limiter,
+            {},
+        )
+        self.assertTrue(adapter.native_async)
+
+        async def scenario():
+            return await asyncio.gather(*(adapter.check_health_async(f"a{i}") for i in range(3)))
+
+        started = time.monotonic()
+        results = asyncio.run(scenario())
+        self.assertEqual(3, len(results))
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+
+class FactoryMiddlewareTests(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(middleware._LIMITERS.clear)
+
+    def test_factory_wraps_only_when_limits_configured(self):
+        self.assertIsInstance(AdapterFactory.create("mock"), MockAdapter)
+
+        first = AdapterFactory.create("mock", {"rate_limit_per_second": "50", "max_concurrency": "4"})
+        second = AdapterFactory.create("mock", {"rate_limit_per_second": "50"})
+
+        self.assertIsInstance(first, RateLimitedAdapter)
+        self.assertIs(first.limiter, second.limiter)
+        self.assertEqual(4, first.metrics()["max_concurrency"])
+
+    def test_conflicting_vendor_limits_are_logged(self):
+        first = AdapterFactory.create("mock", {"rate_limit_per_second": "50"})
+
+        with self.assertLogs("src.adapters.middleware", "WARNING") as logs:
+            second = AdapterFactory.create("mock", {"rate_limit_per_second": "5"})
+
+        self.assertIs(first.limiter, second.limiter)
+        self.assertEqual(50.0, second.limiter.bucket.rate)
+        self.assertIn("rate_limit_per_second", logs.output[0])
+
+    def test_native_only_async_adapter_gets_an_async_wrapper(self):
+        class AsyncOnly(AsyncBaseAdapter):
+            async def acquire_async(self, specs):
+                return {"asset_id": "asset-1"}
+
+            async def release_async(self, asset_id):
+                return True
+
+            async def check_health_async(self, asset_id):
+                return self._health_status(asset_id, "healthy")
+
+            @property
+            def cost_model(self):
+                return {}
+
+        AdapterFactory.register_async("async-only", AsyncOnly)
+        self.addCleanup(AdapterFactory._ASYNC_REGISTRY.pop, "async-only")
+        AdapterFactory.register("async-only", MockAdapter)
+        self.addCleanup(AdapterFactory._REGISTRY.pop, "async-only")
+
+        adapter = AdapterFactory.create(
+            "async-only", {"rate_limit_per_second": "50"}, prefer_async=True
+        )
+
+        self.assertIsInstance(adapter, AsyncRateLimitedAdapter)
+        self.assertNotIsInstance(adapter, RateLimitedAdapter)
+        self.assertFalse(hasattr(adapter, "acquire_many"))
+        payloads = asyncio.run(adapter.acquire_many_async([{}, {}]))
+        self.assertEqual(["asset-1", "asset-1"], [payload["asset_id"] for payload in payloads])
+        self.assertEqual(1, adapter.metrics()["calls"])
+
+
+class WorkerRateLimitTests(unittest.TestCase):
+    def test_exhausted_quota_keeps_assets_out_of_banned(self):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.__exit__.return_value = None
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        cursor.fetchall.return_value = [("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms")]
+        db = MagicMock()
+        db.cursor.return_value = cursor
+
+        adapter = MagicMock()
+        adapter.acquire_many.side_effect = QuotaExceededError("slow down")
+        worker = Worker(MagicMock(), db, adapter=adapter)
+
+        worker._process_one('{"task_id": "task-1", "lease_ids": ["lease-1"]}')
+
+        cursor.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["FAILED"], ["RATE_LIMITED"])
+        )
+        cursor.execute.assert_any_call(SettlementWriter.UPDATE_ASSET_COOLING_SQL, (["lease-1"],))
+        executed = [call[0][0] for call in cursor.execute.call_args_list]
+        self.assertNotIn(SettlementWriter.UPDATE_ASSET_FAILURE_SQL, executed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from src.engine.allocator import BomAllocator, HintKey, parse_bom, pools_may_overlap
+from src.engine.loader import Loader
+
+UK = HintKey("RAW_NET", "ip.uk")
+ANY_IP = HintKey("RAW_NET", "ip.*")
+SMS = HintKey("SMS")
+
+
+class BomAllocatorTests(unittest.TestCase):
+    def test_parse_bom_aggregates_per_pool(self):
+        bom = parse_bom(
+            [
+                {"sku_category": "RAW_NET", "sku_code": "ip.uk"},
+                {"sku_category": "RAW_NET", "sku_code": "ip.uk", "min_count": 2},
+                {"sku_category": "SMS", "attributes": {"b": 1, "a": 2}},
+            ]
+        )
+
+        self.assertEqual([(UK, 3), (HintKey("SMS", None, '{"a": 2, "b": 1}'), 1)], bom)
+        self.assertIsNone(parse_bom([{"sku_code": "ip.uk"}]))
+
+    def test_overlap_is_decided_by_category_and_codes(self):
+        self.assertTrue(pools_may_overlap(UK, ANY_IP))
+        self.assertFalse(pools_may_overlap(UK, HintKey("RAW_NET", "ip.us")))
+        self.assertFalse(pools_may_overlap(UK, SMS))
+        self.assertFalse(pools_may_overlap(HintKey("RAW_NET", "dc.*"), ANY_IP))
+        self.assertTrue(pools_may_overlap(HintKey("RAW_NET", "ip.u*"), ANY_IP))
+
+    def test_admits_whole_boms_in_order(self):
+        allocator = BomAllocator({UK: 2, ANY_IP: 3, SMS: 1})
+
+        admitted = allocator.allocate(
+            [
+                [(UK, 1), (SMS, 1)],
+                [(SMS, 1)],  # SMS exhausted by the first task
+                [(UK, 1), (ANY_IP, 1)],  # ip.* shares stock with ip.uk
+                [(ANY_IP, 1)],  # 3 - 1 - 1 - 1 = 0 left
+                None,
+            ]
+        )
+
+        self.assertEqual([True, False, True, False, False], admitted)
+        self.assertEqual({UK: 0, ANY_IP: 0, SMS: 0}, allocator.remaining)
+
+    def test_rejected_bom_reserves_nothing(self):
+        allocator = BomAllocator({UK: 1, SMS: 0})
+
+        self.assertFalse(allocator.admit([(UK, 1), (SMS, 1)]))
+        self.assertTrue(allocator.admit([(UK, 1)]))
+
+
+class LoaderPreflightTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cursor = MagicMock()
+        self.cursor.__enter__.return_value = self.cursor
+        self.db = MagicMock()
+        self.db.cursor.return_value = self.cursor
+
+    def test_infeasible_tasks_are_deferred_before_locking(self):
+        hints = [{"sku_category": "RAW_NET", "sku_code": "ip.uk.*", "min_count": 1}]
+        tasks = [
+            ("task-1", "tenant-1", json.dumps(hints), 5000, 90, "RAW_CHECK"),
+            ("task-2", "tenant-1", json.dumps(hints), 5000, 10, "RAW_CHECK"),
+        ]
+        self.cursor.fetchall.side_effect = [
+            tasks,
+            [(1, 1)],  # one READY asset for both tasks
+            [("asset-1", "RAW_NET", "ip.uk.a", {}, "EXCLUSIVE")],
+            [("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+        loader = Loader(self.db, MagicMock(), bom_preflight=True)
+
+        payloads = loader.sync()
+
+        self.cursor.execute.assert_any_call(
+            Loader.COUNT_READY_SQL, (2, ["RAW_NET"], ["ip.uk.%"], [None], ["{}"])
+        )
+        lock_calls = [
+            call for call in self.cursor.execute.call_args_list if call[0][0] == Loader.LOCK_ASSETS_SQL
+        ]
+        self.assertEqual(1, len(lock_calls))
+        self.assertEqual(["task-1"], [json.loads(payload)["task_id"] for payload in payloads])
+        self.assertEqual(1, loader.last_stats.deferred)
+
+    def test_preflight_is_skipped_when_disabled(self):
+        self.cursor.fetchall.side_effect = [
+            [("task-1", "tenant-1", [{"sku_category": "SMS"}], 5000, 50, "RAW_CHECK")],
+            [],
+        ]
+
+        Loader(self.db, MagicMock(), bom_preflight=False).sync()
+
+        executed = [call[0][0] for call in self.cursor.execute.call_args_list]
+        self.assertNotIn(Loader.COUNT_READY_SQL, executed)
+        self.assertIn(Loader.LOCK_ASSETS_SQL, executed)
+
+
+if __name__ == "__main__":
+    unittest.main()
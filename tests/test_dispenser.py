@@ -0,0 +1,359 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from src.engine.dispenser import Dispenser, ReliableDispenser
+from src.engine.payload_codec import BINARY_CODEC
+from src.engine.priority_queues import PriorityBand, PriorityQueues
+from src.engine.settlement import SettlementWriter
+from src.engine.task_payload import encode_task_payload
+from src.engine.worker import Worker
+
+
+def _raw(value):
+    return value if isinstance(value, bytes) else value.encode()
+
+
+class _FakeRedis:
+    """Just enough list/set/string semantics for the reliable dispenser."""
+
+    def __init__(self):
+        self.lists = {}
+        self.sets = {}
+        self.values = {}
+        self.blmoves = []
+
+    def blmove(self, src, dest, timeout, wherefrom, whereto):
+        self.blmoves.append((src, timeout))
+        return self.lmove(src, dest, wherefrom, whereto)
+
+    def lmove(self, src, dest, wherefrom, whereto):
+        items = self.lists.get(src)
+        if not items:
+            return None
+        value = items.pop(0 if wherefrom == "LEFT" else -1)
+        target = self.lists.setdefault(dest, [])
+        if whereto == "LEFT":
+            target.insert(0, value)
+        else:
+            target.append(value)
+        return _raw(value)
+
+    def blpop(self, keys, timeout=0):
+        for key in keys:
+            items = self.lists.get(key)
+            if items:
+                return key.encode(), _raw(items.pop(0))
+        return None
+
+    def lpop(self, key, count=None):
+        items = self.lists.get(key)
+        if not items:
+            return None
+        popped, self.lists[key] = items[:count], items[count:]
+        return [_raw(item) for item in popped]
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    def smembers(self, key):
+        return {member.encode() for member in self.sets.get(key, set())}
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    def set(self, key, value, px=None):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipeline:
+            def __init__(self):
+                self.results = []
+
+            def __getattr__(self, name):
+                def queued(*args, **kwargs):
+                    self.results.append(getattr(redis, name)(*args, **kwargs))
+
+                return queued
+
+            def execute(self):
+                results, self.results = self.results, []
+                return results
+
+        return _Pipeline()
+
+
+class DispenserBatchTests(unittest.TestCase):
+    def test_acquire_batch_blocks_for_first_then_pops_rest(self):
+        redis = _FakeRedis()
+        redis.lists["creep:assets"] = ["p-1", "p-2", "p-3"]
+        dispenser = Dispenser(redis)
+
+        self.assertEqual(["p-1", "p-2"], dispenser.acquire_batch(2))
+        self.assertEqual(["p-3"], dispenser.acquire_batch(5))
+        self.assertEqual([], dispenser.acquire_batch(5, timeout=0.01))
+
+
+class TenantDispenserTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.redis = _FakeRedis()
+        self.queues = PriorityQueues("q", [PriorityBand("all", 0)], per_tenant=True)
+
+    def test_batch_is_shared_between_tenants(self):
+        self.redis.lists["q:all:tenant:t-1"] = ["a-1", "a-2", "a-3"]
+        self.redis.lists["q:all:tenant:t-2"] = ["b-1", "b-2", "b-3"]
+        self.redis.sets["q:all:tenants"] = {"t-1", "t-2"}
+        dispenser = Dispenser(self.redis, "q", queues=self.queues)
+
+        batch = dispenser.acquire_batch(4)
+
+        self.assertEqual(["a-1", "a-2"], sorted(p for p in batch if p.startswith("a")))
+        self.assertEqual(["b-1", "b-2"], sorted(p for p in batch if p.startswith("b")))
+
+    def test_refresh_prunes_tenants_whose_list_drained(self):
+        self.redis.lists["q:all:tenant:t-2"] = ["b-1"]
+        self.redis.sets["q:all:tenants"] = {"t-1", "t-2"}
+        dispenser = Dispenser(self.redis, "q", queues=self.queues)
+
+        self.assertEqual("b-1", dispenser.acquire())
+
+        self.assertEqual({"t-2"}, self.redis.sets["q:all:tenants"])
+        self.assertEqual(["q:all:tenant:t-2", "q:all"], dispenser._drain_order())
+
+    def test_tenant_refilled_while_pruning_stays_registered(self):
+        redis = self.redis
+        redis.sets["q:all:tenants"] = {"t-1"}
+        srem = redis.srem
+
+        def srem_racing_loader(key, *members):
+            srem(key, *members)
+            # The Loader pushes (its SADD landed before this SREM).
+            redis.lists["q:all:tenant:t-1"] = ["a-1"]
+
+        redis.srem = srem_racing_loader
+        dispenser = Dispenser(redis, "q", queues=self.queues)
+
+        self.assertEqual("a-1", dispenser.acquire())
+        self.assertEqual({"t-1"}, redis.sets["q:all:tenants"])
+
+
+class ReliableDispenserTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.redis = _FakeRedis()
+        self.redis.lists["creep:assets"] = ["p-1", "p-2", "p-3"]
+
+    def _dispenser(self, consumer_id, background_heartbeat=False):
+        return ReliableDispenser(
+            self.redis,
+            consumer_id=consumer_id,
+            heartbeat_ttl_ms=3000,
+            reclaim_interval_ms=0,
+            background_heartbeat=background_heartbeat,
+        )
+
+    def test_first_dequeue_setup_runs_once_across_threads(self):
+        dispenser = self._dispenser("w-1")
+        in_setup = threading.Event()
+        release_setup = threading.Event()
+        heartbeat = dispenser.heartbeat
+        calls = []
+
+        def slow_heartbeat():
+            calls.append(threading.current_thread().name)
+            if len(calls) == 1:
+                in_setup.set()
+                release_setup.wait(5)
+            heartbeat()
+
+        dispenser.heartbeat = slow_heartbeat
+        popped = []
+        first = threading.Thread(target=lambda: popped.append(dispenser.acquire()))
+        first.start()
+        in_setup.wait(5)
+        second = threading.Thread(target=lambda: popped.append(dispenser.acquire()))
+        second.start()
+        second.join(0.05)
+        # The second dequeue waits for the setup instead of racing its requeue.
+        self.assertEqual([], popped)
+        release_setup.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(["p-1", "p-2"], sorted(popped))
+        self.assertEqual(["p-1", "p-2"], sorted(self.redis.lists[dispenser.processing_key]))
+        self.assertEqual([], self.redis.lists.get("creep:assets:redelivered", []))
+        self.assertFalse(dispenser.redelivered("p-1"))
+
+    def test_busy_consumer_stays_alive_without_dequeuing(self):
+        busy = ReliableDispenser(
+            self.redis, consumer_id="w-1", heartbeat_ttl_ms=30, reclaim_interval_ms=0
+        )
+        busy.acquire()
+        # Longer than the TTL without a dequeue, e.g. a long-running task.
+        del self.redis.values["creep:assets:alive:w-1"]
+        time.sleep(0.05)
+
+        try:
+            self.assertEqual(0, self._dispenser("w-2").reclaim_abandoned())
+            self.assertEqual(["p-1"], self.redis.lists[busy.processing_key])
+        finally:
+            busy.close()
+        self.assertIsNone(busy._heartbeat_thread)
+
+    def test_payload_stays_in_processing_list_until_acked(self):
+        dispenser = self._dispenser("w-1")
+
+        self.assertEqual("p-1", dispenser.acquire())
+        self.assertEqual(["p-1"], self.redis.lists[dispenser.processing_key])
+        self.assertIn("w-1", self.redis.sets["creep:assets:consumers"])
+
+        dispenser.ack("p-1")
+
+        self.assertEqual([], self.redis.lists[dispenser.processing_key])
+        self.assertEqual(["p-2", "p-3"], self.redis.lists["creep:assets"])
+
+    def test_binary_payloads_are_handed_over_and_acked_as_bytes(self):
+        binary = encode_task_payload("task-1", ["lease-1"], version=1, codec=BINARY_CODEC)
+        self.redis.lists["creep:assets"] = [binary, "p-2"]
+        dispenser = self._dispenser("w-1")
+
+        self.assertEqual([binary, "p-2"], dispenser.acquire_batch(2))
+
+        dispenser.ack(binary)
+        self.assertEqual(["p-2"], self.redis.lists[dispenser.processing_key])
+
+    def test_abandoned_payloads_are_redelivered_in_order(self):
+        crashed = self._dispenser("w-1")
+        crashed.acquire()
+        crashed.acquire()
+        # The crashed consumer's heartbeat expires.
+        del self.redis.values["creep:assets:alive:w-1"]
+
+        survivor = self._dispenser("w-2")
+
+        self.assertEqual("p-1", survivor.acquire())
+        self.assertEqual(["p-2"], self.redis.lists["creep:assets:redelivered"])
+        self.assertEqual(["p-3"], self.redis.lists["creep:assets"])
+        self.assertEqual([], self.redis.lists[crashed.processing_key])
+        self.assertNotIn("w-1", self.redis.sets["creep:assets:consumers"])
+        # Redelivered payloads are flagged until acked; fresh ones never are.
+        self.assertEqual(["p-2", "p-3"], survivor.acquire_batch(1) + survivor.acquire_batch(1))
+        self.assertTrue(survivor.redelivered("p-1"))
+        self.assertTrue(survivor.redelivered("p-2"))
+        self.assertFalse(survivor.redelivered("p-3"))
+        survivor.ack("p-1")
+        self.assertFalse(survivor.redelivered("p-1"))
+
+    def test_acquire_batch_moves_every_payload_to_processing_list(self):
+        dispenser = self._dispenser("w-1")
+
+        self.assertEqual(["p-1", "p-2", "p-3"], dispenser.acquire_batch(4))
+        self.assertEqual(["p-1", "p-2", "p-3"], self.redis.lists[dispenser.processing_key])
+        self.assertEqual([], self.redis.lists["creep:assets"])
+
+    def test_banded_layout_moves_in_drain_order(self):
+        bands = [PriorityBand("high", 50, 2), PriorityBand("low", 0, 1)]
+        self.redis.lists = {"q:high": ["h-1", "h-2", "h-3"], "q:low": ["l-1", "l-2"]}
+        dispenser = ReliableDispenser(
+            self.redis,
+            "q",
+            consumer_id="w-1",
+            heartbeat_ttl_ms=3000,
+            reclaim_interval_ms=0,
+            background_heartbeat=False,
+            queues=PriorityQueues("q", bands),
+        )
+
+        self.assertEqual("h-1", dispenser.acquire())
+        # Weights 2:1, so the low band leads every third pop, batched or not.
+        self.assertEqual(["l-1", "h-2", "h-3"], dispenser.acquire_batch(3))
+        self.assertEqual(["l-2"], dispenser.acquire_batch(3))
+        self.assertEqual(
+            ["h-1", "l-1", "h-2", "h-3", "l-2"], self.redis.lists[dispenser.processing_key]
+        )
+        self.assertEqual([], self.redis.blmoves)
+
+        # With every list empty it blocks briefly on the leading one.
+        self.assertIsNone(dispenser.acquire(timeout=5))
+        self.assertEqual(
+            [("q:high", ReliableDispenser.BANDED_WAIT_MS / 1000.0)], self.redis.blmoves
+        )
+
+    def test_live_consumers_are_not_reclaimed(self):
+        busy = self._dispenser("w-1")
+        busy.acquire()
+
+        self.assertEqual(0, self._dispenser("w-2").reclaim_abandoned())
+        self.assertEqual(["p-1"], self.redis.lists[busy.processing_key])
+
+    def test_worker_acks_only_after_settlement_commits(self):
+        payload = json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]})
+        self.redis.lists["creep:assets"] = [payload]
+        dispenser = self._dispenser("w-1")
+
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        cursor.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms")
+        ]
+        db = MagicMock()
+        db.cursor.return_value = cursor
+        adapter = MagicMock()
+        adapter.acquire_many.side_effect = lambda specs: [{"payload": {}} for _ in specs]
+        adapter.check_health_many.side_effect = lambda ids: [{"healthy": True} for _ in ids]
+        adapter.release_many.side_effect = lambda ids: [True] * len(ids)
+        worker = Worker(
+            dispenser,
+            db,
+            adapter=adapter,
+            settlement=SettlementWriter(db, max_batch_size=2, max_delay_ms=10_000),
+        )
+
+        worker._process_one(dispenser.acquire())
+        self.assertEqual([payload], self.redis.lists[dispenser.processing_key])
+
+        worker._flush_settlements()
+        db.commit.assert_called_once()
+        self.assertEqual([], self.redis.lists[dispenser.processing_key])
+
+    def test_worker_drops_redelivered_settled_task(self):
+        payload = json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]})
+        dispenser = MagicMock()
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "SUCCESS")
+        db = MagicMock()
+        db.cursor.return_value = cursor
+        adapter = MagicMock()
+
+        Worker(dispenser, db, adapter=adapter)._process_one(payload)
+
+        adapter.acquire_many.assert_not_called()
+        dispenser.ack.assert_called_once_with(payload)
+        db.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from src.engine.health_cache import HealthCache
+from src.engine.worker import Worker
+
+
+def _status(asset_id, healthy=True):
+    return {
+        "asset_id": asset_id,
+        "healthy": healthy,
+        "status": "OK" if healthy else "DEGRADED",
+        "checked_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class HealthCacheTests(unittest.TestCase):
+    def test_entries_expire_per_category_ttl(self):
+        clock = FakeClock()
+        cache = HealthCache(default_ttl_ms=1000, ttl_by_category={"sms": 5000, "proxy": 0}, clock=clock)
+        cache.put_many(
+            [("a-1", _status("a-1")), ("a-2", _status("a-2")), ("a-3", _status("a-3"))],
+            [None, "sms", "proxy"],
+        )
+
+        self.assertEqual(set(cache.get_many(["a-1", "a-2", "a-3"], [None, "sms", "proxy"])), {"a-1", "a-2"})
+
+        clock.now += 2.0
+        self.assertEqual(set(cache.get_many(["a-1", "a-2"], [None, "sms"])), {"a-2"})
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = HealthCache(max_entries=2, default_ttl_ms=60_000)
+        cache.put_many([("a-1", _status("a-1")), ("a-2", _status("a-2"))])
+        cache.get_many(["a-1"])
+        cache.put_many([("a-3", _status("a-3"))])
+
+        self.assertEqual(set(cache.get_many(["a-1", "a-2", "a-3"])), {"a-1", "a-3"})
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_redis_tier_shares_results_between_caches(self):
+        store = {}
+        redis_mock = MagicMock()
+        pipeline = redis_mock.pipeline.return_value
+        pipeline.set.side_effect = lambda key, value, px: store.__setitem__(key, value.encode())
+        redis_mock.mget.side_effect = lambda keys: [store.get(key) for key in keys]
+
+        HealthCache(default_ttl_ms=1500, redis_client=redis_mock).put_many([("a-1", _status("a-1"))])
+        pipeline.set.assert_called_once()
+        self.assertEqual(pipeline.set.call_args.kwargs["px"], 1500)
+
+        other = HealthCache(default_ttl_ms=1500, redis_client=redis_mock)
+        found = other.get_many(["a-1", "a-2"])
+
+        self.assertEqual(found["a-1"], _status("a-1"))
+        self.assertEqual(other.stats()["remote_hits"], 1)
+        self.assertEqual(other.stats()["misses"], 1)
+        redis_mock.mget.assert_called_once_with(["creep:health:a-1", "creep:health:a-2"])
+
+
+class WorkerHealthCacheTests(unittest.TestCase):
+    def test_worker_only_checks_assets_missing_from_cache(self):
+        cache = HealthCache(default_ttl_ms=60_000)
+        cache.put_many([("asset-1", _status("asset-1"))], ["sms"])
+        adapter = MagicMock()
+        adapter.acquire_many.side_effect = lambda specs: [{"payload": {}} for _ in specs]
+        adapter.check_health_many.side_effect = lambda asset_ids: [_status(a) for a in asset_ids]
+        adapter.release_many.side_effect = lambda asset_ids: [True] * len(asset_ids)
+        worker = Worker(MagicMock(), MagicMock(), adapter=adapter, health_cache=cache)
+        leases = [
+            {"lease_id": "lease-1", "asset_id": "asset-1", "meta_spec": {}, "sku_category": "sms"},
+            {"lease_id": "lease-2", "asset_id": "asset-2", "meta_spec": {}, "sku_category": "sms"},
+        ]
+
+        self.assertIsNone(worker._execute_task("t", leases))
+        adapter.check_health_many.assert_called_once_with(["asset-2"])
+
+        self.assertIsNone(worker._execute_task("t", leases))
+        adapter.check_health_many.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from src.engine.inventory_index import InventoryIndex
+from src.engine.loader import Loader
+
+
+class InventoryIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = InventoryIndex()
+        self.index.add("a-1", "RAW_NET", "ip.residential.uk.london", {"geo": "UK"})
+        self.index.add("a-2", "RAW_NET", "ip.residential.uk", {"geo": "UK"})
+        self.index.add("a-3", "RAW_NET", "ip.residential.us.nyc", {"geo": "US"})
+        self.index.add("a-4", "RAW_NET", "ip.datacenter.uk", None)
+        self.index.add("a-5", "SMS", "sms.uk", {})
+
+    def test_exact_and_glob_lookups(self):
+        self.assertEqual(["a-2"], self.index.candidates("RAW_NET", "ip.residential.uk"))
+        self.assertEqual(["a-1"], self.index.candidates("RAW_NET", "ip.residential.uk.*"))
+        self.assertEqual(
+            {"a-1", "a-2", "a-3"}, set(self.index.candidates("RAW_NET", "ip.residential.*"))
+        )
+        self.assertEqual({"a-2", "a-4"}, set(self.index.candidates("RAW_NET", "ip.*.uk")))
+        self.assertEqual(4, len(self.index.candidates("RAW_NET")))
+        self.assertEqual([], self.index.candidates("RAW_NET", "ip.mobile.*"))
+
+    def test_attribute_filter_keeps_unknown_attributes(self):
+        self.assertEqual(
+            {"a-1", "a-2", "a-4"}, set(self.index.candidates("RAW_NET", None, {"geo": "UK"}))
+        )
+
+    def test_changes_move_assets_in_and_out(self):
+        self.index.apply_change({"id": "a-1", "status": "LOCKED"})
+        self.index.apply_change(
+            {"id": "a-6", "status": "READY", "sku_category": "RAW_NET", "sku_code": "ip.residential.uk.leeds"}
+        )
+
+        self.assertEqual(["a-6"], self.index.candidates("RAW_NET", "ip.residential.uk.*"))
+        self.assertNotIn("a-1", self.index)
+
+        self.index.discard(["a-5"])
+        self.assertEqual([], self.index.candidates("SMS"))
+
+    def test_notified_asset_has_unknown_attributes(self):
+        # a-3 is edited to UK; the notification does not carry attributes.
+        self.index.apply_change(
+            {"id": "a-3", "status": "READY", "sku_category": "RAW_NET", "sku_code": "ip.residential.us.nyc"}
+        )
+
+        self.assertIn("a-3", self.index.candidates("RAW_NET", None, {"geo": "UK"}))
+
+    def test_poll_applies_notifications(self):
+        listen_conn = MagicMock()
+        listen_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            ("b-1", "SMS", "sms.fr", {})
+        ]
+        index = InventoryIndex()
+        self.assertEqual(1, index.start(listen_conn))
+        listen_conn.notifies = [
+            SimpleNamespace(payload=json.dumps({"id": "b-1", "status": "LOCKED"})),
+            SimpleNamespace(payload=json.dumps({"id": "b-2", "status": "READY", "sku_category": "SMS", "sku_code": "sms.de"})),
+            # Statement-level triggers batch several rows into one array.
+            SimpleNamespace(
+                payload=json.dumps(
+                    [
+                        {"id": "b-3", "status": "READY", "sku_category": "SMS", "sku_code": "sms.it"},
+                        {"id": "b-2", "status": "LOCKED"},
+                    ]
+                )
+            ),
+        ]
+
+        self.assertEqual(4, index.poll())
+        self.assertEqual(["b-3"], index.candidates("SMS"))
+
+
+class LoaderInventoryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cursor = MagicMock()
+        self.cursor.__enter__.return_value = self.cursor
+        self.db = MagicMock()
+        self.db.cursor.return_value = self.cursor
+        self.inventory = InventoryIndex()
+        self.inventory.add("asset-1", "RAW_NET", "ip.uk.a", {})
+        self.inventory.add("asset-2", "RAW_NET", "ip.uk.b", {})
+
+    def _task(self, min_count):
+        return [("task-1", "tenant-1", [{"sku_category": "RAW_NET", "sku_code": "ip.uk.*", "min_count": min_count}], 5000, 50, "RAW_CHECK")]
+
+    def test_locks_index_candidates_by_primary_key(self):
+        self.cursor.fetchall.side_effect = [
+            self._task(2),
+            [("asset-1", "RAW_NET", "ip.uk.a", {}, "EXCLUSIVE"), ("asset-2", "RAW_NET", "ip.uk.b", {}, "EXCLUSIVE")],
+            [("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "RAW_NET"), ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+
+        payloads = Loader(self.db, MagicMock(), inventory=self.inventory).sync()
+
+        executed = [call[0][0] for call in self.cursor.execute.call_args_list]
+        self.assertNotIn(Loader.LOCK_ASSETS_SQL, executed)
+        lock_call = [call for call in self.cursor.execute.call_args_list if call[0][0] == Loader.LOCK_ASSETS_BY_ID_SQL][0]
+        self.assertEqual({"asset-1", "asset-2"}, set(lock_call[0][1][0]))
+        self.assertEqual(2, lock_call[0][1][-1])
+        self.assertEqual(1, len(payloads))
+        # Committed locks leave the index.
+        self.assertEqual(0, len(self.inventory))
+
+    def test_falls_back_to_scan_for_stale_entries(self):
+        self.cursor.fetchall.side_effect = [
+            self._task(2),
+            [("asset-1", "RAW_NET", "ip.uk.a", {}, "EXCLUSIVE")],
+            [],
+        ]
+
+        payloads = Loader(self.db, MagicMock(), inventory=self.inventory).sync()
+
+        self.cursor.execute.assert_any_call(Loader.LOCK_ASSETS_SQL, ("RAW_NET", "ip.uk.%", "ip.uk.%", None, None, "{}", ["asset-1"], 1))
+        self.assertEqual([], payloads)
+        # The deferred task's locks were rolled back, so the index keeps them.
+        self.assertEqual(2, len(self.inventory))
+
+
+if __name__ == "__main__":
+    unittest.main()
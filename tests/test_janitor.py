@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
 
-from src.engine import Janitor
+from src.engine import Janitor, ShardedJanitor
 
 
 class JanitorTests(unittest.TestCase):
@@ -26,12 +26,9 @@ class JanitorTests(unittest.TestCase):
         janitor = Janitor(self.db_mock)
         recovered = janitor.recover_timeouts()
 
-        self.cursor_mock.execute.assert_any_call(
-            Janitor.SELECT_EXPIRED_LOCKS_SQL, (Janitor.BATCH_SIZE,)
-        )
-        self.cursor_mock.execute.assert_any_call(Janitor.RECOVER_LOCKS_SQL, (["asset-1"],))
-        self.cursor_mock.execute.assert_any_call(
-            Janitor.INSERT_EVENT_SQL, ("asset-1", "LOCK_TIMEOUT_RECOVERY")
+        # Lock, transition and event insert happen in a single statement.
+        self.cursor_mock.execute.assert_called_once_with(
+            Janitor.RECOVER_EXPIRED_LOCKS_SQL, (Janitor.BATCH_SIZE, "LOCK_TIMEOUT_RECOVERY")
         )
         self.db_mock.commit.assert_called_once()
         self.assertEqual(["asset-1"], recovered)
@@ -43,7 +40,7 @@ class JanitorTests(unittest.TestCase):
         cooled = janitor.process_cooling()
 
         self.cursor_mock.execute.assert_called_once_with(
-            Janitor.SELECT_EXPIRED_COOLING_SQL, (Janitor.BATCH_SIZE,)
+            Janitor.RECOVER_EXPIRED_COOLING_SQL, (Janitor.BATCH_SIZE, "COOLING_ENDED")
         )
         self.db_mock.rollback.assert_called_once()
         self.assertEqual([], cooled)
@@ -59,15 +56,15 @@ class JanitorTests(unittest.TestCase):
 
         self.assertEqual(["asset-1"], first_batch)
         self.assertEqual([], second_batch)
-        select_calls = [call for call in self.cursor_mock.execute.call_args_list if call[0][0] == Janitor.SELECT_EXPIRED_LOCKS_SQL]
-        self.assertEqual(2, len(select_calls))
-        update_calls = [call for call in self.cursor_mock.execute.call_args_list if call[0][0] == Janitor.RECOVER_LOCKS_SQL]
-        self.assertEqual(1, len(update_calls))
+        recover_calls = [call for call in self.cursor_mock.execute.call_args_list if call[0][0] == Janitor.RECOVER_EXPIRED_LOCKS_SQL]
+        self.assertEqual(2, len(recover_calls))
+        self.assertEqual(1, self.db_mock.commit.call_count)
 
     def test_run_once_processes_multiple_batches_when_full(self):
         Janitor.BATCH_SIZE = 2
         Janitor.MAX_PROCESS_LIMIT = 10
         self.cursor_mock.fetchall.side_effect = [
+            [],
             [("asset-1",), ("asset-2",)],
             [("asset-3",)],
             [],
@@ -76,11 +73,132 @@ class JanitorTests(unittest.TestCase):
         janitor = Janitor(self.db_mock)
         janitor.run_once()
 
-        select_calls = [
+        recover_calls = [
             call for call in self.cursor_mock.execute.call_args_list
-            if call[0][0] == Janitor.SELECT_EXPIRED_LOCKS_SQL
+            if call[0][0] == Janitor.RECOVER_EXPIRED_LOCKS_SQL
         ]
-        self.assertEqual(2, len(select_calls))
+        self.assertEqual(2, len(recover_calls))
+        self.assertEqual(4, len(self.cursor_mock.execute.call_args_list))
+
+
+    def test_sweep_stops_at_max_process_limit(self):
+        Janitor.BATCH_SIZE = 2
+        Janitor.MAX_PROCESS_LIMIT = 3
+        self.cursor_mock.fetchall.side_effect = [[("asset-1",), ("asset-2",)], [("asset-3",)]]
+
+        cooled = Janitor(self.db_mock).process_cooling()
+
+        self.assertEqual(["asset-1", "asset-2", "asset-3"], cooled)
+        self.assertEqual(
+            [(2, "COOLING_ENDED"), (1, "COOLING_ENDED")],
+            [call[0][1] for call in self.cursor_mock.execute.call_args_list],
+        )
+
+
+    def test_shard_predicate_parameters_precede_limit(self):
+        self.cursor_mock.fetchall.return_value = []
+
+        Janitor(self.db_mock, shard=(3, 8)).recover_timeouts()
+
+        self.cursor_mock.execute.assert_called_once_with(
+            Janitor.RECOVER_EXPIRED_LOCKS_SHARD_SQL,
+            (8, 3, Janitor.BATCH_SIZE, "LOCK_TIMEOUT_RECOVERY"),
+        )
+
+    def test_adaptive_batch_grows_while_fast_and_halves_when_slow(self):
+        Janitor.BATCH_SIZE = 2
+        Janitor.MAX_PROCESS_LIMIT = 100
+        self.addCleanup(setattr, Janitor, "MIN_BATCH_SIZE", Janitor.MIN_BATCH_SIZE)
+        Janitor.MIN_BATCH_SIZE = 1
+        ticks = iter([0.0, 0.01, 1.0, 1.01, 2.0, 3.0, 4.0])
+        self.cursor_mock.fetchall.side_effect = [
+            [("a",), ("b",)],
+            [("c",), ("d",), ("e",), ("f",)],
+            [("g",)] * 6,
+            [],
+        ]
+
+        janitor = Janitor(self.db_mock, adaptive=True, clock=lambda: next(ticks))
+        janitor.recover_timeouts()
+
+        limits = [call[0][1][0] for call in self.cursor_mock.execute.call_args_list]
+        # 10ms commits grow the batch by BATCH_SIZE; the 1s commit halves it.
+        self.assertEqual([2, 4, 6, 3], limits)
+        self.assertEqual(3, janitor.batch_size)
+
+    def test_backlog_counts_expired_rows(self):
+        self.cursor_mock.fetchone.return_value = (120, 7)
+
+        backlog = Janitor(self.db_mock, shard=(0, 4)).backlog()
+
+        limit = Janitor.BACKLOG_COUNT_LIMIT
+        self.cursor_mock.execute.assert_called_once_with(
+            Janitor.COUNT_BACKLOG_SHARD_SQL, (4, 0, limit, 4, 0, limit)
+        )
+        self.assertEqual({"expired_locks": 120, "expired_cooling": 7}, backlog)
+        self.assertEqual(2, Janitor.COUNT_BACKLOG_SQL.count("LIMIT %s"))
+
+    def test_reclaims_expired_leases_with_one_event_per_lease(self):
+        self.cursor_mock.fetchall.side_effect = [[("asset-1",), ("asset-1",)]]
+
+        expired = Janitor(self.db_mock, shard=(1, 4)).reclaim_expired_leases()
+
+        self.assertEqual(["asset-1", "asset-1"], expired)
+        self.cursor_mock.execute.assert_called_once_with(
+            Janitor.RECLAIM_EXPIRED_LEASES_SHARD_SQL, (4, 1, Janitor.BATCH_SIZE, "LEASE_EXPIRED")
+        )
+        sql = Janitor.RECLAIM_EXPIRED_LEASES_SQL
+        self.assertIn("status='ACTIVE' AND expires_at < CURRENT_TIMESTAMP", sql)
+        self.assertIn("current_concurrency - e.ended", sql)
+        self.assertIn("a.lock_id::text = ANY(e.lease_ids)", sql)
+        self.db_mock.commit.assert_called_once()
+
+    def test_lock_recovery_ends_the_assets_leases(self):
+        for sql in (
+            Janitor.RECOVER_EXPIRED_LOCKS_SQL,
+            Janitor.RECOVER_EXPIRED_LOCKS_SHARD_SQL,
+            Janitor.RECOVER_LOCKS_BY_ID_SQL,
+        ):
+            self.assertIn("UPDATE leases SET status='EXPIRED' WHERE asset_id IN (SELECT id FROM moved)", sql)
+        self.assertNotIn("UPDATE leases", Janitor.RECOVER_EXPIRED_COOLING_SQL)
+
+
+class ShardedJanitorTests(unittest.TestCase):
+    def _connection(self, owns_lock):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.side_effect = [(owns_lock,), (5, 0)]
+        cursor.fetchall.side_effect = [[("asset-2",), ("asset-2",)], [("asset-1",)], []]
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        return conn
+
+    def test_sweeps_only_shards_whose_advisory_lock_it_holds(self):
+        connections = [self._connection(True), self._connection(False)]
+        janitor = ShardedJanitor(lambda: connections.pop(0), shard_count=2)
+
+        reports = sorted(janitor.run_once(), key=lambda report: report.shard)
+
+        owned = [report for report in reports if report.owned]
+        self.assertEqual(1, len(owned))
+        self.assertEqual(1, owned[0].recovered)
+        self.assertEqual(2, owned[0].expired_leases)
+        self.assertEqual({"expired_locks": 5, "expired_cooling": 0}, owned[0].backlog)
+        self.assertEqual(1, sum(not report.owned for report in reports))
+
+    def test_backlog_is_sampled_rather_than_counted_every_pass(self):
+        janitor = ShardedJanitor(MagicMock(), shard_count=1)
+        shard_janitor = MagicMock()
+        shard_janitor.backlog.return_value = {"expired_locks": 3, "expired_cooling": 0}
+        janitor._janitors[0] = shard_janitor
+        janitor._try_lock = MagicMock(return_value=True)
+        janitor._unlock = MagicMock()
+
+        for _ in range(ShardedJanitor.BACKLOG_SAMPLE_PASSES + 1):
+            reports = janitor.run_once()
+
+        self.assertEqual(2, shard_janitor.backlog.call_count)
+        self.assertEqual({"expired_locks": 3, "expired_cooling": 0}, reports[0].backlog)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from src.engine import Janitor, JanitorScheduler
+from src.engine.timer_wheel import TimerWheel
+
+
+class TimerWheelTests(unittest.TestCase):
+    def test_fires_each_key_once_at_its_deadline(self):
+        wheel = TimerWheel(now=0.0, tick_s=1.0, slots=4, levels=2)
+        wheel.schedule("near", 2.5)
+        wheel.schedule("far", 37.0)  # beyond both levels: overflow bucket
+        wheel.schedule("cancelled", 5.0)
+        wheel.cancel("cancelled")
+        wheel.schedule("moved", 3.0)
+        wheel.schedule("moved", 9.0)
+
+        fired = {}
+        for now in range(1, 41):
+            for key in wheel.advance(float(now)):
+                fired[key] = now
+
+        self.assertEqual({"near": 3, "moved": 9, "far": 37}, fired)
+        self.assertEqual(0, len(wheel))
+
+    def test_next_wakeup_is_never_late(self):
+        wheel = TimerWheel(now=0.0, tick_s=0.5, slots=4, levels=3)
+        wheel.schedule("asset", 11.2)
+
+        now = 0.0
+        fired = []
+        while not fired:
+            now += wheel.seconds_until_next(now) or 0.5
+            fired = wheel.advance(now)
+
+        self.assertEqual(["asset"], fired)
+        self.assertLessEqual(now, 11.5)
+
+
+class JanitorSchedulerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.janitor = MagicMock(spec=Janitor)
+        self.janitor.recover_locks.side_effect = lambda ids: list(ids)
+        self.janitor.end_cooling.side_effect = lambda ids: list(ids)
+        self.listen_conn = MagicMock()
+        self.cursor = self.listen_conn.cursor.return_value.__enter__.return_value
+        self.scheduler = JanitorScheduler(
+            self.janitor, self.listen_conn, TimerWheel(now=100.0, tick_s=0.01), clock=lambda: 100.0
+        )
+
+    def test_start_listens_before_seeding(self):
+        self.cursor.fetchall.return_value = [("asset-1", "COOLING", None, 100.5)]
+
+        self.assertEqual(1, self.scheduler.start())
+
+        executed = [call[0][0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(["LISTEN creep_asset_deadlines", JanitorScheduler.SEED_DEADLINES_SQL], executed)
+        self.assertTrue(self.listen_conn.autocommit)
+        self.assertEqual({"LOCKED": [], "COOLING": ["asset-1"]}, self.scheduler.fire_due(100.52))
+
+    def test_notifications_reschedule_and_cancel(self):
+        self.scheduler.handle_notification(
+            json.dumps({"id": "asset-1", "status": "LOCKED", "lock_expires_at": 101.0})
+        )
+        self.scheduler.handle_notification(
+            json.dumps(
+                [
+                    {"id": "asset-2", "status": "COOLING", "cool_down_until": 100.2},
+                    {"status": "LOCKED"},
+                    {"id": "asset-3", "status": "COOLING", "cool_down_until": 100.3},
+                ]
+            )
+        )
+        self.scheduler.handle_notification(json.dumps({"id": "asset-3", "status": "READY"}))
+        # asset-2 was settled again before its cooldown ended.
+        self.scheduler.handle_notification(json.dumps({"id": "asset-2", "status": "BANNED"}))
+        self.scheduler.handle_notification("not json")
+
+        self.assertEqual({"LOCKED": [], "COOLING": []}, self.scheduler.fire_due(100.5))
+        self.assertEqual({"LOCKED": ["asset-1"], "COOLING": []}, self.scheduler.fire_due(101.02))
+        self.janitor.recover_locks.assert_called_with(["asset-1"])
+
+    def test_unreconciled_deadline_is_retried(self):
+        self.janitor.end_cooling.side_effect = [[], ["asset-1"]]
+        self.scheduler.track("asset-1", "COOLING", None, 100.1)
+
+        self.assertEqual([], self.scheduler.fire_due(100.2)["COOLING"])
+        self.assertEqual(
+            ["asset-1"],
+            self.scheduler.fire_due(100.2 + JanitorScheduler.RETRY_DELAY_SECONDS + 0.02)["COOLING"],
+        )
+
+
+class JanitorReconcileByIdTests(unittest.TestCase):
+    def test_recover_locks_rechecks_expiry_and_logs_events(self):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchall.return_value = [("asset-1",)]
+        db = MagicMock()
+        db.cursor.return_value = cursor
+
+        recovered = Janitor(db).recover_locks(["asset-1", "asset-2"])
+
+        self.assertEqual(["asset-1"], recovered)
+        cursor.execute.assert_called_once_with(
+            Janitor.RECOVER_LOCKS_BY_ID_SQL, (["asset-1", "asset-2"], "LOCK_TIMEOUT_RECOVERY")
+        )
+        db.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
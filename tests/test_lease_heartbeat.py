@@ -0,0 +1,151 @@
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from src.adapters.base import BaseAdapter
+from src.engine.lease_heartbeat import LeaseHeartbeat
+from src.engine.worker import Worker
+
+
+def _connection():
+    cursor = MagicMock()
+    cursor.__enter__.return_value = cursor
+    conn = MagicMock()
+    conn.cursor.return_value = cursor
+    return conn, cursor
+
+
+class LeaseHeartbeatTests(unittest.TestCase):
+    def test_beat_renews_tracked_leases_in_one_statement(self):
+        conn, cursor = _connection()
+        cursor.fetchall.return_value = [("lease-1",), ("lease-2",)]
+        heartbeat = LeaseHeartbeat(conn, interval_ms=1000, ttl_ms=5000)
+        heartbeat.track(["lease-2", "lease-1"])
+
+        self.assertEqual(["lease-1", "lease-2"], heartbeat.beat())
+
+        cursor.execute.assert_called_once_with(
+            LeaseHeartbeat.RENEW_LEASES_SQL, (5.0, ["lease-1", "lease-2"])
+        )
+        conn.commit.assert_called_once()
+        self.assertEqual(2, len(heartbeat))
+
+    def test_leases_that_are_no_longer_active_are_dropped_and_reported(self):
+        conn, cursor = _connection()
+        cursor.fetchall.return_value = [("lease-1",)]
+        heartbeat = LeaseHeartbeat(conn, interval_ms=1000, ttl_ms=5000)
+        heartbeat.track(["lease-1", "lease-2"])
+
+        heartbeat.beat()
+
+        self.assertEqual(["lease-2"], heartbeat.lost(["lease-1", "lease-2"]))
+        self.assertEqual(1, len(heartbeat))
+        heartbeat.untrack(["lease-1", "lease-2"])
+        self.assertEqual([], heartbeat.lost(["lease-2"]))
+        self.assertEqual([], heartbeat.beat())
+
+    def test_failed_beat_rolls_back(self):
+        conn, cursor = _connection()
+        cursor.execute.side_effect = RuntimeError("db down")
+        heartbeat = LeaseHeartbeat(conn, interval_ms=1000, ttl_ms=5000)
+        heartbeat.track(["lease-1"])
+
+        with self.assertRaises(RuntimeError):
+            heartbeat.beat()
+        conn.rollback.assert_called_once()
+        self.assertEqual(1, len(heartbeat))
+
+    def test_rejects_ttl_not_above_interval(self):
+        with self.assertRaises(ValueError):
+            LeaseHeartbeat(MagicMock(), interval_ms=5000, ttl_ms=5000)
+
+    def test_background_thread_beats_until_stopped(self):
+        conn, cursor = _connection()
+        beaten = threading.Event()
+        cursor.fetchall.side_effect = lambda: beaten.set() or [("lease-1",)]
+        heartbeat = LeaseHeartbeat(conn, interval_ms=5, ttl_ms=1000)
+        heartbeat.track(["lease-1"])
+
+        heartbeat.start()
+        self.assertTrue(beaten.wait(1.0))
+        heartbeat.stop()
+
+
+class WorkerHeartbeatTests(unittest.TestCase):
+    def test_worker_tracks_leases_until_settlement_commits(self):
+        conn, cursor = _connection()
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        cursor.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+        adapter = MagicMock(spec=BaseAdapter)
+        adapter.acquire_many.side_effect = lambda specs: [{"asset_id": "asset-1"} for _ in specs]
+        adapter.check_health_many.side_effect = lambda ids: [{"status": "healthy"} for _ in ids]
+        adapter.release_many.side_effect = lambda ids: [True] * len(ids)
+        heartbeat = MagicMock()
+        heartbeat.lost.return_value = []
+        worker = Worker(MagicMock(), conn, adapter=adapter, heartbeat=heartbeat)
+
+        worker._process_one(json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]}))
+
+        heartbeat.track.assert_called_once_with(["lease-1"])
+        heartbeat.untrack.assert_called_once_with(["lease-1"])
+
+    def test_worker_untracks_leases_when_the_task_raises(self):
+        conn, cursor = _connection()
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        cursor.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+        adapter = MagicMock(spec=BaseAdapter)
+        adapter.acquire_many.side_effect = RuntimeError("adapter bug")
+        heartbeat = MagicMock()
+        heartbeat.lost.return_value = []
+        worker = Worker(MagicMock(), conn, adapter=adapter, heartbeat=heartbeat)
+
+        with self.assertRaises(RuntimeError):
+            worker._process_one(json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]}))
+
+        heartbeat.track.assert_called_once_with(["lease-1"])
+        heartbeat.untrack.assert_called_once_with(["lease-1"])
+
+    def test_worker_abandons_task_whose_lease_was_reclaimed(self):
+        conn, cursor = _connection()
+        cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        cursor.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+        heartbeat = LeaseHeartbeat(MagicMock(), interval_ms=1000, ttl_ms=5000)
+        adapter = MagicMock(spec=BaseAdapter)
+
+        def acquire_many(specs):
+            # The janitor reclaims the lease while the vendor call runs.
+            heartbeat._lost.add("lease-1")
+            return [{"asset_id": "asset-1"} for _ in specs]
+
+        adapter.acquire_many.side_effect = acquire_many
+        adapter.release_many.side_effect = lambda ids: [True] * len(ids)
+        worker = Worker(MagicMock(), conn, adapter=adapter, heartbeat=heartbeat)
+
+        worker._process_one(json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]}))
+
+        adapter.check_health_many.assert_not_called()
+        adapter.release_many.assert_called_once_with(["asset-1"])
+        self.assertEqual(0, len(heartbeat))
+        self.assertEqual([], heartbeat.lost(["lease-1"]))
+
+    def test_standalone_worker_runs_its_heartbeat(self):
+        heartbeat = MagicMock()
+        worker = Worker(MagicMock(), MagicMock(), adapter=MagicMock(), heartbeat=heartbeat)
+        worker._next_payload = MagicMock(side_effect=KeyboardInterrupt)
+
+        with self.assertRaises(KeyboardInterrupt):
+            worker.run_forever()
+
+        heartbeat.start.assert_called_once_with()
+        heartbeat.stop.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
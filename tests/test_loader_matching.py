@@ -3,6 +3,8 @@ import unittest
 from unittest.mock import MagicMock
 
 from src.engine.loader import Loader
+from src.engine.payload_codec import decode_payload
+from src.engine.task_payload import decode_embedded_task
 
 
 class LoaderMatchingTests(unittest.TestCase):
@@ -25,46 +27,51 @@ class LoaderMatchingTests(unittest.TestCase):
                 "tenant-1",
                 json.dumps([{"sku_category": "RAW_NET", "attributes": {"geo": "UK"}}]),
                 5000,
+                50,
+                "RAW_CHECK",
             )
         ]
 
-        candidate_assets = [
-            ("asset-us", "RAW_NET", "ip.us", {"geo": "US"}),
-            ("asset-uk", "RAW_NET", "ip.uk", {"geo": "UK"}),
-        ]
-
-        locked_assets = [("asset-uk", "RAW_NET", "ip.uk", {"geo": "UK"})]
+        locked_assets = [("asset-uk", "RAW_NET", "ip.uk", {"geo": "UK"}, "EXCLUSIVE")]
 
-        lease_rows = [("lease-1",)]
+        lease_rows = [("lease-1", "task-uk", "asset-uk", "tenant-1", "project-1", {}, "RAW_NET")]
 
         self.cursor_mock.fetchall.side_effect = [
             task_row,
-            candidate_assets,
             locked_assets,
+            lease_rows,
         ]
-        self.cursor_mock.fetchone.side_effect = lease_rows
 
         loader = Loader(self.db_mock, self.redis_mock, queue_name="creep:test")
         payloads = loader.sync()
 
         self.cursor_mock.execute.assert_any_call(Loader.CLAIM_PENDING_TASKS_SQL, (1,))
         self.cursor_mock.execute.assert_any_call(
-            Loader.SELECT_CANDIDATE_ASSETS_SQL, ("RAW_NET", None, None)
+            Loader.LOCK_ASSETS_SQL, ("RAW_NET", None, None, None, None, '{"geo": "UK"}', [], 1)
         )
-        self.cursor_mock.execute.assert_any_call(
-            f"{Loader.LOCK_ASSETS_SQL} LIMIT %s", ("RAW_NET", None, None, 1)
-        )
-        self.cursor_mock.execute.assert_any_call(
-            Loader.UPDATE_ASSET_STATUS_SQL, (["asset-uk"],)
-        )
-        self.cursor_mock.execute.assert_any_call(Loader.UPDATE_TASK_STATUS_SQL, ("task-uk",))
+        self.cursor_mock.execute.assert_any_call(Loader.UPDATE_TASK_STATUS_SQL, (["task-uk"],))
 
         self.db_mock.commit.assert_called_once()
-        self.redis_mock.rpush.assert_called_once()
+        self.redis_mock.pipeline.return_value.rpush.assert_called_once_with(
+            "creep:test", payloads[0]
+        )
+        self.redis_mock.pipeline.return_value.execute.assert_called_once()
 
         payload = json.loads(payloads[0])
         self.assertEqual("task-uk", payload["task_id"])
         self.assertEqual(["lease-1"], payload["lease_ids"])
+        embedded = decode_embedded_task(payload)
+        self.assertEqual("RAW_CHECK", embedded.task_type)
+        self.assertEqual(5000, embedded.timeout_ms)
+        self.assertEqual(["asset-uk"], [lease["asset_id"] for lease in embedded.leases])
+        # The leases expire timeout_ms after the claim, and the payload says when.
+        insert = next(
+            call
+            for call in self.cursor_mock.execute.call_args_list
+            if call[0][0] == Loader.INSERT_LEASES_SQL
+        )
+        expirations = insert[0][1][3]
+        self.assertEqual(int(expirations[0].timestamp() * 1000), embedded.expires_at)
 
     def test_skips_task_when_assets_unavailable(self):
         task_row = [
@@ -73,6 +80,8 @@ class LoaderMatchingTests(unittest.TestCase):
                 "tenant-1",
                 json.dumps([{"sku_category": "RAW_NET", "attributes": {"geo": "CA"}}]),
                 5000,
+                50,
+                "RAW_CHECK",
             )
         ]
 
@@ -82,9 +91,145 @@ class LoaderMatchingTests(unittest.TestCase):
         payloads = loader.sync()
 
         self.cursor_mock.execute.assert_any_call(Loader.CLAIM_PENDING_TASKS_SQL, (1,))
+        self.cursor_mock.execute.assert_any_call(Loader.ROLLBACK_TO_SAVEPOINT_SQL)
         self.db_mock.rollback.assert_called_once()
-        self.redis_mock.rpush.assert_not_called()
+        self.redis_mock.pipeline.assert_not_called()
         self.assertEqual([], payloads)
+        self.assertEqual(1, loader.last_stats.deferred)
+
+    def test_pushes_glob_and_min_count_into_lock_statement(self):
+        task_row = [
+            (
+                "task-pair",
+                "tenant-1",
+                [{"sku_category": "RAW_NET", "sku_code": "ip.uk.*", "min_count": 2}],
+                5000,
+                50,
+                "RAW_CHECK",
+            )
+        ]
+
+        self.cursor_mock.fetchall.side_effect = [
+            task_row,
+            [("asset-1", "RAW_NET", "ip.uk.a", {}, "EXCLUSIVE")],
+        ]
+
+        loader = Loader(self.db_mock, self.redis_mock)
+        payloads = loader.sync()
+
+        self.cursor_mock.execute.assert_any_call(
+            Loader.LOCK_ASSETS_SQL, ("RAW_NET", "ip.uk.%", "ip.uk.%", None, None, "{}", [], 2)
+        )
+        self.cursor_mock.execute.assert_any_call(Loader.ROLLBACK_TO_SAVEPOINT_SQL)
+        executed = [call[0][0] for call in self.cursor_mock.execute.call_args_list]
+        self.assertNotIn(Loader.INSERT_LEASES_SQL, executed)
+        self.assertEqual([], payloads)
+
+    def test_batch_binds_satisfiable_tasks_and_defers_the_rest(self):
+        task_rows = [
+            (
+                "task-uk",
+                "tenant-1",
+                json.dumps([{"sku_category": "RAW_NET", "attributes": {"geo": "UK"}}]),
+                5000,
+                50,
+                "RAW_CHECK",
+            ),
+            (
+                "task-ca",
+                "tenant-1",
+                json.dumps([{"sku_category": "RAW_NET", "attributes": {"geo": "CA"}}]),
+                5000,
+                50,
+                "RAW_CHECK",
+            ),
+            ("task-us", "tenant-2", [{"sku_category": "RAW_NET"}], 5000, 50, "RAW_CHECK"),
+        ]
+
+        self.cursor_mock.fetchall.side_effect = [
+            task_rows,
+            [("asset-uk", "RAW_NET", "ip.uk", {"geo": "UK"}, "EXCLUSIVE")],
+            [],
+            [("asset-us", "RAW_NET", "ip.us", {"geo": "US"}, "EXCLUSIVE")],
+            # RETURNING order is not guaranteed to follow the input order.
+            [("lease-us", "task-us", "asset-us", "tenant-1", "project-1", {}, "RAW_NET"), ("lease-uk", "task-uk", "asset-uk", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+
+        loader = Loader(self.db_mock, self.redis_mock, queue_name="creep:test")
+        payloads = loader.sync()
+
+        decoded = [json.loads(p) for p in payloads]
+        self.assertEqual(["task-uk", "task-us"], [p["task_id"] for p in decoded])
+        self.assertEqual([["lease-uk"], ["lease-us"]], [p["lease_ids"] for p in decoded])
+
+        lease_inserts = [
+            call for call in self.cursor_mock.execute.call_args_list
+            if call[0][0] == Loader.INSERT_LEASES_SQL
+        ]
+        self.assertEqual(1, len(lease_inserts))
+        tenant_ids, task_ids, asset_ids, expirations = lease_inserts[0][0][1]
+        self.assertEqual(["tenant-1", "tenant-2"], tenant_ids)
+        self.assertEqual(["task-uk", "task-us"], task_ids)
+        self.assertEqual(["asset-uk", "asset-us"], asset_ids)
+        self.assertEqual(2, len(expirations))
+        self.cursor_mock.execute.assert_any_call(
+            Loader.UPDATE_TASK_STATUS_SQL, (["task-uk", "task-us"],)
+        )
+        rollbacks = [
+            call for call in self.cursor_mock.execute.call_args_list
+            if call[0][0] == Loader.ROLLBACK_TO_SAVEPOINT_SQL
+        ]
+        self.assertEqual(1, len(rollbacks))
+
+        self.db_mock.commit.assert_called_once()
+        self.db_mock.rollback.assert_not_called()
+        self.redis_mock.pipeline.return_value.rpush.assert_called_once_with(
+            "creep:test", *payloads
+        )
+
+        stats = loader.last_stats
+        self.assertEqual(3, stats.claimed)
+        self.assertEqual(2, stats.bound)
+        self.assertEqual(1, stats.deferred)
+        self.assertEqual(2, stats.leases)
+
+    def test_binary_codec_enqueues_bytes(self):
+        self.cursor_mock.fetchall.side_effect = [
+            [("task-1", "tenant-1", [{"sku_category": "RAW_NET"}], 5000, 50, "RAW_CHECK")],
+            [("asset-1", "RAW_NET", "ip.uk", {}, "EXCLUSIVE")],
+            [("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+
+        payloads = Loader(self.db_mock, self.redis_mock, payload_codec="binary").sync()
+
+        self.assertIsInstance(payloads[0], bytes)
+        self.assertEqual(["lease-1"], decode_payload(payloads[0])["lease_ids"])
+        with self.assertRaises(ValueError):
+            Loader(self.db_mock, self.redis_mock, payload_codec="msgpack")
+
+    def test_shared_asset_is_taken_once_per_task_and_stays_indexed(self):
+        hints = [
+            {"sku_category": "VPS", "sku_code": "vps.eu"},
+            {"sku_category": "VPS", "sku_code": "vps.*"},
+        ]
+        self.cursor_mock.fetchall.side_effect = [
+            [("task-1", "tenant-1", json.dumps(hints), 5000, 50, "RAW_CHECK")],
+            [("asset-1", "VPS", "vps.eu", {}, "SHARED")],
+            [("asset-2", "VPS", "vps.us", {}, "EXCLUSIVE")],
+            [("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "RAW_NET"), ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+        inventory = MagicMock()
+        inventory.candidates.return_value = []
+
+        payloads = Loader(self.db_mock, self.redis_mock, inventory=inventory).sync()
+
+        lock_params = [
+            call[0][1] for call in self.cursor_mock.execute.call_args_list
+            if call[0][0] == Loader.LOCK_ASSETS_SQL
+        ]
+        self.assertEqual([[], ["asset-1"]], [params[-2] for params in lock_params])
+        self.assertEqual(["lease-1", "lease-2"], json.loads(payloads[0])["lease_ids"])
+        self.assertEqual(["asset-2"], list(inventory.discard.call_args[0][0]))
 
 
 if __name__ == "__main__":
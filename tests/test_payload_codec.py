@@ -0,0 +1,87 @@
+import json
+import unittest
+import uuid
+from pathlib import Path
+
+from src.engine.payload_codec import (
+    BINARY_CODEC,
+    BINARY_MAGIC,
+    FIELD_TAGS,
+    JSON_CODEC,
+    decode_payload,
+    encode_payload,
+    is_binary,
+)
+from src.engine.task_payload import decode_embedded_task, encode_task_payload
+
+TAGS_LOCKFILE = Path(__file__).resolve().parents[1] / "deploy" / "api" / "task_payload.tags.json"
+
+LEASE_ID = str(uuid.uuid4())
+LEASES = [
+    {
+        "lease_id": LEASE_ID,
+        "asset_id": str(uuid.uuid4()),
+        "tenant_id": "tenant-1",
+        "project_id": None,
+        "meta_spec": {"region": "uk", "weight": 0.5, "sticky": True},
+        "sku_category": "RAW_NET",
+    }
+]
+
+
+class PayloadCodecTests(unittest.TestCase):
+    def _payload(self, codec):
+        return encode_task_payload(
+            str(uuid.uuid4()), [LEASE_ID], "TICKET_SNIPER", 5000, LEASES, codec=codec
+        )
+
+    def test_binary_payload_decodes_to_the_json_payload(self):
+        binary = self._payload(BINARY_CODEC)
+        text = encode_payload(decode_payload(binary), JSON_CODEC)
+
+        self.assertTrue(is_binary(binary))
+        self.assertEqual(BINARY_MAGIC, binary[0])
+        self.assertEqual(json.loads(text), decode_payload(binary))
+        self.assertLess(len(binary), len(text))
+        # The checksum still holds after the round trip.
+        embedded = decode_embedded_task(decode_payload(binary))
+        self.assertEqual(LEASES[0]["asset_id"], embedded.leases[0]["asset_id"])
+
+    def test_decode_detects_the_codec(self):
+        text = self._payload(JSON_CODEC)
+
+        self.assertFalse(is_binary(text))
+        self.assertEqual(json.loads(text), decode_payload(text))
+        self.assertEqual(json.loads(text), decode_payload(text.encode()))
+
+    def test_integers_and_non_uuid_strings_round_trip(self):
+        payload = {"task_id": "task-1", "timeout_ms": -7, "crc": 2**32 - 1, "lease_ids": []}
+
+        self.assertEqual(payload, decode_payload(encode_payload(payload, BINARY_CODEC)))
+
+    def test_unknown_fields_are_skipped(self):
+        binary = encode_payload({"task_id": "task-1"}, BINARY_CODEC)
+        # String field tag 99 from a newer producer: key varint 99 << 3 | 1.
+        newer = binary + bytes((0x99, 0x06)) + b"\x02hi"
+
+        self.assertEqual({"task_id": "task-1"}, decode_payload(newer))
+
+    def test_untagged_field_cannot_be_encoded(self):
+        with self.assertRaises(ValueError):
+            encode_payload({"unregistered": 1}, BINARY_CODEC)
+
+    def test_truncated_payload_is_rejected(self):
+        binary = self._payload(BINARY_CODEC)
+
+        with self.assertRaises(ValueError):
+            decode_payload(binary[:-3])
+
+    def test_tags_match_lockfile(self):
+        locked = json.loads(TAGS_LOCKFILE.read_text(encoding="utf-8"))
+
+        self.assertEqual(locked, FIELD_TAGS)
+        self.assertEqual(len(set(locked.values())), len(locked))
+
+
+if __name__ == "__main__":
+    unittest.main()
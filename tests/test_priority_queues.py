@@ -0,0 +1,106 @@
+import json
+import unittest
+from collections import Counter
+from unittest.mock import MagicMock, call
+
+from src.engine.dispenser import Dispenser
+from src.engine.loader import Loader
+from src.engine.priority_queues import PriorityBand, PriorityQueues
+
+
+BANDS = [PriorityBand("high", 80, 3), PriorityBand("normal", 20, 2), PriorityBand("low", 0, 1)]
+
+
+class PriorityQueuesTests(unittest.TestCase):
+    def test_routes_by_priority_band(self):
+        queues = PriorityQueues("creep:tasks", BANDS)
+
+        self.assertEqual("creep:tasks:high", queues.queue_for(90))
+        self.assertEqual("creep:tasks:normal", queues.queue_for(20))
+        self.assertEqual("creep:tasks:low", queues.queue_for(-5))
+        self.assertEqual("creep:tasks:low", queues.queue_for(None))
+
+    def test_weighted_leader_share_never_starves_low_band(self):
+        queues = PriorityQueues("creep:tasks", BANDS)
+
+        orders = [queues.drain_order() for _ in range(60)]
+        leaders = Counter(order[0] for order in orders)
+
+        self.assertEqual(
+            {"creep:tasks:high": 30, "creep:tasks:normal": 20, "creep:tasks:low": 10}, leaders
+        )
+        for order in orders:
+            self.assertEqual(3, len(order))
+
+    def test_per_tenant_lists_rotate_within_band(self):
+        queues = PriorityQueues("q", [PriorityBand("all", 0)], per_tenant=True)
+        tenants = {"all": ["t-2", "t-1"]}
+
+        self.assertEqual("q:all:tenant:t-1", queues.queue_for(50, "t-1"))
+        self.assertEqual(
+            ["q:all:tenant:t-1", "q:all:tenant:t-2", "q:all"], queues.drain_order(tenants)
+        )
+        self.assertEqual(
+            ["q:all:tenant:t-2", "q:all:tenant:t-1", "q:all"], queues.drain_order(tenants)
+        )
+
+
+class PriorityRoutingTests(unittest.TestCase):
+    def test_loader_routes_payloads_and_registers_tenants(self):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchall.side_effect = [
+            [
+                ("task-hi", "tenant-1", [{"sku_category": "RAW_NET"}], 5000, 90, "RAW_CHECK"),
+                ("task-lo", "tenant-2", [{"sku_category": "RAW_NET"}], 5000, 5, "RAW_CHECK"),
+            ],
+            [("asset-1", "RAW_NET", "ip.uk", {}, "EXCLUSIVE")],
+            [("asset-2", "RAW_NET", "ip.uk", {}, "EXCLUSIVE")],
+            [("lease-1", "task-hi", "asset-1", "tenant-1", "project-1", {}, "RAW_NET"), ("lease-2", "task-lo", "asset-2", "tenant-1", "project-1", {}, "RAW_NET")],
+        ]
+        db = MagicMock()
+        db.cursor.return_value = cursor
+        redis = MagicMock()
+        queues = PriorityQueues("creep:tasks", BANDS, per_tenant=True)
+
+        payloads = Loader(db, redis, queues=queues).sync()
+
+        pipeline = redis.pipeline.return_value
+        pipeline.rpush.assert_any_call("creep:tasks:high:tenant:tenant-1", payloads[0])
+        pipeline.rpush.assert_any_call("creep:tasks:low:tenant:tenant-2", payloads[1])
+        pipeline.sadd.assert_any_call("creep:tasks:high:tenants", "tenant-1")
+        pipeline.sadd.assert_any_call("creep:tasks:low:tenants", "tenant-2")
+        pipeline.execute.assert_called_once()
+        self.assertEqual("task-hi", json.loads(payloads[0])["task_id"])
+
+    def test_dispenser_blpops_over_band_order_and_spreads_batch_by_weight(self):
+        redis = MagicMock()
+        redis.blpop.return_value = (b"creep:tasks:high", b"p-1")
+        pipeline = redis.pipeline.return_value
+        pipeline.execute.side_effect = [[5, 5, 5], [[b"p-2"], [b"p-3"], [b"p-4"]]]
+        dispenser = Dispenser(redis, "creep:tasks", queues=PriorityQueues("creep:tasks", BANDS))
+
+        self.assertEqual(["p-1", "p-2", "p-3", "p-4"], dispenser.acquire_batch(4, timeout=1))
+
+        redis.blpop.assert_called_once_with(
+            ["creep:tasks:high", "creep:tasks:normal", "creep:tasks:low"], timeout=1
+        )
+        self.assertEqual(
+            [call("creep:tasks:normal", 1), call("creep:tasks:high", 1), call("creep:tasks:low", 1)],
+            pipeline.lpop.call_args_list,
+        )
+
+    def test_dispenser_tops_up_from_the_only_backlogged_band(self):
+        redis = MagicMock()
+        redis.blpop.return_value = (b"creep:tasks:normal", b"p-1")
+        # LLENs follow the top-up drain order, which normal leads.
+        redis.pipeline.return_value.execute.return_value = [5, 0, 0]
+        redis.lpop.return_value = [b"p-2", b"p-3", b"p-4"]
+        dispenser = Dispenser(redis, "creep:tasks", queues=PriorityQueues("creep:tasks", BANDS))
+
+        self.assertEqual(["p-1", "p-2", "p-3", "p-4"], dispenser.acquire_batch(4, timeout=1))
+
+        redis.lpop.assert_called_once_with("creep:tasks:normal", 3)
+
+if __name__ == "__main__":
+    unittest.main()
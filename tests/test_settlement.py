@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.engine.settlement import SettlementWriter, TaskOutcome
+
+
+class SettlementWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cursor_mock = MagicMock()
+        self.cursor_mock.__enter__.return_value = self.cursor_mock
+        self.cursor_mock.__exit__.return_value = None
+        self.db_mock = MagicMock()
+        self.db_mock.cursor.return_value = self.cursor_mock
+
+    def _lease(self, lease_id, asset_id):
+        return {
+            "lease_id": lease_id,
+            "task_id": "task",
+            "asset_id": asset_id,
+            "tenant_id": "tenant-1",
+            "project_id": "project-1",
+            "meta_spec": {},
+        }
+
+    def _executed(self, sql):
+        return [call[0][1] for call in self.cursor_mock.execute.call_args_list if call[0][0] == sql]
+
+    def test_group_commit_writes_events_and_ledger_once(self):
+        writer = SettlementWriter(self.db_mock, max_batch_size=2, max_delay_ms=10_000)
+
+        first = TaskOutcome(
+            "task-1",
+            "SUCCESS",
+            [self._lease("lease-1", "asset-1"), self._lease("lease-2", "asset-2")],
+            ["lease-1", "lease-2"],
+        )
+        second = TaskOutcome(
+            "task-2", "FAILED", [self._lease("lease-3", "asset-3")], ["lease-3"], "EXECUTION_FAILED"
+        )
+
+        self.assertEqual([], writer.submit(first))
+        self.cursor_mock.execute.assert_not_called()
+        self.assertEqual([first, second], writer.submit(second))
+
+        self.db_mock.commit.assert_called_once()
+        self.assertEqual(
+            [(["lease-1", "lease-2", "lease-3"],
+              ["asset-1", "asset-2", "asset-3"],
+              ["TASK_SUCCESS", "TASK_SUCCESS", "TASK_FAIL"],
+              ["INFO", "INFO", "ERROR"],
+              [None, None, "EXECUTION_FAILED"])],
+            self._executed(SettlementWriter.INSERT_EVENTS_SQL),
+        )
+        ledger = self._executed(SettlementWriter.INSERT_LEDGER_SQL)
+        self.assertEqual(1, len(ledger))
+        self.assertEqual(["lease-1", "lease-2", "lease-3"], ledger[0][0])
+        self.assertEqual(["asset-1", "asset-2", "asset-3"], ledger[0][1])
+        self.assertEqual([(["task-1"],)], self._executed(SettlementWriter.UPDATE_TASK_SUCCESS_SQL))
+        self.assertEqual(
+            [(["task-2"], ["FAILED"], ["EXECUTION_FAILED"])],
+            self._executed(SettlementWriter.UPDATE_TASK_FAILURE_SQL),
+        )
+        self.assertEqual([(["lease-3"],)], self._executed(SettlementWriter.UPDATE_ASSET_FAILURE_SQL))
+        self.assertEqual(
+            [(["lease-1", "lease-2", "lease-3"],)],
+            self._executed(SettlementWriter.RELEASE_SHARED_SLOTS_SQL),
+        )
+        self.assertEqual(9, self.cursor_mock.execute.call_count)
+        # Lease statuses go last: the asset, event and ledger writes only
+        # apply to leases that are still ACTIVE.
+        self.assertEqual(
+            [SettlementWriter.UPDATE_LEASE_SUCCESS_SQL, SettlementWriter.UPDATE_LEASE_FAILURE_SQL],
+            [call[0][0] for call in self.cursor_mock.execute.call_args_list[-2:]],
+        )
+        self.assertEqual(0, writer.pending)
+
+    def test_flush_if_due_honours_latency_bound(self):
+        writer = SettlementWriter(self.db_mock, max_batch_size=100, max_delay_ms=50)
+
+        with patch("src.engine.settlement.time.monotonic", return_value=100.0):
+            writer.submit(TaskOutcome("task-1", "SUCCESS", [self._lease("lease-1", "asset-1")], ["lease-1"]))
+        with patch("src.engine.settlement.time.monotonic", return_value=100.02):
+            self.assertAlmostEqual(0.03, writer.seconds_until_due())
+            self.assertEqual([], writer.flush_if_due())
+        with patch("src.engine.settlement.time.monotonic", return_value=100.06):
+            self.assertEqual(1, len(writer.flush_if_due()))
+
+        self.db_mock.commit.assert_called_once()
+        self.assertIsNone(writer.seconds_until_due())
+
+    def test_failed_flush_rolls_back_raises_and_keeps_the_batch(self):
+        self.cursor_mock.execute.side_effect = RuntimeError("boom")
+        writer = SettlementWriter(self.db_mock, max_batch_size=1)
+        outcome = TaskOutcome("task-1", "SUCCESS", [], [])
+
+        with self.assertRaises(RuntimeError):
+            writer.submit(outcome)
+
+        self.db_mock.rollback.assert_called_once()
+        self.db_mock.commit.assert_not_called()
+        self.assertEqual(1, writer.pending)
+        self.assertIsNotNone(writer.seconds_until_due())
+
+        self.cursor_mock.execute.side_effect = None
+        self.assertEqual([outcome], writer.flush())
+        self.db_mock.commit.assert_called_once()
+        self.assertEqual(0, writer.pending)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import re
+import unittest
+from fnmatch import fnmatchcase
+
+from src.engine.models import AssetSnapshot, ResourceHint, match_hints
+from src.engine.sku_pattern import compile_sku_pattern, sql_pattern_params
+
+PATTERNS = [
+    "ip.uk",
+    "ip.*",
+    "ip.*.uk",
+    "ip.uk.?",
+    "ip.*.[lm]*",
+    "ip.[!u]*",
+    "ip.[a-f]*",
+    "ip.[z-a]*",
+    "ip.[!]",
+    "ip.[]]",
+    "ip.[",
+    "100%_off",
+    "back\\slash",
+    "**",
+    "",
+]
+
+CODES = [
+    "ip.uk",
+    "ip.us",
+    "ip.uk.1",
+    "ip.uk.12",
+    "ip.residential.uk",
+    "ip.residential.uk.london",
+    "ip.datacenter.us.miami",
+    "ip.]",
+    "ip.[",
+    "ip.b",
+    "IP.UK",
+    "100%_off",
+    "100%xoff",
+    "1000_off",
+    "back\\slash",
+    "ip.uk\n",
+    "",
+]
+
+
+def _like(value: str, pattern: str) -> bool:
+    """PostgreSQL ``LIKE`` with its default backslash escape."""
+
+    regex = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            regex.append(re.escape(next(chars)))
+        elif char == "%":
+            regex.append(".*")
+        elif char == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(char))
+    return re.fullmatch("".join(regex), value, re.DOTALL) is not None
+
+
+def _sql_matches(value: str, sku_code: str) -> bool:
+    like, _, sql_regex, _ = sql_pattern_params(sku_code)
+    if not _like(value, like):
+        return False
+    return sql_regex is None or re.search(sql_regex, value) is not None
+
+
+class SkuPatternParityTests(unittest.TestCase):
+    def test_in_memory_matching_follows_fnmatchcase(self):
+        for pattern in PATTERNS:
+            compiled = compile_sku_pattern(pattern)
+            for code in CODES:
+                with self.subTest(pattern=pattern, code=code):
+                    self.assertEqual(fnmatchcase(code, pattern), compiled.matches(code))
+
+    def test_sql_predicate_agrees_with_in_memory_matching(self):
+        for pattern in PATTERNS:
+            compiled = compile_sku_pattern(pattern)
+            for code in CODES:
+                with self.subTest(pattern=pattern, code=code):
+                    self.assertEqual(compiled.matches(code), _sql_matches(code, pattern))
+
+    def test_like_is_escaped_and_regex_only_for_classes(self):
+        self.assertEqual(("ip.%", "ip.%", None, None), sql_pattern_params("ip.*"))
+        self.assertEqual("100\\%\\_off", compile_sku_pattern("100%_off").like)
+        self.assertEqual("ip.uk._", compile_sku_pattern("ip.uk.?").like)
+        self.assertEqual("^(?:ip\\.[^u].*)$", compile_sku_pattern("ip.[!u]*").sql_regex)
+        self.assertEqual((None, None, None, None), sql_pattern_params(None))
+
+    def test_compiled_patterns_are_cached(self):
+        self.assertIs(compile_sku_pattern("ip.*.uk"), compile_sku_pattern("ip.*.uk"))
+        self.assertEqual("ip.", compile_sku_pattern("ip.*.uk").literal_prefix)
+        self.assertEqual("ip.uk", compile_sku_pattern("ip.uk").literal)
+
+
+class MatchHintsTests(unittest.TestCase):
+    def test_matches_many_hints_in_one_pass(self):
+        assets = [
+            AssetSnapshot("a-1", "RAW_NET", "ip.uk", "READY"),
+            AssetSnapshot("a-2", "RAW_NET", "ip.us", "READY"),
+            AssetSnapshot("a-3", "SMS", "ip.uk", "READY"),
+        ]
+        hints = [
+            ResourceHint("RAW_NET", "ip.uk"),
+            ResourceHint("RAW_NET", "ip.u?"),
+            ResourceHint("SMS"),
+            ResourceHint("EMAIL", "*"),
+        ]
+
+        matched = match_hints(hints, assets)
+
+        self.assertEqual(
+            [["a-1"], ["a-1", "a-2"], ["a-3"], []],
+            [[asset.asset_id for asset in group] for group in matched],
+        )
+        for hint, group in zip(hints, matched):
+            self.assertEqual([asset for asset in assets if hint.matches(asset)], group)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import dataclasses
+import sys
+import unittest
+
+from src.engine.models import AssetSnapshot, CompactAssetSnapshot, ResourceHint, match_hints
+from src.engine.snapshot_batch import AssetSnapshotBatch
+
+
+def _snapshots():
+    return [
+        AssetSnapshot("a-1", "RAW_NET", "ip.uk", "READY"),
+        AssetSnapshot("a-2", "RAW_NET", "ip.us", "LOCKED"),
+        AssetSnapshot("a-3", "RAW_NET", "ip.residential.uk", "READY"),
+        AssetSnapshot("a-4", "SMS", "ip.uk", "READY"),
+        AssetSnapshot("a-5", "RAW_NET", "ip.us", "READY"),
+    ]
+
+
+class CompactAssetSnapshotTests(unittest.TestCase):
+    def test_is_frozen_slotted_and_interned(self):
+        snapshot = CompactAssetSnapshot.from_snapshot(
+            AssetSnapshot("a-1", "RAW_NET", "".join(["ip.", "uk"]), "READY", {"x": 1})
+        )
+
+        self.assertFalse(hasattr(snapshot, "__dict__"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            snapshot.status = "LOCKED"
+        self.assertIs(sys.intern("ip.uk"), snapshot.sku_code)
+        self.assertTrue(ResourceHint("RAW_NET", "ip.*").matches(snapshot))
+
+
+class AssetSnapshotBatchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.batch = AssetSnapshotBatch.from_snapshots(_snapshots())
+
+    def test_round_trips_rows(self):
+        self.assertEqual(5, len(self.batch))
+        self.assertEqual(CompactAssetSnapshot("a-2", "RAW_NET", "ip.us", "LOCKED"), self.batch[1])
+        self.assertEqual(_snapshots(), self.batch.to_snapshots())
+
+    def test_masks_combine_category_status_and_code(self):
+        mask = self.batch.mask(sku_category="RAW_NET", status="READY", sku_code="ip.u?")
+
+        self.assertEqual(b"\x01\x00\x00\x00\x01", mask)
+        self.assertEqual(["a-1", "a-5"], [row.asset_id for row in self.batch.select(mask)])
+        self.assertEqual(4, self.batch.count(self.batch.mask(status="READY")))
+        self.assertEqual([3], self.batch.indices(self.batch.mask(sku_category="SMS", sku_code="ip.uk")))
+        self.assertEqual(0, self.batch.count(self.batch.mask(sku_category="EMAIL")))
+        self.assertEqual(0, self.batch.count(self.batch.mask(sku_code="ip.fr")))
+
+    def test_match_agrees_with_resource_hints(self):
+        hints = [ResourceHint("RAW_NET", "ip.*"), ResourceHint("RAW_NET", "ip.us"), ResourceHint("SMS")]
+        ready = [snapshot for snapshot in _snapshots() if snapshot.status == "READY"]
+
+        expected = [[snapshot.asset_id for snapshot in group] for group in match_hints(hints, ready)]
+        matched = [[self.batch.asset_ids[index] for index in group] for group in self.batch.match(hints)]
+
+        self.assertEqual(expected, matched)
+
+    def test_status_updates_and_vocabulary_limit(self):
+        self.batch.set_status(1, "READY")
+        self.assertEqual(5, self.batch.count(self.batch.mask(status="READY")))
+
+        class TinyBatch(AssetSnapshotBatch):
+            MAX_STATUSES = 2
+
+        batch = TinyBatch()
+        batch.append("a", "RAW_NET", "ip", "READY")
+        batch.append("b", "RAW_NET", "ip", "LOCKED")
+        with self.assertRaises(ValueError):
+            batch.append("c", "RAW_NET", "ip", "COOLING")
+        # The rejected row leaves no trace in any column.
+        self.assertEqual(2, len(batch))
+        batch.append("d", "SMS", "ip", "READY")
+        self.assertEqual(["a", "d"], [row.asset_id for row in batch.select(batch.mask(status="READY"))])
+        self.assertEqual("SMS", batch[2].sku_category)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from src.engine.task_payload import (
+    EMBEDDED_VERSION,
+    REFERENCE_VERSION,
+    decode_embedded_task,
+    encode_task_payload,
+)
+
+
+LEASES = [
+    {
+        "lease_id": "lease-1",
+        "task_id": "task-1",
+        "asset_id": "asset-1",
+        "tenant_id": "tenant-1",
+        "project_id": "project-1",
+        "meta_spec": {"region": "uk"},
+        "sku_category": "SMS",
+    }
+]
+
+
+class TaskPayloadTests(unittest.TestCase):
+    def _encode(self, **kwargs):
+        return json.loads(encode_task_payload("task-1", ["lease-1"], "TICKET_SNIPER", 5000, LEASES, **kwargs))
+
+    def test_embedded_payload_round_trips(self):
+        payload = self._encode()
+
+        self.assertEqual(EMBEDDED_VERSION, payload["v"])
+        self.assertEqual(["lease-1"], payload["lease_ids"])
+        task = decode_embedded_task(payload)
+        self.assertEqual("TICKET_SNIPER", task.task_type)
+        self.assertEqual(5000, task.timeout_ms)
+        self.assertEqual(LEASES, task.leases)
+
+    def test_lease_expiry_is_carried_by_either_version(self):
+        embedded = self._encode(expires_at=1700000000123)
+        reference = self._encode(version=REFERENCE_VERSION, expires_at=1700000000123)
+
+        self.assertEqual(1700000000123, decode_embedded_task(embedded).expires_at)
+        self.assertEqual(1700000000123, reference["expires_at"])
+
+    def test_reference_payload_has_nothing_embedded(self):
+        payload = self._encode(version=REFERENCE_VERSION)
+
+        self.assertEqual({"task_id": "task-1", "lease_ids": ["lease-1"]}, payload)
+        self.assertIsNone(decode_embedded_task(payload))
+
+    def test_tampered_payload_is_rejected(self):
+        payload = self._encode()
+        payload["leases"][0][1] = "asset-2"
+
+        self.assertIsNone(decode_embedded_task(payload))
+
+    def test_lease_ids_must_match_embedded_leases(self):
+        payload = self._encode()
+        payload["lease_ids"] = ["lease-1", "lease-2"]
+
+        self.assertIsNone(decode_embedded_task(payload))
+
+
+if __name__ == "__main__":
+    unittest.main()
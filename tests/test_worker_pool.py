@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from src.adapters.base import AsyncBaseAdapter
+from src.engine.settlement import SettlementWriter
+from src.engine.worker_pool import WorkerPool
+
+
+class _QueueDispenser:
+    """Hands out queued payloads, then stops the pool once drained."""
+
+    def __init__(self, payloads, pool_ref):
+        self._payloads = list(payloads)
+        self._lock = threading.Lock()
+        self._pool_ref = pool_ref
+        self.acked = []
+        self.closed = 0
+
+    def ack(self, payload):
+        self.acked.append(payload)
+
+    def redelivered(self, payload):
+        return False
+
+    def close(self):
+        self.closed += 1
+
+    def acquire_batch(self, count, timeout=None):
+        with self._lock:
+            if self._payloads:
+                return [self._payloads.pop(0)]
+        self._pool_ref[0].stop()
+        return []
+
+
+class _FlakyDispenser(_QueueDispenser):
+    """Fails the first dequeue, as a dropped Redis connection would."""
+
+    def __init__(self, payloads, pool_ref):
+        super().__init__(payloads, pool_ref)
+        self.failures = 1
+
+    def acquire_batch(self, count, timeout=None):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("redis went away")
+        return super().acquire_batch(count, timeout)
+
+
+class _ConcurrencyProbeAdapter(AsyncBaseAdapter):
+    def __init__(self):
+        super().__init__({})
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def cost_model(self):
+        return {"model": "flat"}
+
+    async def acquire_async(self, specs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        return {"asset_id": specs["asset_id"]}
+
+    async def check_health_async(self, asset_id):
+        return self._health_status(asset_id, "healthy")
+
+    async def release_async(self, asset_id):
+        return True
+
+
+def _build_connection(lease_rows):
+    cursor = MagicMock()
+    cursor.__enter__.return_value = cursor
+    cursor.__exit__.return_value = None
+    cursor.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+    cursor.fetchall.return_value = lease_rows
+    conn = MagicMock()
+    conn.cursor.return_value = cursor
+    return conn
+
+
+class WorkerPoolTests(unittest.TestCase):
+    def test_runs_tasks_concurrently_and_drains(self):
+        pool_ref = [None]
+        payloads = [json.dumps({"task_id": "task-1", "lease_ids": ["lease-1", "lease-2"]})] * 3
+        dispenser = _QueueDispenser(payloads, pool_ref)
+        adapter = _ConcurrencyProbeAdapter()
+        lease_rows = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {"asset_id": "asset-1"}, "sms"),
+            ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {"asset_id": "asset-2"}, "sms"),
+        ]
+        connections = []
+
+        def connection_factory():
+            conn = _build_connection(lease_rows)
+            connections.append(conn)
+            return conn
+
+        pool = WorkerPool(dispenser, connection_factory, adapter=adapter, concurrency=3)
+        pool_ref[0] = pool
+
+        asyncio.run(pool.run())
+
+        self.assertEqual(3, pool.processed)
+        self.assertEqual(payloads, dispenser.acked)
+        self.assertEqual(1, dispenser.closed)
+        self.assertEqual(3, len(connections))
+        # Three tasks with two leases each were in flight at the same time.
+        self.assertEqual(6, adapter.max_in_flight)
+        for conn in connections:
+            conn.close.assert_called_once()
+            conn.cursor.return_value.execute.assert_any_call(
+                SettlementWriter.UPDATE_TASK_SUCCESS_SQL, (["task-1"],)
+            )
+            conn.commit.assert_called()
+
+    def test_slot_error_does_not_close_other_slots_connections(self):
+        pool_ref = [None]
+        payloads = [json.dumps({"task_id": "task-1", "lease_ids": ["lease-1"]})] * 3
+        dispenser = _FlakyDispenser(payloads, pool_ref)
+        lease_rows = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {"asset_id": "asset-1"}, "sms"),
+        ]
+        connections = []
+
+        def connection_factory():
+            conn = _build_connection(lease_rows)
+            connections.append(conn)
+            return conn
+
+        pool = WorkerPool(
+            dispenser, connection_factory, adapter=_ConcurrencyProbeAdapter(), concurrency=3
+        )
+        pool.ERROR_BACKOFF_SECONDS = 0.0
+        pool_ref[0] = pool
+
+        asyncio.run(pool.run())
+
+        # The failing slot backed off and kept going; nothing was lost.
+        self.assertEqual(3, pool.processed)
+        self.assertEqual(payloads, dispenser.acked)
+        for conn in connections:
+            conn.close.assert_called_once()
+
+    def test_stop_before_run_exits_without_processing(self):
+        dispenser = MagicMock()
+        pool = WorkerPool(dispenser, MagicMock, adapter=_ConcurrencyProbeAdapter(), concurrency=2)
+        pool.stop()
+
+        asyncio.run(pool.run())
+
+        dispenser.acquire.assert_not_called()
+        self.assertEqual(0, pool.processed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
+import asyncio
 import json
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock
 
 from src.adapters.base import BaseAdapter
+from src.engine.health_cache import HealthCache
+from src.engine.settlement import SettlementWriter
+from src.engine.task_payload import encode_task_payload
 from src.engine.worker import Worker
 
 
@@ -17,14 +23,16 @@ class WorkerTaskAwareTests(unittest.TestCase):
         self.db_mock.rollback = MagicMock()
 
         self.dispenser_mock = MagicMock()
+        self.dispenser_mock.redelivered.return_value = False
         self.adapter_mock = MagicMock(spec=BaseAdapter)
-        self.adapter_mock.acquire.return_value = {
-            "asset_id": "asset-1",
-            "credentials": {},
-            "metadata": {},
-        }
-        self.adapter_mock.check_health.return_value = {"status": "healthy", "asset_id": "asset-1"}
-        self.adapter_mock.release.return_value = True
+        self.adapter_mock.acquire_many.side_effect = lambda specs: [
+            {"asset_id": f"asset-{index}", "credentials": {}, "metadata": {}}
+            for index, _spec in enumerate(specs, start=1)
+        ]
+        self.adapter_mock.check_health_many.side_effect = lambda asset_ids: [
+            {"status": "healthy", "asset_id": asset_id} for asset_id in asset_ids
+        ]
+        self.adapter_mock.release_many.side_effect = lambda asset_ids: [True] * len(asset_ids)
 
     def _build_payload(self, task_id: str, lease_ids):
         return json.dumps({"task_id": task_id, "lease_ids": lease_ids})
@@ -32,10 +40,10 @@ class WorkerTaskAwareTests(unittest.TestCase):
     def test_ticket_sniper_successful_settlement(self):
         worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
 
-        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000)
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
         self.cursor_mock.fetchall.return_value = [
-            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}),
-            ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {}),
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+            ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {}, "sms"),
         ]
 
         payload = self._build_payload("task-1", ["lease-1", "lease-2"])
@@ -49,20 +57,56 @@ class WorkerTaskAwareTests(unittest.TestCase):
             Worker.SELECT_LEASES_SQL, (["lease-1", "lease-2"],)
         )
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_TASK_SUCCESS_SQL, ("task-1",)
+            SettlementWriter.UPDATE_TASK_SUCCESS_SQL, (["task-1"],)
+        )
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_LEASE_SUCCESS_SQL, (["lease-1", "lease-2"],)
         )
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_LEASE_SUCCESS_SQL, (["lease-1", "lease-2"],)
+            SettlementWriter.UPDATE_ASSET_COOLING_SQL, (["lease-1", "lease-2"],)
         )
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_ASSET_COOLING_SQL, (["asset-1", "asset-2"],)
+            SettlementWriter.INSERT_EVENTS_SQL,
+            (
+                ["lease-1", "lease-2"],
+                ["asset-1", "asset-2"],
+                ["TASK_SUCCESS"] * 2,
+                ["INFO"] * 2,
+                [None, None],
+            ),
         )
         self.db_mock.commit.assert_called()
 
+        # One vendor round trip per phase, regardless of the lease count.
+        self.adapter_mock.acquire_many.assert_called_once_with([{}, {}])
+        self.adapter_mock.check_health_many.assert_called_once_with(["asset-1", "asset-2"])
+        self.adapter_mock.release_many.assert_called_once_with(["asset-1", "asset-2"])
+        self.adapter_mock.acquire.assert_not_called()
+
+    def test_unhealthy_asset_fails_task_and_releases_everything(self):
+        self.adapter_mock.check_health_many.side_effect = lambda asset_ids: [
+            {"status": "healthy", "asset_id": asset_ids[0]},
+            {"status": "unhealthy", "asset_id": asset_ids[1]},
+        ]
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+            ("lease-2", "task-1", "asset-2", "tenant-1", "project-1", {}, "sms"),
+        ]
+
+        worker._process_one(self._build_payload("task-1", ["lease-1", "lease-2"]))
+
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["FAILED"], ["EXECUTION_FAILED"])
+        )
+        self.adapter_mock.release_many.assert_called_once_with(["asset-1", "asset-2"])
+
     def test_invalid_lease_marks_task_failed(self):
         worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
 
-        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000)
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
         self.cursor_mock.fetchall.return_value = []
 
         payload = self._build_payload("task-1", ["missing-lease"])
@@ -70,19 +114,19 @@ class WorkerTaskAwareTests(unittest.TestCase):
         worker._process_one(payload)
 
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_TASK_FAILURE_SQL, ("RESOURCE_ERROR", "task-1")
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["FAILED"], ["RESOURCE_ERROR"])
         )
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_LEASE_FAILURE_SQL, (["missing-lease"],)
+            SettlementWriter.UPDATE_LEASE_FAILURE_SQL, (["missing-lease"],)
         )
         self.db_mock.commit.assert_called()
 
     def test_missing_lease_detected_as_data_inconsistency(self):
         worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
 
-        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000)
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
         self.cursor_mock.fetchall.return_value = [
-            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}),
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
         ]
 
         payload = self._build_payload("task-1", ["lease-1", "lease-2"])
@@ -90,13 +134,231 @@ class WorkerTaskAwareTests(unittest.TestCase):
         worker._process_one(payload)
 
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_TASK_FAILURE_SQL, ("DATA_INCONSISTENCY", "task-1")
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["FAILED"], ["DATA_INCONSISTENCY"])
         )
         self.cursor_mock.execute.assert_any_call(
-            Worker.UPDATE_LEASE_FAILURE_SQL, (["lease-1", "lease-2"],)
+            SettlementWriter.UPDATE_LEASE_FAILURE_SQL, (["lease-1", "lease-2"],)
         )
         self.db_mock.commit.assert_called()
 
+    def test_embedded_payload_skips_hydration(self):
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        lease = {
+            "lease_id": "lease-1",
+            "asset_id": "asset-1",
+            "tenant_id": "tenant-1",
+            "project_id": "project-1",
+            "meta_spec": {"region": "uk"},
+            "sku_category": "sms",
+        }
+        payload = encode_task_payload("task-1", ["lease-1"], "TICKET_SNIPER", 1000, [lease])
+
+        worker._process_one(payload)
+
+        executed = [call[0][0] for call in self.cursor_mock.execute.call_args_list]
+        self.assertNotIn(Worker.SELECT_TASK_SQL, executed)
+        self.assertNotIn(Worker.SELECT_LEASES_SQL, executed)
+        self.adapter_mock.acquire_many.assert_called_once_with([{"region": "uk"}])
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_SUCCESS_SQL, (["task-1"],)
+        )
+        self.dispenser_mock.ack.assert_called_once_with(payload)
+
+    def test_redelivered_embedded_payload_of_settled_task_is_dropped(self):
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        self.dispenser_mock.redelivered.return_value = True
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "SUCCESS")
+        lease = {"lease_id": "lease-1", "asset_id": "asset-1"}
+        payload = encode_task_payload("task-1", ["lease-1"], "TICKET_SNIPER", 1000, [lease])
+
+        worker._process_one(payload)
+
+        self.cursor_mock.execute.assert_any_call(Worker.SELECT_TASK_SQL, ("task-1",))
+        self.adapter_mock.acquire_many.assert_not_called()
+        self.dispenser_mock.ack.assert_called_once_with(payload)
+
+    def test_binary_payload_is_decoded(self):
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        lease = {"lease_id": "lease-1", "asset_id": "asset-1", "meta_spec": {"region": "uk"}}
+        payload = encode_task_payload(
+            "task-1", ["lease-1"], "TICKET_SNIPER", 1000, [lease], codec="binary"
+        )
+
+        worker._process_one(payload)
+
+        self.adapter_mock.acquire_many.assert_called_once_with([{"region": "uk"}])
+        self.dispenser_mock.ack.assert_called_once_with(payload)
+
+    def test_corrupted_embedded_payload_falls_back_to_hydration(self):
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 1000, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+        lease = {"lease_id": "lease-1", "asset_id": "asset-1"}
+        payload = json.loads(encode_task_payload("task-1", ["lease-1"], "TICKET_SNIPER", 1000, [lease]))
+        payload["timeout_ms"] = 10**9
+
+        worker._process_one(json.dumps(payload))
+
+        self.cursor_mock.execute.assert_any_call(Worker.SELECT_TASK_SQL, ("task-1",))
+        self.cursor_mock.execute.assert_any_call(Worker.SELECT_LEASES_SQL, (["lease-1"],))
+
+    def test_task_past_deadline_times_out_and_releases_assets(self):
+        stuck = threading.Event()
+        self.adapter_mock.check_health_many.side_effect = lambda asset_ids: stuck.wait(5)
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 50, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+
+        started = time.monotonic()
+        worker._process_one(self._build_payload("task-1", ["lease-1"]))
+        stuck.set()
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["TIMEOUT"], ["TIMEOUT"])
+        )
+        # A slow vendor is no reason to ban the asset; it only cools down.
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_ASSET_COOLING_SQL, (["lease-1"],)
+        )
+        self.adapter_mock.release_many.assert_called_once_with(["asset-1"])
+
+    def test_hung_vendor_holds_at_most_the_adapter_call_threads(self):
+        stuck = threading.Event()
+        started = []
+
+        def hang(specs):
+            started.append(threading.get_ident())
+            stuck.wait(5)
+            return [{"asset_id": "asset-1"} for _ in specs]
+
+        self.adapter_mock.acquire_many.side_effect = hang
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        worker.ADAPTER_CALL_THREADS = 2
+        worker.RELEASE_GRACE_SECONDS = 0.05
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 30, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+        self.addCleanup(stuck.set)
+
+        for _ in range(4):
+            worker._process_one(self._build_payload("task-1", ["lease-1"]))
+
+        # Every task timed out, but only two vendor calls ever started.
+        self.assertEqual(2, len(started))
+        self.assertEqual(2, len(set(started)))
+        timeouts = [
+            call
+            for call in self.cursor_mock.execute.call_args_list
+            if call[0][0] == SettlementWriter.UPDATE_TASK_FAILURE_SQL
+        ]
+        self.assertEqual(4, len(timeouts))
+
+    def test_deadline_counts_from_the_claim_not_the_dequeue(self):
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=self.adapter_mock)
+        lease = {"lease_id": "lease-1", "asset_id": "asset-1", "meta_spec": {"region": "uk"}}
+        # Claimed with a 60s timeout, but the payload sat in the queue past it.
+        expired = int(time.time() * 1000) - 1000
+        payload = encode_task_payload(
+            "task-1", ["lease-1"], "TICKET_SNIPER", 60000, [lease], expires_at=expired
+        )
+
+        worker._process_one(payload)
+
+        self.adapter_mock.acquire_many.assert_not_called()
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["TIMEOUT"], ["TIMEOUT"])
+        )
+
+    def test_async_task_past_deadline_is_cancelled(self):
+        cancelled = []
+
+        async def hang(specs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def release(asset_ids):
+            return [True] * len(asset_ids)
+
+        adapter = MagicMock()
+        adapter.acquire_many_async.side_effect = hang
+        adapter.release_many_async.side_effect = release
+        worker = Worker(self.dispenser_mock, self.db_mock, adapter=adapter)
+
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 50, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+
+        asyncio.run(worker._process_one_async(self._build_payload("task-1", ["lease-1"])))
+
+        self.assertEqual(cancelled, [True])
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_FAILURE_SQL, (["task-1"], ["TIMEOUT"], ["TIMEOUT"])
+        )
+        # The acquire never returned, so every leased asset is released.
+        adapter.release_many_async.assert_called_once_with(["asset-1"])
+
+    def test_slow_redis_health_cache_does_not_block_the_event_loop(self):
+        class SlowRedis:
+            def mget(self, keys):
+                time.sleep(0.3)
+                return [None] * len(keys)
+
+            def pipeline(self, transaction=True):
+                return MagicMock()
+
+        async def acquire(specs):
+            return [{"asset_id": "asset-1"} for _ in specs]
+
+        async def check_health(asset_ids):
+            return [{"status": "healthy"} for _ in asset_ids]
+
+        async def release(asset_ids):
+            return [True] * len(asset_ids)
+
+        adapter = MagicMock()
+        adapter.acquire_many_async.side_effect = acquire
+        adapter.check_health_many_async.side_effect = check_health
+        adapter.release_many_async.side_effect = release
+        worker = Worker(
+            self.dispenser_mock,
+            self.db_mock,
+            adapter=adapter,
+            health_cache=HealthCache(redis_client=SlowRedis()),
+        )
+        self.cursor_mock.fetchone.return_value = ("TICKET_SNIPER", 5000, "QUEUED")
+        self.cursor_mock.fetchall.return_value = [
+            ("lease-1", "task-1", "asset-1", "tenant-1", "project-1", {}, "sms"),
+        ]
+
+        async def other_slot(started):
+            await asyncio.sleep(0.05)
+            return time.monotonic() - started
+
+        async def scenario():
+            started = time.monotonic()
+            payload = self._build_payload("task-1", ["lease-1"])
+            _, waited = await asyncio.gather(
+                worker._process_one_async(payload), other_slot(started)
+            )
+            return waited
+
+        # The other slot wakes on time while the Redis MGET is in flight.
+        self.assertLess(asyncio.run(scenario()), 0.25)
+        self.cursor_mock.execute.assert_any_call(
+            SettlementWriter.UPDATE_TASK_SUCCESS_SQL, (["task-1"],)
+        )
+
 
 if __name__ == "__main__":
     unittest.main()